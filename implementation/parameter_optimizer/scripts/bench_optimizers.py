@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+
+'''
+Compares the backends of `optimizers.py` (the GA, CMA-ES and batch Bayesian optimization) by the number of evaluations
+they need to reach a target fitness, without running the generator, on saved results of `genetic.py` (or `pareto.py`).
+By default (`-objective nn`) the fitness of an individual is the one of the nearest saved parameters (on the parameters scaled
+to [0, 1]), so the objective is made only of measured fitness. With `-objective surrogate` it is `crit()` of the prediction
+of a Gaussian process fitted on the saved results (see `surrogate.py`), which is smoother, but of the same family as the model
+of the 'bo' backend, so it favours 'bo'.
+The target is a quantile of the fitness of the saved parameters. Each backend starts from the same random populations.
+'''
+
+import argparse
+import pickle
+import random
+
+import numpy as np
+from deap import base, creator, tools
+from termcolor import colored as col
+
+from local_lib import crit
+from optimizers import BACKENDS, mutate_values, random_values, run
+from surrogate import Surrogate, scale
+
+
+my_parser = argparse.ArgumentParser(description='Compares the evaluations to a target of the optimizers, on saved results.')
+
+my_parser.add_argument('data',
+                       type=str,
+                       help=col('Dataset.\n', 'cyan'))
+
+my_parser.add_argument('type',
+                       type=int,
+                       help=col('The type of ship.\n', 'cyan'))
+
+my_parser.add_argument('name',
+                       type=str,
+                       help=col('Name of the save in saves/{data}/type{type}/ without .pkl, e.g. month1.\n', 'cyan'))
+
+my_parser.add_argument('-opt',
+                       type=str,
+                       default='new,1.0,10',
+                       help=col('Option of crit(). Defaults to new,1.0,10.\n', 'cyan'))
+
+my_parser.add_argument('-backends',
+                       type=str,
+                       nargs='*',
+                       default=list(BACKENDS),
+                       choices=BACKENDS,
+                       help=col('The backends to compare. Defaults to all.\n', 'cyan'))
+
+my_parser.add_argument('-runs',
+                       type=int,
+                       default=10,
+                       help=col('Number of runs (seeds) of each backend.\n', 'cyan'))
+
+my_parser.add_argument('-ngen',
+                       type=int,
+                       default=20,
+                       help=col('Number of generations (batches) of each run.\n', 'cyan'))
+
+my_parser.add_argument('-pops',
+                       type=int,
+                       default=20,
+                       help=col('Population (batch) size.\n', 'cyan'))
+
+my_parser.add_argument('-objective',
+                       type=str,
+                       default='nn',
+                       choices=('nn', 'surrogate'),
+                       help=col('The fitness of an individual: the one of the nearest saved parameters (nn), or of a surrogate model fitted on them. '
+                                'The surrogate is a Gaussian process, as the model of bo, so it favours bo. Defaults to nn.\n', 'cyan'))
+
+my_parser.add_argument('-q',
+                       type=float,
+                       default=0.01,
+                       help=col('The target is this quantile of the fitness of the saved parameters. Defaults to 0.01.\n', 'cyan'))
+
+args = my_parser.parse_args()
+
+with open(f'saves/{args.data}/type{args.type}/{args.name}.pkl', 'rb') as file:
+    results = pickle.load(file)[0]  # Mapping of synopses-parameters to (RMSE, Ratio)
+
+# The saved parameters (scaled) and their fitness, for the nearest neighbour
+saved_x = scale(list(results))
+saved_fitness = np.array([crit(a, b, args.opt) for a, b in results.values()])
+
+if args.objective == 'surrogate':
+    model = Surrogate().fit(results, args.opt)
+    if not model.ready():
+        raise ValueError(f'{len(results)} results are not enough for the surrogate')
+
+    rmse, ratio = model.predict(list(results))
+    target = np.quantile([crit(a, b, args.opt) for a, b in zip(rmse, ratio)], args.q)
+    print(col('The objective is a Gaussian process, as the model of bo, so the comparison favours bo', 'red'))
+else:
+    target = np.quantile(saved_fitness, args.q)
+
+print(col(f'{len(results)} saved results, target fitness {target:.6f} (quantile {args.q})', 'blue'))
+
+creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+creator.create("Individual", list, fitness=creator.FitnessMin)  # pylint: disable=no-member
+
+# The fitness of each parameters evaluated by the current run, and the number of evaluations when the target was reached
+evaluated = {}
+reached = None
+
+
+def objective(individual) -> float:
+    """The fitness of an individual: the one of the nearest saved parameters, or of the surrogate (see -objective)."""
+
+    if args.objective == 'surrogate':
+        a, b = model.predict([individual])
+        return crit(a[0], b[0], args.opt)
+    return saved_fitness[np.argmin(((saved_x - scale([individual])[0])**2).sum(1))]
+
+
+def evaluate(individual):
+    """The fitness of an individual on the objective. Each distinct individual counts as one evaluation, as in `genetic.py`."""
+
+    global reached
+
+    key = tuple(individual)
+    if key not in evaluated:
+        evaluated[key] = objective(individual)
+        if reached is None and evaluated[key] <= target:
+            reached = len(evaluated)
+    return evaluated[key],
+
+
+toolbox = base.Toolbox()
+toolbox.register("individual", lambda: creator.Individual(random_values()))  # pylint: disable=no-member
+toolbox.register("population", tools.initRepeat, list, toolbox.individual)  # pylint: disable=no-member
+toolbox.register("evaluate", evaluate)
+toolbox.register("mate", tools.cxOnePoint)
+toolbox.register("mutate", mutate_values, indpb=0.5)
+toolbox.register("select", tools.selTournament, tournsize=3)
+
+for backend in args.backends:
+    counts = []
+    best = []
+    for seed in range(args.runs):
+        random.seed(seed)
+        np.random.seed(seed)
+        evaluated = {}
+        reached = None
+
+        # Same hyper-parameters as genetic.py
+        run(backend, toolbox.population(n=args.pops), toolbox, cxpb=0.4, mutpb=0.8, ngen=args.ngen, verbose=False)  # pylint: disable=no-member
+
+        counts.append(reached)
+        best.append(min(evaluated.values()))
+
+    hits = [c for c in counts if c is not None]
+    median = f'{np.median(hits):7.1f}' if hits else '      -'
+    print(f'{backend:6s} reached the target in {len(hits):3d}/{args.runs} runs, median evaluations {median}, '
+          f'median best fitness {np.median(best):.6f}')
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+
+'''
+Micro-benchmark of the parsers of the output of the Synopses-Generator: `json.loads()` of every line
+(the previous path of `Daemon.read_synopses_files()`) against `output_parser.py`.
+Writes a synthetic output file with records in the format of the jar (or uses a given one), parses it
+with each method, checks that the points are the same and prints the time of each.
+'''
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+
+import output_parser
+
+
+ANNOTATION = ['stop_start', 'stop_end', 'change_in_speed_start', 'change_in_speed_end', 'slow_motion_start',
+              'slow_motion_end', 'gap_start', 'gap_end', 'change_in_heading', 'noise']
+
+
+def java_double(x: float) -> str:
+    """A double as Double.toString() of Java writes it (close enough for the benchmark)."""
+    s = repr(x)
+    if 'e' in s:
+        mant, exp = s.split('e')
+        if '.' not in mant:
+            mant += '.0'
+        return f'{mant}E{int(exp)}'
+    return s
+
+
+def record(rnd: random.Random, idd: str, t: int) -> str:
+    """A line of output, as the toString() of an Avro critical_point."""
+
+    anno = ', '.join(f'"{a}": {"true" if rnd.random() < 0.1 else "false"}' for a in ANNOTATION)
+    return (f'{{"timestamp": {t}, "id": "{idd}", "longitude": {java_double(rnd.uniform(-10, 0))}, '
+            f'"latitude": {java_double(rnd.uniform(45, 50))}, "annotation": {{{anno}}}, '
+            f'"distance": {java_double(rnd.uniform(0, 5000))}, "speed": {java_double(rnd.uniform(0, 20))}, '
+            f'"heading": {java_double(rnd.uniform(0, 360))}, "time_elapsed": {rnd.randint(0, 100000)}, '
+            f'"msg_error_flag": "", "ingestion_timestamp": {t + rnd.randint(0, 1000)}, '
+            f'"heading_diff": {java_double(rnd.uniform(-180, 180))}, "percental_speed_change": {java_double(rnd.uniform(-1, 1))}}}')
+
+
+def write_output(path: str, n: int):
+    """Writes n synthetic lines of output to path."""
+
+    rnd = random.Random(0)
+    ids = [str(227000000 + i) for i in range(500)]
+    t = 1443650400000
+    with open(path, 'w') as f:
+        for _ in range(n):
+            t += rnd.randint(0, 2000)
+            f.write(record(rnd, rnd.choice(ids), t))
+            f.write('\n')
+
+
+def parse_json(path: str):
+    """The previous path: json.loads() of every line, keeping four fields."""
+
+    points = []
+    for line in open(path, 'r'):
+        if len(line) > 1:
+            t = json.loads(line)
+            points.append((t['id'], t['longitude'], t['latitude'], t['timestamp']))
+    return points
+
+
+def parse_fast(path: str):
+    """output_parser.parse_point() of every line."""
+
+    points = []
+    for line in open(path, 'r'):
+        if len(line) > 1:
+            points.append(output_parser.parse_point(line))
+    return points
+
+
+if __name__ == '__main__':
+
+    my_parser = argparse.ArgumentParser(description='Compares the parsers of the output of the Synopses-Generator')
+
+    my_parser.add_argument('-n',
+                           type=int,
+                           default=2000000,
+                           help='Number of lines of the synthetic output')
+
+    my_parser.add_argument('-file',
+                           type=str,
+                           default=None,
+                           help='Output file of the jar to parse, instead of a synthetic one')
+
+    args = my_parser.parse_args()
+
+    path = args.file
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.out')
+        os.close(fd)
+        start = time.time()
+        write_output(path, args.n)
+        print(f'Wrote {args.n} lines in {time.time() - start:.1f}s')
+
+    try:
+        timings = {}
+
+        start = time.time()
+        ref = parse_json(path)
+        timings['json.loads'] = time.time() - start
+
+        start = time.time()
+        fast = parse_fast(path)
+        timings['parse_point'] = time.time() - start
+
+        start = time.time()
+        ids, lon, lat, t = output_parser.read_columns_file(path)
+        timings['read_columns_file'] = time.time() - start
+
+        assert fast == ref, 'parse_point() differs from json.loads()'
+        assert ids.tolist() == [p[0] for p in ref] and np.array_equal(t, [p[3] for p in ref]), 'read_columns_file() differs from json.loads()'
+        assert np.array_equal(lon, [p[1] for p in ref]) and np.array_equal(lat, [p[2] for p in ref]), 'read_columns_file() differs from json.loads()'
+
+        for name, secs in timings.items():
+            print(f'{name:>18}: {secs:6.2f}s  {1e6 * secs / max(len(ref), 1):6.2f}us/line  x{timings["json.loads"] / secs:.1f}')
+    finally:
+        if args.file is None:
+            os.remove(path)
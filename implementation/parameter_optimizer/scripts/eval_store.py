@@ -0,0 +1,325 @@
+"""Evaluations of synopses parameters shared by all the processes of the optimizers, in an SQLite database.
+
+`genetic.py`, `hyperparam.py` and `r_genetic.py` keep their results in a dictionary, and only pickle it when they end.
+So runs on the same type at the same time evaluated the same individuals again. An `EvalStore` is shared by such runs,
+and is keyed by (dataset, ship type, parts, fcode, generator version, parameters):
+
+* `get()` returns the (RMSE, Ratio) of parameters that some process has evaluated.
+* `claim()` marks parameters as being evaluated by this process, so that other processes wait for the result
+  (`wait()`) instead of running them too. A claim of a process that died, or older than `CLAIM_TIMEOUT`, can be taken.
+* `put()` stores a result and drops the claim.
+
+`evaluate()` combines them. An evaluation stopped by its cutoff (`local_lib.Censored`) is stored by `censor()` as a censored row,
+with lower bounds instead of the result: `get()` and `items()` skip it, `bounds()` returns it, and it can be claimed as if
+it were not evaluated (another process may have a higher cutoff). The database is in WAL mode, so readers do not block the writer, and the
+writers wait for each other up to `BUSY_TIMEOUT`.
+
+A `PartStore` keeps, instead of the (RMSE, Ratio) of a set of parts, the sums that give them (see `local_lib.squared_error_sums()`)
+for a single part. The sums of the parts of a fold are added, so an individual that was evaluated in one fold of the
+cross-validation is only run on the parts that the other folds do not share (see `fold_evaluate()`).
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from local_lib import Censored
+
+
+# Default location of the database, next to the pickled saves
+DEFAULT_PATH = 'saves/evals.sqlite'
+
+# Seconds after which the claim of a process is considered abandoned
+CLAIM_TIMEOUT = 3600
+
+# Seconds that a writer waits for the lock of the database
+BUSY_TIMEOUT = 60
+
+# Seconds between two checks for the result of a claimed evaluation
+POLL_INTERVAL = 0.5
+
+
+
+def canonical(individual: Sequence) -> str:
+    """The key of the values of some parameters, e.g. `[10, 0.5]` -> `'[10, 0.5]'`. Ints and floats stay distinct."""
+    return json.dumps(list(individual))
+
+
+def process_id() -> str:
+    """The owner of the claims of this process, `host:pid`."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def is_alive(owner: str) -> bool:
+    """Whether the process that owns a claim still runs. Processes of other hosts are considered alive."""
+
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+
+class EvalStore:
+    """The evaluations of one training set (dataset, ship type, parts, fcode) with one version of the Synopses-Generator.
+    """
+
+    # Table, the columns of the training set (then comes 'params'), and the columns of a result
+    TABLE = 'evals'
+    SCOPE = ('dataset', 'ship_type', 'parts', 'fcode', 'version')
+    VALUES = ('rmse', 'ratio')
+
+    def __init__(self, dataset: str, ship_type: str, parts: List[str], fcode: str, version: str, path: str = DEFAULT_PATH):
+        """Opens (or creates) the database.
+
+        Arguments:
+            dataset {str} -- The dataset, e.g. brest
+            ship_type {str} -- The type of ship
+            parts {List[str]} -- The parts of the input, in the order they are concatenated
+            fcode {str} -- The file names of the input, e.g. month, or several joined by commas
+            version {str} -- The version of the Synopses-Generator (see `local_lib.generator_version()`)
+
+        Keyword Arguments:
+            path {str} -- The database file (default: {DEFAULT_PATH})
+        """
+
+        self.open((str(dataset), str(ship_type), ','.join(map(str, parts)), str(fcode), str(version)), path)
+
+
+    def open(self, scope: Tuple[str, ...], path: str):
+        """Opens the database, and creates the table if needed.
+
+        Arguments:
+            scope {Tuple[str, ...]} -- The values of the columns SCOPE
+            path {str} -- The database file
+        """
+
+        self.scope = scope
+        self.owner = process_id()
+
+        # Conditions of the rows of some parameters, and of all the rows of the scope
+        self.where = ' AND '.join(f'{c}=?' for c in self.SCOPE + ('params',))
+        self.where_scope = ' AND '.join(f'{c}=?' for c in self.SCOPE)
+        self.values = ', '.join(self.VALUES)
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(f'''CREATE TABLE IF NOT EXISTS {self.TABLE} (
+            {', '.join(f'{c} TEXT NOT NULL' for c in self.SCOPE)}, params TEXT NOT NULL,
+            {', '.join(f'{c} REAL' for c in self.VALUES)}, owner TEXT, claimed REAL, censored INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY ({', '.join(self.SCOPE)}, params))''')
+
+        # Databases made before censored rows
+        if 'censored' not in [row[1] for row in self.conn.execute(f'PRAGMA table_info({self.TABLE})')]:
+            self.conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN censored INTEGER NOT NULL DEFAULT 0')
+
+
+    def get(self, individual: Sequence) -> Tuple[float, float]:
+        """The (RMSE, Ratio) of some parameters, or None if they are not evaluated."""
+
+        row = self.conn.execute(f'SELECT {self.values} FROM {self.TABLE} WHERE {self.where} AND {self.VALUES[0]} IS NOT NULL AND NOT censored',
+                                self.scope + (canonical(individual),)).fetchone()
+        return None if row is None else tuple(row)
+
+
+    def bounds(self, individual: Sequence) -> Tuple[float, float]:
+        """The lower bounds of the (RMSE, Ratio) of some parameters whose evaluation was censored, or None."""
+
+        row = self.conn.execute(f'SELECT {self.values} FROM {self.TABLE} WHERE {self.where} AND {self.VALUES[0]} IS NOT NULL AND censored',
+                                self.scope + (canonical(individual),)).fetchone()
+        return None if row is None else tuple(row)
+
+
+    def items(self) -> Dict[Tuple, Tuple[float, float]]:
+        """All the evaluated parameters, as the `results` dictionaries of the optimizers (tuple of values -> (RMSE, Ratio))."""
+
+        rows = self.conn.execute(f'SELECT params, {self.values} FROM {self.TABLE} WHERE {self.where_scope} AND {self.VALUES[0]} IS NOT NULL AND NOT censored',
+                                 self.scope)
+        return {tuple(json.loads(row[0])): tuple(row[1:]) for row in rows}
+
+
+    def claim(self, individual: Sequence) -> bool:
+        """Marks some parameters as being evaluated by this process.
+
+        Arguments:
+            individual {Sequence} -- The values of the parameters
+
+        Returns:
+            bool -- True if this process must evaluate them. False if they are evaluated, or claimed by another process
+        """
+
+        key = self.scope + (canonical(individual),)
+        now = time.time()
+
+        # Commits when the block ends, or rolls back on an error
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            row = self.conn.execute(f'SELECT {self.VALUES[0]}, owner, claimed, censored FROM {self.TABLE} WHERE {self.where}', key).fetchone()
+
+            if row is None:
+                self.conn.execute(f'INSERT INTO {self.TABLE} ({", ".join(self.SCOPE)}, params, owner, claimed) VALUES ({", ".join("?" * (len(key) + 2))})',
+                                  key + (self.owner, now))
+                return True
+
+            value, owner, claimed, censored = row
+            if value is not None and not censored:
+                return False
+
+            # Take the claims of this process, of dead processes, and old ones (censored rows are not claimed by anyone)
+            if owner == self.owner or owner is None or now - claimed > CLAIM_TIMEOUT or not is_alive(owner):
+                self.conn.execute(f'UPDATE {self.TABLE} SET owner=?, claimed=? WHERE {self.where}', (self.owner, now) + key)
+                return True
+
+            return False
+
+
+    def release(self, individual: Sequence):
+        """Drops the claim of this process on some parameters that were not evaluated (e.g. the run failed)."""
+
+        self.conn.execute(f'DELETE FROM {self.TABLE} WHERE {self.where} AND owner=? AND {self.VALUES[0]} IS NULL',
+                          self.scope + (canonical(individual), self.owner))
+
+        # A censored row stays, without the claim
+        self.conn.execute(f'UPDATE {self.TABLE} SET owner=NULL, claimed=NULL WHERE {self.where} AND owner=? AND censored',
+                          self.scope + (canonical(individual), self.owner))
+
+
+    def put(self, individual: Sequence, *values: float):
+        """Stores the result of some parameters, e.g. `put(individual, rmse, ratio)`, and drops the claim."""
+
+        self.store(individual, values, censored=False)
+
+
+    def censor(self, individual: Sequence, *bounds: float):
+        """Stores lower bounds of the result of some parameters whose evaluation was stopped by its cutoff, and drops the claim.
+        A result that is already stored is kept.
+        """
+
+        if self.get(individual) is None:
+            self.store(individual, bounds, censored=True)
+
+
+    def store(self, individual: Sequence, values: Sequence[float], censored: bool):
+        """Writes the row of some parameters, without a claim."""
+
+        key = self.scope + (canonical(individual),)
+        self.conn.execute(f'INSERT OR REPLACE INTO {self.TABLE} ({", ".join(self.SCOPE)}, params, {self.values}, owner, claimed, censored) VALUES ({", ".join("?" * (len(key) + len(values)))}, NULL, NULL, ?)',
+                          key + tuple(map(float, values)) + (int(censored),))
+
+
+    def wait(self, individual: Sequence) -> Tuple[float, float]:
+        """Waits for the evaluation of parameters claimed by another process.
+
+        Arguments:
+            individual {Sequence} -- The values of the parameters
+
+        Returns:
+            Tuple[float, float] -- The (RMSE, Ratio), or None if the claim was dropped or abandoned (and now belongs to this process)
+        """
+
+        while True:
+            res = self.get(individual)
+            if res is not None:
+                return res
+            if self.claim(individual):
+                return None
+            time.sleep(POLL_INTERVAL)
+
+
+    def evaluate(self, individual: Sequence, run: Callable[[], Tuple[float, float]]) -> Tuple[float, float]:
+        """The (RMSE, Ratio) of some parameters: the stored one, the one of another process that evaluates them,
+        or the result of `run()` in this process.
+
+        Arguments:
+            individual {Sequence} -- The values of the parameters
+            run {Callable[[], Tuple[float, float]]} -- Evaluates them, e.g. with `Daemon.run_synopses()`
+
+        Raises:
+            Censored: If run() raises it. The bounds are stored first
+
+        Returns:
+            Tuple[float, float] -- The (RMSE, Ratio)
+        """
+
+        res = self.get(individual)
+        if res is not None:
+            return res
+
+        if not self.claim(individual):
+            res = self.wait(individual)
+            if res is not None:
+                return res
+
+        try:
+            res = tuple(run())
+        except Censored as e:
+            self.censor(individual, *e.bounds)
+            raise
+        except BaseException:
+            self.release(individual)
+            raise
+
+        self.put(individual, *res)
+        return res
+
+
+    def close(self):
+        """Closes the database."""
+        self.conn.close()
+
+
+class PartStore(EvalStore):
+    """The sums of the errors (see `local_lib.squared_error_sums()`) of the evaluations on a single part.
+    `get()` and `evaluate()` return (sum of squared errors, uncompressed points, compressed points).
+    """
+
+    TABLE = 'part_evals'
+    SCOPE = ('dataset', 'ship_type', 'part', 'fcode', 'version')
+    VALUES = ('sq_error', 'raw_points', 'approx_points')
+
+    def __init__(self, dataset: str, ship_type: str, part: str, fcode: str, version: str, path: str = DEFAULT_PATH):  # pylint: disable=super-init-not-called
+        """Opens (or creates) the database.
+
+        Arguments:
+            dataset {str} -- The dataset, e.g. brest
+            ship_type {str} -- The type of ship
+            part {str} -- The part
+            fcode {str} -- The file name of the part, e.g. month
+            version {str} -- The version of the Synopses-Generator (see `local_lib.generator_version()`)
+
+        Keyword Arguments:
+            path {str} -- The database file (default: {DEFAULT_PATH})
+        """
+
+        self.open((str(dataset), str(ship_type), str(part), str(fcode), str(version)), path)
+
+
+def fold_evaluate(stores: Dict[str, PartStore], individual: Sequence, run: Callable[[str], Tuple[float, int, int]]) -> Tuple[float, int, int]:
+    """The sums of some parameters over the parts of a fold: the sums of each part are taken from its store,
+    and only the parts without them are run.
+
+    Arguments:
+        stores {Dict[str, PartStore]} -- The store of each part of the fold
+        individual {Sequence} -- The values of the parameters
+        run {Callable[[str], Tuple[float, int, int]]} -- Runs them on a part, e.g. with `Daemon.run_synopses_sums()`
+
+    Returns:
+        Tuple[float, int, int] -- The sums over all the parts, see `local_lib.rmse_ratio()`
+    """
+
+    total = (0.0, 0, 0)
+    for part, store in stores.items():
+        sums = store.evaluate(individual, lambda: run(part))  # pylint: disable=cell-var-from-loop
+        total = (total[0] + sums[0], total[1] + int(sums[1]), total[2] + int(sums[2]))
+    return total
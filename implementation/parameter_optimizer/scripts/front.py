@@ -0,0 +1,100 @@
+#!/usr/bin/python3
+
+'''
+Picks parameters from the Pareto front of some saved results (e.g. of `pareto.py`, or of `genetic.py`), without running the generator:
+the best ones for options of `crit()`, or the ones with the lowest Ratio (RMSE) under a bound on the RMSE (Ratio).
+With -grid, checks the hyper-parameter values of `hyperparam.py` against the bounds, as `bounds.py` does.
+'''
+
+import argparse
+import pickle
+
+from termcolor import colored as col
+
+from local_lib import best_on_front, pareto_front
+
+
+my_parser = argparse.ArgumentParser(description='Picks parameters from the Pareto front of saved results.')
+
+my_parser.add_argument('data',
+                       type=str,
+                       help=col('Dataset.\n', 'cyan'))
+
+my_parser.add_argument('type',
+                       type=int,
+                       help=col('The type of ship.\n', 'cyan'))
+
+my_parser.add_argument('name',
+                       type=str,
+                       help=col('Name of the save in saves/{data}/type{type}/ without .pkl, e.g. month1_pareto.\n', 'cyan'))
+
+my_parser.add_argument('-opt',
+                       type=str,
+                       nargs='*',
+                       default=[],
+                       help=col('Options of crit() for which to pick the best parameters.\n', 'cyan'))
+
+my_parser.add_argument('-max_rmse',
+                       type=float,
+                       default=None,
+                       help=col('Upper bound of the RMSE.\n', 'cyan'))
+
+my_parser.add_argument('-max_ratio',
+                       type=float,
+                       default=None,
+                       help=col('Upper bound of the Ratio, in percent.\n', 'cyan'))
+
+my_parser.add_argument('-grid',
+                       action='store_true',
+                       help=col('Check the options new,n,x of hyperparam.py against the bounds.\n', 'cyan'))
+
+args = my_parser.parse_args()
+
+with open(f'saves/{args.data}/type{args.type}/{args.name}.pkl', 'rb') as file:
+    results = pickle.load(file)[0]  # Mapping of synopses-parameters to (RMSE, Ratio)
+
+front = pareto_front(results)
+max_ratio = None if args.max_ratio is None else args.max_ratio/100
+
+print(col(f'{len(results)} evaluations, {len(front)} on the front', 'blue'))
+
+
+def show(title: str, point):
+    """Prints a point of the front."""
+    if point is None:
+        print(f'{title}: ', col('None within the bounds', 'red'))
+    else:
+        params, (rmse, ratio) = point
+        print(f'{title}: RMSE={rmse:.4f} Ratio={100*ratio:.3f}%', col(str(params), 'green'))
+
+
+if args.grid:
+    # Hyper-Parameter Values of hyperparam.py
+    if args.data == 'brest':
+        l1 = [2, 4, 7, 10, 13, 17]
+        l2 = [0.7, 0.8, 1.0, 1.2, 1.4, 1.6]
+    elif args.data == 'mtraffic':
+        l1 = [16, 24, 32, 42, 52, 62, 74, 88]
+        l2 = [0.3, 0.45, 0.6, 0.75, 1.0, 1.3, 1.65, 2.0]
+    else:
+        raise ValueError('Wrong dataset')
+
+    for x in l1:
+        for n in l2:
+            print(f'{x:3.0f},{n:.2f}: ', end='')
+
+            # The best point of the option, and whether it is within the bounds
+            _, (rmse, ratio) = best_on_front(front, f'new,{n},{x}')
+            ok = (args.max_rmse is None or rmse < args.max_rmse) and (max_ratio is None or ratio < max_ratio)
+            print(col('True', 'green') if ok else col('False', 'red'), end='  ' if ok else ' ')
+        print()
+
+for opt in args.opt:
+    show(opt, best_on_front(front, opt, args.max_rmse, max_ratio))
+
+if not args.opt and not args.grid:
+    if args.max_rmse is None and max_ratio is None:
+        for point in front:
+            show('front', point)
+    else:
+        show('best', best_on_front(front, None, args.max_rmse, max_ratio))
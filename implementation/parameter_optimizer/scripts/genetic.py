@@ -2,19 +2,26 @@
 
 
 import argparse
+import asyncio
+import math
 import os
 import pickle
 import random
+import signal
 import sys
 from time import time
-from typing import List
+from typing import Dict, List
 
 import numpy as np
-from deap import algorithms, base, creator, tools
+from deap import base, creator, tools
 from termcolor import colored
 from tqdm import tqdm
 
-from local_lib import DEF_PARAMS, PARAMETERS, Daemon, crit
+from eval_store import DEFAULT_PATH, EvalStore, PartStore, fold_evaluate
+from local_lib import DEF_PARAMS, PARAMETERS, AsyncDaemonPool, Censored, Daemon, GeneratorTimeout, crit, exit_on_signal, generator_version, mutate_ind, random_params, rmse_ratio
+from optimizers import BACKENDS, FAILED, run as run_optimizer
+from racing import run_race, stored_run
+from surrogate import Surrogate, screen
 
 
 class progress_bar:
@@ -72,6 +79,12 @@ def evaluate(individual: List) -> float:
     global daemon # daemon that runs the synopses
     global running_stats # dictionary with information about running times
     global PARAMETERS # List of synopses-parameter names and limites
+    global store # evaluations shared with other processes
+    global part_stores # evaluations of each part, with -per_part
+    global censored # lower bounds of the fitness of the evaluations stopped by -cutoff
+    global low_fidelity # fitness of the individuals that -fidelity did not run on all the ships
+    global raced # fitness of the individuals that -race eliminated before the last part
+    global failed # individuals whose run was killed by the timeout
 
     if tuple(individual) in results:
         # If already found this individual, return the already found fitness
@@ -81,140 +94,669 @@ def evaluate(individual: List) -> float:
         # Because of deap framework MUST return tuple
         return crit(rmse, ratio, opt),
 
+    if tuple(individual) in censored:
+        return censored[tuple(individual)],
+
+    if tuple(individual) in low_fidelity:
+        return low_fidelity[tuple(individual)],
+
+    if tuple(individual) in raced:
+        return raced[tuple(individual)],
+
+    if tuple(individual) in failed:
+        return FAILED,
+
     # Create a dict that maps the parameter name to the value
     # (This is the input required by the daemon)
+    params = individual_params(individual)
+
+    # If value outside of range, return huge value
+    if params is None:
+        return FAILED,
+
+    cutoff = current_cutoff()
+    if cutoff is not None and store is not None:
+        # Censored by another process, with a cutoff that was at least as low
+        bounds = store.bounds(individual)
+        if bounds is not None and crit(*bounds, opt) > cutoff[1]:
+            censored[tuple(individual)] = crit(*bounds, opt)
+            return censored[tuple(individual)],
+
+    def run():
+        # Save cur time
+        start_time = time()
+
+        # Run synopses and estimate RMSE and compression ratio
+        try:
+            return daemon.run_synopses(params, cutoff=cutoff)
+        finally:
+            # Save Running time to stats
+            running_stats['total'] += round(time() - start_time)
+            running_stats['runs'] += 1
+
+    try:
+        if part_stores is not None:
+            # Add up the sums of the parts, running only the parts that no fold has evaluated
+            rmse, ratio = rmse_ratio(*fold_evaluate(part_stores, individual, lambda p: run_part(p, params)))
+        else:
+            # Run only if no other process has evaluated them (or is evaluating them)
+            rmse, ratio = run() if store is None else store.evaluate(individual, run)
+    except Censored as e:
+        # Not a result: it is kept apart, and never saved
+        censored[tuple(individual)] = crit(*e.bounds, opt)
+        return censored[tuple(individual)],
+    except GeneratorTimeout as e:
+        record_failure(tuple(individual), e)
+        return FAILED,
+
+    # Add result to results-dictionary
+    results[tuple(individual)] = (rmse, ratio)
+
+    # Return Fitness
+    return crit(rmse, ratio, opt),
+
+
+def record_failure(key: tuple, e: GeneratorTimeout):
+    """Records an individual whose run was killed by the timeout of the Daemon (see `supervisor.py`).
+    It gets the fitness FAILED, and is not saved, so a later run tries it again.
+
+    Args:
+        key (tuple): The values of the parameters
+        e (GeneratorTimeout): The error, with the end of the stderr of the generator
+    """
+
+    global failed
+
+    failed[key] = str(e)
+    eprint(colored(f'{e}, parameters {key}', 'red'))
+    tail = e.stderr.strip().splitlines()[-5:]
+    if tail:
+        eprint(colored('\n'.join(tail), 'red'))
+
+
+def run_part(p: str, params: Dict[str, float]):
+    """Runs some parameters on a single part, with -per_part. The Daemon of each part starts when it is first needed.
+
+    Args:
+        p (str): The part
+        params (Dict[str, float]): The parameters
+
+    Returns:
+        Tuple[float, int, int]: The sums of the errors, see `Daemon.run_synopses_sums()`
+    """
+
+    global part_daemons
+    global running_stats
+
+    if p not in part_daemons:
+        part_daemons[p] = Daemon(ship_type, [p], dataset, fcode)
+
+    start_time = time()
+    sums = part_daemons[p].run_synopses_sums(params)
+
+    # Save Running time to stats
+    running_stats['total'] += round(time() - start_time)
+    running_stats['runs'] += 1
+    return sums
+
+
+def race_part(p: str, keys: List) -> List:
+    """Runs some individuals on a single part, with -race: on the pool of Daemons of the part with -workers > 1
+    (it starts when it is first needed), else with `run_part()`.
+
+    Args:
+        p (str): The part
+        keys (List): The values of the parameters of each individual
+
+    Returns:
+        List: The sums of the errors of each individual, see `Daemon.run_synopses_sums()`, or None if its run timed out
+    """
+
+    global part_pools
+    global running_stats
+
+    params_list = [individual_params(key) for key in keys]
+    if args.workers == 1:
+        outs = []
+        for params in params_list:
+            try:
+                outs.append(run_part(p, params))
+            except GeneratorTimeout as e:
+                outs.append(e)
+    else:
+        if p not in part_pools:
+            part_pools[p] = AsyncDaemonPool(args.workers, ship_type, [p], dataset, fcode)
+
+        outs = asyncio.run(part_pools[p].map(params_list, sums=True))
+
+        # Save Running time to stats
+        running_stats['total'] += round(sum(part_pools[p].run_times))
+        running_stats['runs'] += len(part_pools[p].run_times)
+
+    for key, res in zip(keys, outs):
+        if isinstance(res, GeneratorTimeout):
+            record_failure(key, res)
+    return [None if isinstance(res, GeneratorTimeout) else res for res in outs]
+
+
+def race_map(func, individuals: List) -> List:
+    """Map of the toolbox with -race. The new individuals are run one part at a time (all of them on the same part, so in parallel
+    with -workers > 1), and after each part the ones that a paired t-test on the `crit()` of the parts finds worse than the leader
+    are eliminated (see `racing.py`). The ones left ran on every part, and `func` (which is `evaluate`) finds all their parts in the stores.
+    The others get the fitness of the parts they ran, but never better than the worst individual that ran on all of them.
+    It is kept apart from the results, and never saved, but their parts stay in the stores.
+
+    Args:
+        func (Callable): The evaluation function
+        individuals (List): The individuals to evaluate
+
+    Returns:
+        List: The fitness of each individual
+    """
+
+    global results
+    global raced
+
+    new = []
+    for ind in individuals:
+        key = tuple(ind)
+        if key in results or key in raced or key in failed or key in new or individual_params(ind) is None:
+            continue
+        new.append(key)
+
+    race = run_race(new, parts, stored_run(part_stores, race_part), opt)
+
+    fitness = list(map(func, [ind for ind in individuals if tuple(ind) not in race.eliminated]))
+
+    # The eliminated ones rank after every new individual that ran on all the parts
+    worst = max((crit(*results[key], opt) for key in race.alive), default=None)
+    for key in race.eliminated:
+        if key in race.failed:
+            raced[key] = FAILED
+        else:
+            raced[key] = race.fitness(key) if worst is None else max(race.fitness(key), worst)
+
+    if len(new) > 0:
+        eprint(colored(f'Race: {" -> ".join(map(str, race.counts))} new individuals on the parts {parts}, '
+                       f'{race.runs()} of {len(new) * len(parts)} runs on a part', 'magenta'))
+
+    fitness.reverse()
+    return [(raced[tuple(ind)],) if tuple(ind) in race.eliminated else fitness.pop() for ind in individuals]
+
+
+def current_cutoff():
+    """The cutoff of the evaluations with -cutoff: the fitness of the pop_size-th best result so far,
+    i.e. an individual is stopped once it is proven worse than all of the best pop_size ones.
+
+    Returns:
+        Tuple[str, float]: The option of crit() and the fitness, or None
+    """
+
+    global results
+
+    if not args.cutoff or len(results) < pop_size:
+        return None
+
+    fitness = sorted(crit(rmse, ratio, opt) for rmse, ratio in results.values())
+    return opt, fitness[pop_size - 1]
+
+
+def individual_params(individual: List) -> Dict[str, float]:
+    """Creates a dict that maps the parameter name to the value of an individual.
+
+    Args:
+        individual (List): A list of values for the synopses parameters
+
+    Returns:
+        Dict[str, float]: The parameters, or None if a value is outside of its range
+    """
+
     params = {}
     i = 0
     for k, v in PARAMETERS.items():
-        # If value outside of range, return huge value
         if individual[i] < v[0] or individual[i] > v[1]:
-            return 1e20,
+            return None
 
-        # Else save in params the value of the individual
         params[k] = individual[i]
         i += 1
 
-    # Save cur time
-    start_time = time()
+    return params
 
-    # Run synopses and estimate RMSE and compression ratio
-    rmse, ratio = daemon.run_synopses(params)
 
-    # Save Running time to stats
-    running_stats['total'] += round(time() - start_time)
-    running_stats['runs'] += 1
+def parallel_map(func, individuals: List) -> List:
+    """Map of the toolbox when -workers > 1. Runs the new individuals of a generation on the pool of Daemons,
+    stores them in `results`, and then calls `func` (which is `evaluate`) that finds them there.
 
-    # Add result to results-dictionary
-    results[tuple(individual)] = (rmse, ratio)
+    Args:
+        func (Callable): The evaluation function
+        individuals (List): The individuals to evaluate
 
-    # Return Fitness
-    return crit(rmse, ratio, opt),
+    Returns:
+        List: The fitness of each individual
+    """
 
+    global results
+    global pool
+    global running_stats
+    global store
+    global censored
+    global low_fidelity
+
+    cutoff = current_cutoff()
+
+    # The individuals that must be run, without duplicates, and the ones that another process runs
+    todo = {}
+    waiting = {}
+    for ind in individuals:
+        key = tuple(ind)
+        if key in results or key in censored or key in low_fidelity or key in failed or key in todo or key in waiting:
+            continue
+
+        params = individual_params(ind)
+        if params is None:
+            continue
+
+        res = None if store is None else store.get(key)
+        if res is not None:
+            results[key] = res
+        elif store is None or store.claim(key):
+            todo[key] = params
+        else:
+            waiting[key] = params
+
+    if len(todo) > 0:
+        try:
+            outs = asyncio.run(pool.map(list(todo.values()), cutoff))
+        except BaseException:
+            if store is not None:
+                for key in todo:
+                    store.release(key)
+            raise
+
+        for key, res in zip(todo, outs):
+            if isinstance(res, Censored):
+                censored[key] = crit(*res.bounds, opt)
+                if store is not None:
+                    store.censor(key, *res.bounds)
+                continue
+
+            if isinstance(res, GeneratorTimeout):
+                record_failure(key, res)
+                if store is not None:
+                    store.release(key)
+                continue
+
+            results[key] = res
+            if store is not None:
+                store.put(key, *res)
+
+        # Save Running time to stats
+        running_stats['total'] += round(sum(pool.run_times))
+        running_stats['runs'] += len(pool.run_times)
+
+    def run(params):
+        res = asyncio.run(pool.run(params, cutoff))
+        if isinstance(res, (Censored, GeneratorTimeout)):
+            raise res
+        return res
+
+    # Wait for the other processes (or run, if they dropped them)
+    for key, params in waiting.items():
+        try:
+            results[key] = store.evaluate(key, lambda: run(params))  # pylint: disable=cell-var-from-loop
+        except Censored as e:
+            censored[key] = crit(*e.bounds, opt)
+        except GeneratorTimeout as e:
+            record_failure(key, e)
+
+    return list(map(func, individuals))
+
+
+def screened_map(func, individuals: List) -> List:
+    """Map of the toolbox with -surrogate. A surrogate model, fitted on `results`, predicts the fitness of the new individuals,
+    and only the best fraction -surrogate of them, plus a fraction -explore at random, are run (with `parallel_map` if there is a pool).
+    The others get the predicted fitness. Logs the error of the predictions of the ones that ran, and the runs that were saved.
 
-def individual_generator():
-    """Generates an individual.
-    With some probability, picks an individual with good fitness from the 
-    previous results in variable `results` to create a not-random individual.
+    Args:
+        func (Callable): The evaluation function
+        individuals (List): The individuals to evaluate
 
     Returns:
-       [Individual]
+        List: The fitness of each individual
     """
 
     global results
-    global opt
-    global creator
+    global pool
+    global surrogate_stats
 
+    base_map = map if pool is None else parallel_map
 
-    # If enough results exist and with some probability
-    if len(results) > 10 and random.random() < 0.7:
+    # The individuals that would be run
+    new = [i for i, ind in enumerate(individuals) if tuple(ind) not in results and tuple(ind) not in censored and tuple(ind) not in failed and individual_params(ind) is not None]
 
-        # hof contains the top 10 individuals
-        hof = sorted(results.items(), key=lambda kv: crit(
-            kv[1][0], kv[1][1], opt))[:10]
+    model = Surrogate().fit(results, opt)
+    if not model.ready() or len(new) < 2:
+        return list(base_map(func, individuals))
 
-        # From hof pick an individual at random
-        ind = list(random.choice(hof)[0])
+    rmse, ratio = model.predict([individuals[i] for i in new])
+    predicted = {i: crit(a, b, opt) for i, a, b in zip(new, rmse, ratio)}
+    chosen = {new[j] for j in screen([predicted[i] for i in new], args.surrogate, args.explore, random)}
 
-    else: # else pick values at ranodm tfrom the ranges in PARAMETERS
-        ind = []
+    # Run the chosen ones and the ones that are not predicted
+    run = [i for i in range(len(individuals)) if i not in predicted or i in chosen]
+    fitness = dict(zip(run, base_map(func, [individuals[i] for i in run])))
 
-        # For each parameter
-        for v in PARAMETERS.values():
+    # Relative error of the predicted fitness of the ones that ran
+    errors = [abs(predicted[i] - fitness[i][0]) / max(abs(fitness[i][0]), 1e-12) for i in chosen]
+    saved = len(new) - len(chosen)
+    surrogate_stats['saved'] += saved
+    eprint(colored(f'Surrogate: ran {len(chosen)}/{len(new)} new individuals, saved {saved} runs ({surrogate_stats["saved"]} in total), '
+                   f'mean relative error of the fitness {100*np.mean(errors):.1f}%', 'magenta'))
 
-            # If parameter is int
-            if isinstance(v[0], int):
+    return [fitness[i] if i in fitness else (predicted[i],) for i in range(len(individuals))]
 
-                # Pick at random from the range
-                x = random.randint(*v)
 
-                # If range of params is large, roung the value to be a multiple of 50
-                if x > 200:
-                    x = 50*round(x/50)
+def run_rung(fraction: float, individuals: List) -> List:
+    """Evaluates some individuals on a sample of the ships, with -fidelity. Each fraction has its own Daemon (or pool, with -workers > 1)
+    that starts when it is first needed, and its own evaluations in the store (under the version of the generator and the fraction).
 
-                ind.append(x)
+    Args:
+        fraction (float): The fraction of the ships, see `Daemon`
+        individuals (List): The individuals, with values in their ranges
 
-            # If parameter is float
-            elif isinstance(v[0], float):
-                # Pick a float at ranodm, but round at 2 decimals
-                ind.append(round(random.uniform(*v), 2))
+    Returns:
+        List: The (RMSE, Ratio) of each individual on the sample, or None if its run timed out
+    """
 
-            else: # Should never reach here
-                raise NotImplementedError('Generator only supports int and float')
+    global rung_runners
+    global rung_stores
+    global rung_results
+
+    if fraction not in rung_runners:
+        if args.workers > 1:
+            rung_runners[fraction] = AsyncDaemonPool(args.workers, ship_type, parts, dataset, fcode, fraction=fraction)
+        else:
+            rung_runners[fraction] = Daemon(ship_type, parts, dataset, fcode, fraction=fraction)
+        if store is not None:
+            rung_stores[fraction] = EvalStore(dataset, ship_type, parts, fcode, f'{generator_version()} ships={fraction}', args.store)
+
+    runner = rung_runners[fraction]
+    rung_store = rung_stores.get(fraction)
+    cache = rung_results.setdefault(fraction, {})
+
+    # The individuals that must be run, without duplicates
+    todo = {}
+    for ind in individuals:
+        key = tuple(ind)
+        if key in cache or key in todo:
+            continue
+        res = None if rung_store is None else rung_store.get(key)
+        if res is not None:
+            cache[key] = res
+        else:
+            todo[key] = individual_params(ind)
+
+    if isinstance(runner, AsyncDaemonPool):
+        outs = asyncio.run(runner.map(list(todo.values())))
+    else:
+        outs = []
+        for params in todo.values():
+            try:
+                outs.append(runner.run_synopses(params))
+            except GeneratorTimeout as e:
+                outs.append(e)
+
+    for key, res in zip(todo, outs):
+        if isinstance(res, GeneratorTimeout):
+            # Not cached, so that it is tried again on this sample
+            record_failure(key, res)
+            continue
+        cache[key] = res
+        if rung_store is not None:
+            rung_store.put(key, *res)
+
+    return [cache.get(tuple(ind)) for ind in individuals]
+
+
+def fidelity_map(func, individuals: List) -> List:
+    """Map of the toolbox with -fidelity (successive halving). The new individuals are first run on the smallest sample of the ships,
+    and only the best fraction -advance of them goes on to the next sample, and so on. The ones left at the end are evaluated on
+    all the ships (with `parallel_map` if there is a pool), so the results always come from the full input.
+    The others get their fitness on the last sample they ran on, but never better than the worst individual that ran on all the ships.
+    It is kept apart from the results, and never saved.
 
-    # Convert list to individual
-    return creator.Individual(ind) # pylint: disable=no-member
+    Args:
+        func (Callable): The evaluation function
+        individuals (List): The individuals to evaluate
 
+    Returns:
+        List: The fitness of each individual
+    """
 
-def mutate_ind(ind, low: List, up: List, indpb: float):
-    """Mutates an individual of values (int or float)
-    by adding gaussian noise with std proportional to the range of values.
+    global results
+    global pool
+    global store
+    global low_fidelity
+
+    base_map = map if pool is None else parallel_map
+
+    # The individuals that would be run on all the ships, without duplicates
+    new = {}
+    for ind in individuals:
+        key = tuple(ind)
+        if key in results or key in censored or key in low_fidelity or key in failed or key in new or individual_params(ind) is None:
+            continue
+        res = None if store is None else store.get(key)
+        if res is not None:
+            results[key] = res
+        else:
+            new[key] = ind
+
+    # Successive halving over the samples
+    candidates = list(new.values())
+    scores = {}
+    counts = [len(candidates)]
+    for fraction in fractions:
+        if len(candidates) <= 1:
+            break
+
+        fitness = {tuple(ind): FAILED if res is None else crit(*res, opt) for ind, res in zip(candidates, run_rung(fraction, candidates))}
+        scores.update(fitness)
+
+        candidates = sorted(candidates, key=lambda ind: fitness[tuple(ind)])[:max(1, math.ceil(args.advance * len(candidates)))]  # pylint: disable=cell-var-from-loop
+        counts.append(len(candidates))
+
+    advanced = {tuple(ind) for ind in candidates}
+    dropped = {key for key in new if key not in advanced}
+
+    run = [i for i, ind in enumerate(individuals) if tuple(ind) not in dropped]
+    fitness = dict(zip(run, base_map(func, [individuals[i] for i in run])))
+
+    # The dropped ones rank after every new individual that ran on all the ships
+    worst = max((fitness[i][0] for i in run if tuple(individuals[i]) in advanced), default=None)
+    for key in dropped:
+        low_fidelity[key] = scores[key] if worst is None else max(scores[key], worst)
+
+    if len(new) > 0:
+        # Cost in runs on all the ships
+        cost = sum(n * f for n, f in zip(counts[:-1], fractions)) + counts[-1]
+        eprint(colored(f'Fidelity: {" -> ".join(map(str, counts))} new individuals on {fractions[:len(counts) - 1] + [1.0]} of the ships, '
+                       f'cost {100*cost/len(new):.0f}% of running all of them on all the ships', 'magenta'))
+
+    return [fitness[i] if i in fitness else (low_fidelity[tuple(individuals[i])],) for i in range(len(individuals))]
+
+
+def ea_steady_state(population: List, toolbox, cxpb: float, mutpb: float, ngen: int, stats=None, halloffame=None, verbose: bool = True):
+    """Asynchronous steady-state version of `algorithms.eaSimple`, used with -steady. There is no generation barrier:
+    as soon as a Daemon of the pool is free, an offspring is made (tournament selection, crossover and mutation with
+    the probabilities of eaSimple) and given to it, and each result replaces the worst individual of the population when it arrives.
+    It makes ngen * len(population) offspring, as eaSimple does, and logs a line every len(population) arrivals.
+    Without a pool (-workers 1), each offspring is evaluated at once.
 
-    Arguments:
-       ind {Individual} -- The individual to mutate
-       low {List} -- List of values (int or float). Lower bounds for each parameter
-       up {List} -- List of values (int or float). Upper bounds for each parameter
-       indpb {float} -- Probability with which to mutate each characteristic
+    Args:
+        population (List): The initial population, replaced in place
+        toolbox (deap.base.Toolbox): With evaluate, mate, mutate, select and map
+        cxpb (float): Probability of crossover
+        mutpb (float): Probability of mutation
+        ngen (int): The number of generations, i.e. of len(population) offspring
+        stats (deap.tools.Statistics, optional): Compiled at each log line. Defaults to None.
+        halloffame (optional): Updated with the population at each log line. Defaults to None.
+        verbose (bool, optional): Whether to print the log lines. Defaults to True.
 
     Returns:
-       Individual -- New individual
+        Tuple: The final population and the deap.tools.Logbook
     """
 
-    # Loop for every value of the individual
-    for i in range(len(ind)):
+    global results
+    global pool
+    global store
+    global running_stats
+
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+    # The processes of the pool, given one offspring at a time instead of a batch
+    daemons = None if pool is None else pool.pool
+
+    def log(gen: int, nevals: int):
+        if halloffame is not None:
+            halloffame.update(population)
+        record = stats.compile(population) if stats else {}
+        logbook.record(gen=gen, nevals=nevals, **record)
+        if verbose:
+            print(logbook.stream)
+
+    # Evaluate the initial population, as eaSimple does
+    invalid = [ind for ind in population if not ind.fitness.valid]
+    for ind, fit in zip(invalid, toolbox.map(toolbox.evaluate, invalid)):
+        ind.fitness.values = fit
+    log(0, len(invalid))
+
+    size = len(population)
+    budget = ngen * size
+    counts = {'made': 0, 'arrived': 0, 'nevals': 0}
+
+    def insert(ind):
+        # Replace the worst individual (which may be the new one)
+        population.append(ind)
+        population.remove(min(population, key=lambda i: i.fitness))
+
+        counts['arrived'] += 1
+        if counts['arrived'] % size == 0:
+            log(counts['arrived'] // size, counts['nevals'])
+            counts['nevals'] = 0
+
+    def make_offspring():
+        child, other = map(toolbox.clone, toolbox.select(population, 2))
+        if random.random() < cxpb:
+            child, other = toolbox.mate(child, other)
+            del child.fitness.values
+        if random.random() < mutpb:
+            child, = toolbox.mutate(child)
+            del child.fitness.values
+        return child
+
+    def evaluated(ind):
+        # The evaluation finds the result in `results`
+        ind.fitness.values = toolbox.evaluate(ind)
+        counts['nevals'] += 1
+        insert(ind)
+
+    # Offspring that wait for the result of a run, by key
+    waiting = {}
+
+    try:
+        while counts['arrived'] < budget:
+
+            # Give an offspring to each free Daemon
+            while counts['made'] < budget and (daemons is None or daemons.free):
+                child = make_offspring()
+                counts['made'] += 1
+
+                if child.fitness.valid:
+                    insert(child)
+                    continue
+
+                key = tuple(child)
+                params = individual_params(child)
+
+                if daemons is None or params is None or key in results:
+                    evaluated(child)
+                    continue
+
+                if key in waiting:
+                    waiting[key].append(child)
+                    continue
+
+                if store is not None:
+                    res = store.get(key)
+                    if res is None and not store.claim(key):
+                        # Another process runs it
+                        res = store.wait(key)
+                    if res is not None:
+                        results[key] = res
+                        evaluated(child)
+                        continue
+
+                daemons.submit(params, key)
+                waiting[key] = [child]
+
+            if not waiting:
+                continue
+
+            # Insert the first result that arrives
+            key, res, secs = daemons.next_result()
+            if isinstance(res, GeneratorTimeout):
+                record_failure(key, res)
+                if store is not None:
+                    store.release(key)
+            else:
+                results[key] = res
+                if store is not None:
+                    store.put(key, *res)
+
+            running_stats['total'] += round(secs)
+            running_stats['runs'] += 1
+
+            for child in waiting.pop(key):
+                evaluated(child)
+    finally:
+        if store is not None:
+            for key in waiting:
+                store.release(key)
+
+    return population, logbook
 
-        # Mutate this value with probability indpb
-        if random.random() < indpb:
 
-            # Make Gaussian Noise from upper and lower bounds
-            std = (up[i] - low[i])/4
-            div = np.random.normal(scale=std)
+def individual_generator():
+    """Generates an individual.
+    With some probability, picks an individual with good fitness from the 
+    previous results in variable `results` to create a not-random individual.
+
+    Returns:
+       [Individual]
+    """
 
-            if isinstance(ind[i], int):
+    global results
+    global opt
+    global creator
 
-                # Add noise to individual and round
-                x = int(ind[i]+div)
 
-                # Re adjust individual to bounds
-                x = max(x, low[i])
-                x = min(x, up[i])
+    # If enough results exist and with some probability
+    if len(results) > 10 and random.random() < 0.7:
 
-                if x > 200:
-                    ind[i] = 50*round(x/50)
-                else:
-                    ind[i] = x
+        # hof contains the top 10 individuals
+        hof = sorted(results.items(), key=lambda kv: crit(
+            kv[1][0], kv[1][1], opt))[:10]
 
-            elif isinstance(ind[i], float):
-                x = round(ind[i]+div, 2)
+        # From hof pick an individual at random
+        ind = list(random.choice(hof)[0])
 
-                # Re adjust individual to bounds
-                x = max(x, low[i])
-                x = min(x, up[i])
-                ind[i] = x
+    else: # else pick values at random from the ranges in PARAMETERS
+        ind = random_params()
 
-            else:
-                raise NotImplementedError(
-                    'mutate_ind only supports float or int')
-    return ind,
+    # Convert list to individual
+    return creator.Individual(ind) # pylint: disable=no-member
 
 
 my_parser = argparse.ArgumentParser(description='Runs the genetic algorithm on 5 of 6 parts.',
@@ -258,8 +800,79 @@ my_parser.add_argument('-fcode',
                        required=True,
                        help=colored('The files from which to read. This refers to files in ../../data/*/data_per_type/cross/type*/\n', 'cyan'))
 
+my_parser.add_argument('-workers',
+                       type=int,
+                       default=1,
+                       help=colored('Number of Daemons that evaluate the individuals of a generation in parallel.\n', 'cyan'))
+
+my_parser.add_argument('-store',
+                       type=str,
+                       default=DEFAULT_PATH,
+                       help=colored('SQLite database of the evaluations, shared with the other runs. Use none to not share them.\n', 'cyan'))
+
+my_parser.add_argument('-per_part',
+                       action='store_true',
+                       help=colored('Store the evaluations per part, so that the folds of the cross-validation share them. Each part is run on its own.\n', 'cyan'))
+
+my_parser.add_argument('-steady',
+                       action='store_true',
+                       help=colored('Asynchronous steady-state GA: each result is inserted in the population when it arrives, without waiting for the generation.\n', 'cyan'))
+
+my_parser.add_argument('-surrogate',
+                       type=float,
+                       default=None,
+                       help=colored('Fraction of the new individuals of a generation that are run, the most promising according to a surrogate model (see surrogate.py). Off by default.\n', 'cyan'))
+
+my_parser.add_argument('-explore',
+                       type=float,
+                       default=0.1,
+                       help=colored('With -surrogate, fraction of the new individuals that are also run, picked at random. Defaults to 0.1.\n', 'cyan'))
+
+my_parser.add_argument('-optimizer',
+                       type=str,
+                       default='ga',
+                       choices=BACKENDS,
+                       help=colored('Search of the parameters: the GA, CMA-ES, or batch Bayesian optimization (see optimizers.py). Defaults to ga.\n', 'cyan'))
+
+my_parser.add_argument('-cutoff',
+                       action='store_true',
+                       help=colored('Stop the evaluations that are proven worse than the best -pops results so far, from the output read before the end of the run.\n', 'cyan'))
+
+my_parser.add_argument('-race',
+                       action='store_true',
+                       help=colored('Run the new individuals one part at a time, and drop the ones that are clearly worse than the best after each part (see racing.py).\n', 'cyan'))
+
+my_parser.add_argument('-fidelity',
+                       type=str,
+                       default=None,
+                       help=colored('Successive halving: fractions of the ships (e.g. 0.1,0.3) on which the new individuals run first, before all the ships. Off by default.\n', 'cyan'))
+
+my_parser.add_argument('-advance',
+                       type=float,
+                       default=1/3,
+                       help=colored('With -fidelity, fraction of the individuals that go on to the next sample of the ships. Defaults to 1/3.\n', 'cyan'))
+
 args = my_parser.parse_args()
 
+if args.optimizer != 'ga' and args.steady:
+    my_parser.error('-steady only works with -optimizer ga')
+if args.optimizer == 'bo' and args.surrogate is not None:
+    my_parser.error('-surrogate does not work with -optimizer bo, which has its own model')
+
+if args.per_part and (args.workers > 1 or args.store == 'none'):
+    my_parser.error('-per_part needs -workers 1 and a -store')
+if args.cutoff and (args.per_part or args.steady):
+    my_parser.error('-cutoff does not work with -per_part or -steady')
+if args.fidelity is not None and (args.per_part or args.steady or args.surrogate is not None):
+    my_parser.error('-fidelity does not work with -per_part, -steady or -surrogate')
+if args.race and (args.store == 'none' or args.per_part or args.steady or args.surrogate is not None or args.cutoff or args.fidelity is not None):
+    my_parser.error('-race needs a -store, and does not work with -per_part, -steady, -surrogate, -cutoff or -fidelity')
+
+# The samples of the ships of -fidelity, smallest first (all the ships come after them)
+fractions = [] if args.fidelity is None else sorted(float(f) for f in args.fidelity.split(','))
+if any(not 0 < f < 1 for f in fractions):
+    my_parser.error('The fractions of -fidelity must be in (0, 1)')
+
 ship_type = str(args.type)
 part = args.p
 opt = args.opt
@@ -275,8 +888,9 @@ parts.remove(str(part))
 lows = [x[0] for x in PARAMETERS.values()]
 highs = [x[1] for x in PARAMETERS.values()]
 
-# Location where results are saved
-save_name = f'saves/{dataset}/type{ship_type}/{fcode}{part}.pkl'
+# Location where results are saved. The results of -per_part (and -race) add up runs on each part, where the tracks are cut
+# at the ends of the parts, so they are kept apart from those of the concatenated parts (that valuate.py, bounds.py and runner.py read)
+save_name = f'saves/{dataset}/type{ship_type}/{fcode}{part}{"_per_part" if args.per_part or args.race else ""}.pkl'
 eprint(colored(save_name, 'blue'))
 
 # Make directories if they dont exist
@@ -297,6 +911,22 @@ else:
         'runs': 0
     }
 
+# Lower bounds of the fitness of the individuals whose evaluation was stopped by -cutoff. They are not results, so they are not saved
+censored = {}
+
+# The individuals whose run was killed by the timeout of the Daemon (see supervisor.py), with the error. They get the fitness FAILED, and are not saved
+failed = {}
+
+# With -fidelity, the fitness of the individuals that did not go on to all the ships (not saved either),
+# and the Daemon (or pool), the store and the (RMSE, Ratio) of each sample of the ships
+low_fidelity = {}
+rung_runners = {}
+rung_stores = {}
+rung_results = {}
+
+# With -race, the fitness of the individuals that were eliminated before the last part (not saved either)
+raced = {}
+
 # Initialize dict for current running stats
 running_stats = {
     'total': 0,
@@ -340,21 +970,61 @@ stats.register("std", np.std)
 stats.register("min", np.min)
 stats.register("max", np.max)
 
+daemon = None
+pool = None
+
+# Evaluations shared with the other runs on the same parts
+store = None if args.store == 'none' else EvalStore(dataset, ship_type, parts, fcode, generator_version(), args.store)
+
+# With -per_part (or -race), the evaluations of each part, shared with the other folds, and a Daemon (or pool) for each part
+part_stores = None
+part_daemons = {}
+part_pools = {}
+if args.per_part or args.race:
+    part_stores = {p: PartStore(dataset, ship_type, p, fcode, generator_version(), args.store) for p in parts}
+
+# Killed: exit normally, so that the results are saved and the generators are killed
+signal.signal(signal.SIGTERM, exit_on_signal)
+
 try:
-    # Begin Daemon
-    daemon = Daemon(ship_type, parts, dataset, fcode)
+    if args.per_part:
+        # The Daemons of the parts start in run_part()
+        pass
+    elif args.race:
+        # The Daemons (or pools) of the parts start in race_part()
+        toolbox.register("map", race_map)
+    elif args.workers > 1:
+        # Begin a Daemon for each worker, and evaluate each generation on all of them
+        pool = AsyncDaemonPool(args.workers, ship_type, parts, dataset, fcode)
+        toolbox.register("map", parallel_map)
+    else:
+        # Begin Daemon
+        daemon = Daemon(ship_type, parts, dataset, fcode)
+
+    if args.surrogate is not None:
+        # Pre-screen the new individuals of each generation
+        surrogate_stats = {'saved': 0}
+        toolbox.register("map", screened_map)
+
+    if fractions:
+        # Run the new individuals of each generation on samples of the ships first
+        toolbox.register("map", fidelity_map)
 
     eprint(colored('\n ******** Starting Genetic Algo ********\n', 'yellow'))
 
     # Evaluate the default parameters to have that saved in the dictionary of results
-    evaluate(list(DEF_PARAMS))
+    list(toolbox.map(toolbox.evaluate, [list(DEF_PARAMS)]))  # pylint: disable=no-member
 
     # Run Genetic Algo
     # Since we keep all the individuals that were valuated, the hall of fame is useless.
     # The object that is passed in the hall of fame is so that it works like a hall of fame would have worked,
     # But in actuality keeps a progress bar of the progress of the GA
-    pop, log = algorithms.eaSimple(pop, toolbox, cxpb=cxpb, mutpb=mutpb,
+    if args.steady:
+        pop, log = ea_steady_state(pop, toolbox, cxpb=cxpb, mutpb=mutpb,
                                    ngen=ngen, stats=stats, verbose=True, halloffame=progress_bar(ngen))
+    else:
+        pop, log = run_optimizer(args.optimizer, pop, toolbox, cxpb=cxpb, mutpb=mutpb,
+                                 ngen=ngen, stats=stats, verbose=True, halloffame=progress_bar(ngen))
 
 finally:
     # Print Best Individual
@@ -366,6 +1036,9 @@ finally:
         print(colored('\t(RMSE, CompRatio) =', 'green'), hof[i][1])
         print()
 
+    if failed:
+        print(colored(f'{len(failed)} individuals were killed by the timeout of the generator, and are not saved', 'red'))
+
     # Print Current running Statistics
     if running_stats['runs'] > 0:
         print(colored('\nAvg Running Time this run is {}'.format(
@@ -385,6 +1058,22 @@ finally:
             pickle.dump(save, file)
 
     # End daemon
-    daemon.end()
+    if daemon is not None:
+        daemon.end()
+    if pool is not None:
+        pool.end()
+    for d in part_daemons.values():
+        d.end()
+    for part_pool in part_pools.values():
+        part_pool.end()
+    for runner in rung_runners.values():
+        runner.end()
+    for s in rung_stores.values():
+        s.close()
+    if store is not None:
+        store.close()
+    if part_stores is not None:
+        for s in part_stores.values():
+            s.close()
 
     eprint(colored('\n ******** Ended Genetic Algo ********\n', 'yellow'))
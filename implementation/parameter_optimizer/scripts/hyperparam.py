@@ -13,8 +13,9 @@ from deap import algorithms, base, creator, tools
 from termcolor import colored
 from tqdm import tqdm
 
-from local_lib import Daemon
-from local_lib import crit, PARAMETERS
+from eval_store import EvalStore
+from local_lib import Daemon, GeneratorTimeout
+from local_lib import crit, generator_version, mutate_ind, random_params, PARAMETERS
 
 
 def eprint(*args, **kwargs):
@@ -29,6 +30,7 @@ def evaluate(individual: List):  # pylint: disable=missing-function-docstring
     global daemon
     global running_stats
     global PARAMETERS
+    global store
 
     if tuple(individual) in results:
         # If already found this input, return the previous value
@@ -48,15 +50,30 @@ def evaluate(individual: List):  # pylint: disable=missing-function-docstring
         params[k] = individual[i]
         i += 1
 
-    # Save cur time
-    start_time = time()
-
-    # Run synopses and estimate RMSE and compression ratio
-    rmse, ratio = daemon.run_synopses(params)
-
-    # Save Running time to stats
-    running_stats['total'] += round(time() - start_time)
-    running_stats['runs'] += 1
+    def run():
+        # Save cur time
+        start_time = time()
+
+        # Run synopses and estimate RMSE and compression ratio
+        res = daemon.run_synopses(params)
+
+        # Save Running time to stats
+        running_stats['total'] += round(time() - start_time)
+        running_stats['runs'] += 1
+        return res
+
+    # Run only if no other process has evaluated them (or is evaluating them)
+    try:
+        rmse, ratio = store.evaluate(individual, run)
+    except GeneratorTimeout as e:
+        # Killed by the timeout of the generator (see supervisor.py): the claim is dropped, so another run tries it again,
+        # and it is not a result, so it is not saved
+        store.release(individual)
+        eprint(e, tuple(individual))
+        tail = e.stderr.strip().splitlines()[-5:]
+        if tail:
+            eprint('\n'.join(tail))
+        return 1e20,
 
     # Add result to results-dictionary
     results[tuple(individual)] = (rmse, ratio)
@@ -78,72 +95,10 @@ def individual_generator():
             kv[1][0], kv[1][1], opt))[:15]
         ind = list(random.choice(hof)[0])
     else:
-        ind = []
-        for v in PARAMETERS.values():
-            if isinstance(v[0], int):
-                x = random.randint(*v)
-                if x > 200:
-                    x = 50*round(x/50)
-                else:
-                    pass
-                ind.append(x)
-            elif isinstance(v[0], float):
-                ind.append(round(random.uniform(*v), 2))
-            else:
-                raise NotImplementedError(
-                    'Generator only supports int and float')
+        ind = random_params()
     return creator.Individual(ind)  # pylint: disable=no-member
 
 
-def mutate_ind(ind, low: List, up: List, indpb: float):
-    """Mutates an individual of values (int or float)    by adding gaussian noise with std proportional to the range of values/
-
-    Arguments:
-       ind {Individual}
-       low {List} -- List of values (int or float). Lower bounds for each parameter
-       up {List} -- List of values (int or float). Upper bounds for each parameter
-       indpb {float} -- Probability with which to mutate each characteristic
-
-    Returns:
-       Individual -- New individual
-    """
-
-    # Loop for every value of the individual
-    for i in range(len(ind)):
-
-        # Mutate cur value with probability indpb
-        if random.random() < indpb:
-
-            # Make Gaussian Noise from upper and lower bounds
-            std = (up[i] - low[i])/4
-            div = np.random.normal(scale=std)
-
-            if isinstance(ind[i], int):
-                # Add noise to individual
-                x = int(ind[i]+div)
-
-                # Re adjust individual to bounds
-                x = max(x, low[i])
-                x = min(x, up[i])
-                if x > 200:
-                    ind[i] = 50*round(x/50)
-                else:
-                    ind[i] = x
-
-            elif isinstance(ind[i], float):
-                x = round(ind[i]+div, 2)
-
-                # Re adjust individual to bounds
-                x = max(x, low[i])
-                x = min(x, up[i])
-                ind[i] = x
-
-            else:
-                raise NotImplementedError(
-                    'mutate_ind only supports float or int')
-    return ind,
-
-
 # Get ship type from arguments
 if len(sys.argv) < 4:
     print(colored('Not enough args. Give:\n{} ShipType Dataset FileCode'.format(
@@ -228,6 +183,9 @@ elif dataset == 'mtraffic':
 else:
     raise ValueError('Wrong dataset')
 
+# Evaluations shared with the other runs (and between the optimization options, since they are (RMSE, Ratio))
+store = EvalStore(dataset, ship_type, [''], fcode, generator_version())
+
 try:
     for x in tqdm(l1):
         for n in tqdm(l2):
@@ -265,3 +223,5 @@ finally:
         with open(save_name, 'wb') as file:
             save = (results, old_running_stats)
             pickle.dump(save, file)
+
+    store.close()
@@ -0,0 +1,273 @@
+"""Content-addressed cache of the input files that the Daemons place for the Synopses-Generator.
+
+An input file is the concatenation of the non-empty lines of some raw files (see `Daemon.place_input()`).
+It is stored once in `../../data/{dataset}/cache/placed/`, named after the sha1 of the contents of its raw files
+(the same key as `raw_cache.compose()`), so that every Daemon with the same input (e.g. the 48 Daemons of
+`hyperparam.py`) reuses it instead of copying the lines again:
+
+* `{key}.in` the input file.
+* `{key}.json` the sha1 of each raw file, in order, and the raw files themselves. Its modification time is the last use.
+
+A placed file is linked to the target of the Daemon. When the target is on another file system (e.g. the scratch
+folders in `/dev/shm`, see `transport.py`), the input is first copied once with `os.sendfile()` to a stage folder on
+that file system, and every Daemon links that copy; a staged copy is removed once no Daemon links it. A new input that extends a cached one (e.g. the months `1..m+1` of `r_genetic.py` after the months
+`1..m`) is built by copying the cached file and appending only the new raw files. The least recently used
+inputs are removed when the cache grows over `MAX_BYTES`.
+
+An input can also keep only the lines of some ships (see `raw_cache.subsample()`); it is cached under a key that
+includes the ships, and is always built from the raw files.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+from os.path import join
+from typing import Dict, List, Set, Tuple
+
+
+# Default upper bound of the size of the cache of a dataset
+MAX_BYTES = 2 << 30
+
+
+def cache_dir(data_folder: str) -> str:
+    """The folder of the placed inputs of a dataset."""
+    return join(data_folder, 'cache', 'placed')
+
+
+def input_key(digests: List[str]) -> str:
+    """The key of the input made of raw files with these sha1, in order (see `raw_cache.compose()`)."""
+    return hashlib.sha1(' '.join(digests).encode()).hexdigest()
+
+
+def read_entries(folder: str) -> Dict[str, Dict]:
+    """Reads the meta of every cached input of a folder.
+
+    Arguments:
+        folder {str} -- The cache folder
+
+    Returns:
+        Dict[str, Dict] -- Maps the key of each input to its meta, with its 'size' and last use 'used' added
+    """
+
+    entries = {}
+    for name in os.listdir(folder):
+        key, ext = os.path.splitext(name)
+        if ext != '.json':
+            continue
+        try:
+            with open(join(folder, name), 'r') as f:
+                meta = json.load(f)
+            meta['used'] = os.stat(join(folder, name)).st_mtime_ns
+            meta['size'] = os.stat(join(folder, key + '.in')).st_size
+        except (FileNotFoundError, ValueError):
+            continue
+        entries[key] = meta
+    return entries
+
+
+def longest_prefix(entries: Dict[str, Dict], digests: List[str]) -> Tuple[str, int]:
+    """Finds the cached input whose raw files are the longest prefix of some raw files.
+
+    Arguments:
+        entries {Dict[str, Dict]} -- The cached inputs, see `read_entries()`
+        digests {List[str]} -- The sha1 of the raw files
+
+    Returns:
+        Tuple[str, int] -- The key of the cached input and its number of raw files, or (None, 0)
+    """
+
+    best, n = None, 0
+    for key, meta in entries.items():
+        k = len(meta['digests'])
+        if n < k <= len(digests) and meta['digests'] == digests[:k]:
+            best, n = key, k
+    return best, n
+
+
+def copy_file(src: str, dst):
+    """Copies a file to an open binary file with `os.sendfile()`, without reading it in Python.
+
+    Arguments:
+        src {str} -- The file to copy
+        dst -- The binary file to write to, at its current position
+    """
+
+    dst.flush()
+    with open(src, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        out = dst.fileno()
+        offset = 0
+        while offset < size:
+            sent = os.sendfile(out, f.fileno(), offset, size - offset)
+            if sent == 0:
+                break
+            offset += sent
+    dst.seek(0, os.SEEK_END)
+
+
+def append_lines(sources: List[str], dst, ships: Set[bytes] = None):
+    """Appends the non-empty lines of some raw files to an open binary file, as `Daemon.place_input()` did.
+    If ships is given, only the lines of these ship-IDs are kept.
+    """
+
+    for src in sources:
+        with open(src, 'rb') as f:
+            for line in f:
+                if len(line) > 2 and (ships is None or line.split(b' ', 2)[1] in ships):
+                    dst.write(line)
+
+
+def link_or_copy(src: str, target: str):
+    """Makes target a hardlink of src, or a copy if they are on different file systems."""
+
+    if os.path.lexists(target):
+        os.remove(target)
+    try:
+        os.link(src, target)
+    except OSError:
+        with open(target, 'wb') as w:
+            copy_file(src, w)
+
+
+def stage(path: str, key: str, folder: str) -> str:
+    """The copy of a cached input in a stage folder, on the file system of the targets, made once for all the Daemons that link it.
+    The staged copies that are no longer linked by any Daemon are removed. Must be called with the lock of the stage folder.
+
+    Arguments:
+        path {str} -- The cached input
+        key {str} -- Its key
+        folder {str} -- The stage folder
+
+    Returns:
+        str -- The staged copy
+    """
+
+    staged = join(folder, key + '.in')
+    if not os.path.exists(staged):
+        tmp = f'{staged}.tmp{os.getpid()}'
+        with open(tmp, 'wb') as w:
+            copy_file(path, w)
+        os.rename(tmp, staged)
+
+    prune(folder, keep=staged)
+    return staged
+
+
+def prune(folder: str, keep: str = None):
+    """Removes the staged copies of a stage folder that no Daemon links. Must be called with the lock of the folder.
+
+    Arguments:
+        folder {str} -- The stage folder
+
+    Keyword Arguments:
+        keep {str} -- A copy that is not removed (default: {None})
+    """
+
+    for name in os.listdir(folder):
+        path = join(folder, name)
+        if name.endswith('.in') and path != keep and os.stat(path).st_nlink == 1:
+            os.remove(path)
+
+
+def unstage(folder: str):
+    """Removes the staged copies that no Daemon links, e.g. after a Daemon removed its input (see `Daemon.end()`)."""
+
+    if not os.path.isdir(folder):
+        return
+
+    with open(join(folder, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        prune(folder)
+
+
+def evict(folder: str, max_bytes: int, keep: str):
+    """Removes the least recently used inputs of a folder until its size is at most max_bytes.
+
+    Arguments:
+        folder {str} -- The cache folder
+        max_bytes {int} -- The upper bound of the size of the folder
+        keep {str} -- The key of an input that is not removed (the one just used)
+    """
+
+    entries = read_entries(folder)
+    total = sum(meta['size'] for meta in entries.values())
+
+    for key in sorted(entries, key=lambda k: entries[k]['used']):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        # The meta first, so that a half removed input is never found
+        os.remove(join(folder, key + '.json'))
+        os.remove(join(folder, key + '.in'))
+        total -= entries[key]['size']
+
+
+def place(sources: List[str], digests: List[str], target: str, data_folder: str, max_bytes: int = MAX_BYTES, ships: List[str] = None, stage_folder: str = None) -> str:
+    """Places the concatenation of the non-empty lines of some raw files in target, through the cache.
+
+    Arguments:
+        sources {List[str]} -- The raw files, in order
+        digests {List[str]} -- The sha1 of their contents (e.g. `raw_cache.load(src).digest`)
+        target {str} -- The input file to create
+        data_folder {str} -- The folder of the dataset
+
+    Keyword Arguments:
+        max_bytes {int} -- The upper bound of the size of the cache (default: {MAX_BYTES})
+        ships {List[str]} -- Keep only the lines of these ship-IDs (default: {None})
+        stage_folder {str} -- A folder on the file system of target, for the staged copies (see `stage()`), used when the cache
+            is on another file system. Without it, the input is copied to target (default: {None})
+
+    Returns:
+        str -- The key of the input
+    """
+
+    folder = cache_dir(data_folder)
+    os.makedirs(folder, exist_ok=True)
+
+    if ships is not None:
+        # The sample is a last item of the digests, so no input of all the ships is taken for a prefix of it, or the reverse
+        digests = digests + ['ships:' + hashlib.sha1(' '.join(ships).encode()).hexdigest()]
+
+    key = input_key(digests)
+    path = join(folder, key + '.in')
+    meta_path = join(folder, key + '.json')
+
+    # One process at a time builds or removes inputs, linking is quick
+    with open(join(folder, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        if not os.path.exists(meta_path):
+            prefix, n = longest_prefix(read_entries(folder), digests) if ships is None else (None, 0)
+
+            tmp = f'{path}.tmp{os.getpid()}'
+            with open(tmp, 'wb') as w:
+                if prefix is not None:
+                    copy_file(join(folder, prefix + '.in'), w)
+                append_lines(sources[n:], w, None if ships is None else {idd.encode() for idd in ships})
+            os.rename(tmp, path)
+
+            with open(meta_path, 'w') as f:
+                json.dump({'digests': digests, 'sources': sources}, f)
+
+        # Mark as used
+        os.utime(meta_path)
+
+        evict(folder, max_bytes, keep=key)
+
+        if stage_folder is None:
+            link_or_copy(path, target)
+            return key
+
+        os.makedirs(stage_folder, exist_ok=True)
+        if os.stat(stage_folder).st_dev == os.stat(folder).st_dev:
+            link_or_copy(path, target)
+            return key
+
+        # The lock of the cache is held, so the cached input is not evicted while it is staged
+        with open(join(stage_folder, '.lock'), 'w') as stage_lock:
+            fcntl.flock(stage_lock, fcntl.LOCK_EX)
+            link_or_copy(stage(path, key, stage_folder), target)
+
+    return key
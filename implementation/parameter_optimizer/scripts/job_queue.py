@@ -0,0 +1,182 @@
+"""A queue of shell commands in an SQLite database, shared by any number of `worker.py` processes.
+
+Each job has a state: 'queued', 'running', 'done' (exit code 0) or 'failed'. A worker takes the oldest queued job by `claim()`,
+in a single `BEGIN IMMEDIATE` transaction, so no two workers get the same job, and records its exit code and duration by `finish()`.
+A running job whose worker died (see `eval_store.is_alive()`) is queued again by the next `claim()`, so it is not lost.
+"""
+
+import os
+import sqlite3
+import time
+from typing import List, Tuple
+
+from eval_store import BUSY_TIMEOUT, is_alive, process_id
+
+
+# Default location of the database, next to the one of the evaluations
+DEFAULT_PATH = 'saves/jobs.sqlite'
+
+STATES = ('queued', 'running', 'done', 'failed')
+
+
+class JobQueue:
+    """The jobs of a database.
+
+    Example:
+        queue = JobQueue()
+        queue.enqueue(['python3 genetic.py ...'])
+        job = queue.claim()
+        if job is not None:
+            queue.finish(job[0], os.system(job[1]), secs)
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """Opens (or creates) the database.
+
+        Keyword Arguments:
+            path {str} -- The database file (default: {DEFAULT_PATH})
+        """
+
+        self.owner = process_id()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, cmd TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'queued',
+            owner TEXT, tries INTEGER NOT NULL DEFAULT 0, exit_code INTEGER, started REAL, secs REAL)''')
+
+
+    def enqueue(self, cmds: List[str]) -> List[int]:
+        """Adds some commands at the end of the queue.
+
+        Arguments:
+            cmds {List[str]} -- The shell commands
+
+        Returns:
+            List[int] -- The id of each job
+        """
+
+        ids = []
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            for cmd in cmds:
+                ids.append(self.conn.execute('INSERT INTO jobs (cmd) VALUES (?)', (cmd,)).lastrowid)
+        return ids
+
+
+    def enqueue_file(self, path: str) -> List[int]:
+        """Moves the commands of a file (one on each non-empty line, as the old `runs.info`) to the queue, and empties the file.
+        The file is read and emptied in the transaction, so when several workers do it at once, each command is queued once.
+
+        Arguments:
+            path {str} -- The file
+
+        Returns:
+            List[int] -- The id of each job
+        """
+
+        if not os.path.exists(path):
+            return []
+
+        ids = []
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            with open(path) as f:
+                cmds = [line.strip() for line in f if len(line.strip()) >= 2]
+            for cmd in cmds:
+                ids.append(self.conn.execute('INSERT INTO jobs (cmd) VALUES (?)', (cmd,)).lastrowid)
+            if cmds:
+                open(path, 'w').close()
+        return ids
+
+
+    def requeue_dead(self) -> int:
+        """Queues again the running jobs whose worker died. Must be called in a transaction.
+
+        Returns:
+            int -- The number of jobs queued again
+        """
+
+        dead = [job_id for job_id, owner in self.conn.execute("SELECT id, owner FROM jobs WHERE state='running'") if not is_alive(owner)]
+        for job_id in dead:
+            self.conn.execute("UPDATE jobs SET state='queued', owner=NULL WHERE id=?", (job_id,))
+        return len(dead)
+
+
+    def claim(self) -> Tuple[int, str]:
+        """Takes the oldest queued job, after queueing again the ones of dead workers.
+
+        Returns:
+            Tuple[int, str] -- The id and the command of the job, or None if no job is queued
+        """
+
+        # Commits when the block ends, or rolls back on an error
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.requeue_dead()
+
+            row = self.conn.execute("SELECT id, cmd FROM jobs WHERE state='queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+
+            self.conn.execute("UPDATE jobs SET state='running', owner=?, tries=tries+1, exit_code=NULL, started=?, secs=NULL WHERE id=?",
+                              (self.owner, time.time(), row[0]))
+            return row
+
+
+    def finish(self, job_id: int, exit_code: int, secs: float):
+        """Records the end of a job of this worker.
+
+        Arguments:
+            job_id {int} -- The id of the job
+            exit_code {int} -- The exit code of the command ('done' if 0, else 'failed')
+            secs {float} -- The duration
+        """
+
+        self.conn.execute('UPDATE jobs SET state=?, exit_code=?, secs=?, owner=NULL WHERE id=? AND owner=?',
+                          ('done' if exit_code == 0 else 'failed', exit_code, secs, job_id, self.owner))
+
+
+    def retry(self, ids: List[int] = None) -> int:
+        """Queues again failed jobs.
+
+        Keyword Arguments:
+            ids {List[int]} -- The jobs, or None for all the failed ones (default: {None})
+
+        Returns:
+            int -- The number of jobs queued again
+        """
+
+        if ids is None:
+            return self.conn.execute("UPDATE jobs SET state='queued', exit_code=NULL, secs=NULL WHERE state='failed'").rowcount
+        return sum(self.conn.execute("UPDATE jobs SET state='queued', exit_code=NULL, secs=NULL WHERE state='failed' AND id=?", (i,)).rowcount for i in ids)
+
+
+    def jobs(self, states: List[str] = None) -> List[Tuple]:
+        """The jobs, oldest first.
+
+        Keyword Arguments:
+            states {List[str]} -- Only the jobs in these states, or None for all (default: {None})
+
+        Returns:
+            List[Tuple] -- (id, cmd, state, owner, tries, exit_code, started, secs) of each job
+        """
+
+        rows = self.conn.execute('SELECT id, cmd, state, owner, tries, exit_code, started, secs FROM jobs ORDER BY id').fetchall()
+        return [row for row in rows if states is None or row[2] in states]
+
+
+    def counts(self) -> dict:
+        """The number of jobs in each state."""
+
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(self.conn.execute('SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+        return counts
+
+
+    def close(self):
+        """Closes the database."""
+        self.conn.close()
@@ -1,16 +1,35 @@
 """Import for controlling the synopses, as well as important global variables/functions
 """
 
-import json
+import asyncio
+import fcntl
+import functools
+import hashlib
+import multiprocessing
 import os
+import random
 import shutil
-from collections import OrderedDict
+import signal
+import time
+import weakref
+from collections import Counter, OrderedDict
 from copy import deepcopy
 from math import asin, cos, radians, sin, sqrt
+from multiprocessing.connection import wait
 from os.path import join
 from shutil import copyfile
-from subprocess import PIPE, Popen
-from typing import Dict, List, Tuple
+from subprocess import PIPE, TimeoutExpired
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Tuple, Union
+
+import numpy as np
+
+import input_cache
+import output_parser
+import py_synopses
+import raw_cache
+import supervisor
+import transport
+from supervisor import GeneratorTimeout, Supervised
 
 
 # The mapping from type number to name
@@ -44,6 +63,11 @@ PARAMETERS = OrderedDict([
 # Default parameters
 DEF_PARAMS = (4, 1800, 5, 3600, 0.5, 50.0, 0.25, 5.0)
 
+# Synopses parameters that change which points are noise.
+# The noise filter itself only uses constants of the template (val_MAX_SPEED_THRESHOLD, val_MAX_RATE_OF_TURN, etc.),
+# but it is skipped for slow ships (LOW_SPEED_THRESHOLD) and after the state of a ship is purged (GAP_PERIOD, HISTORY_PERIOD).
+NOISE_PARAMETERS = ('GAP_PERIOD', 'HISTORY_PERIOD', 'LOW_SPEED_THRESHOLD')
+
 # Brest GA's parameters when opt func was $Ratio + ReLU(RMSE - 10)$
 # OPT_BREST_PARAMS = {
 #     '60': [6.4, 200, 38, 4200, 1.15, 49.81, 0.32, 7.76],
@@ -104,6 +128,61 @@ TYPE_TO_TYPE = {
     '90': '0'
 }
 
+def round_param(x: float, low: Union[int, float], high: Union[int, float]) -> Union[int, float]:
+    """Rounds the value of a parameter as the genetic algorithms make them: ints (multiples of 50 above 200)
+    and floats with 2 decimals, within the range of the parameter.
+
+    Arguments:
+        x {float} -- The value
+        low {Union[int, float]} -- Lower bound of the parameter (its type is the type of the parameter)
+        high {Union[int, float]} -- Upper bound of the parameter
+
+    Returns:
+        Union[int, float] -- The rounded value
+    """
+
+    if isinstance(low, int):
+        x = min(max(int(x), low), high)
+        return 50*round(x/50) if x > 200 else x
+    if isinstance(low, float):
+        return min(max(round(float(x), 2), low), high)
+    raise NotImplementedError('Parameters can only be int or float')
+
+
+def random_params() -> List:
+    """Random values of the parameters, uniform in the ranges of PARAMETERS and rounded by `round_param()`.
+
+    Returns:
+        List -- The values, in the order of PARAMETERS
+    """
+
+    return [round_param(random.randint(*v) if isinstance(v[0], int) else random.uniform(*v), *v)
+            for v in PARAMETERS.values()]
+
+
+def mutate_ind(ind, low: List, up: List, indpb: float):
+    """Mutates an individual of values (int or float)
+    by adding gaussian noise with std proportional to the range of values.
+
+    Arguments:
+        ind {Individual} -- The individual to mutate
+        low {List} -- List of values (int or float). Lower bounds for each parameter
+        up {List} -- List of values (int or float). Upper bounds for each parameter
+        indpb {float} -- Probability with which to mutate each characteristic
+
+    Returns:
+        Individual -- New individual
+    """
+
+    for i in range(len(ind)):
+        if random.random() < indpb:
+
+            # Gaussian noise with a std of a quarter of the range
+            div = np.random.normal(scale=(up[i] - low[i])/4)
+            ind[i] = round_param(ind[i] + div, low[i], up[i])
+    return ind,
+
+
 def crit(rmse: float, ratio: float, option: str) -> float:
     """Transforms rmse and ratio values to a single number, i.e. the optimization funciton
 
@@ -143,6 +222,56 @@ def crit(rmse: float, ratio: float, option: str) -> float:
     raise RuntimeError('Wrong value for optimizaton criterion')
 
 
+def pareto_front(results: Dict[Tuple, Tuple[float, float]]) -> List[Tuple[Tuple, Tuple[float, float]]]:
+    """The evaluated parameters that no other parameters beat in both RMSE and Ratio.
+    Every option of `crit()` grows with the RMSE and the Ratio, so its best parameters are always on the front.
+
+    Arguments:
+        results {Dict[Tuple, Tuple[float, float]]} -- Maps synopses parameters to (RMSE, Ratio)
+
+    Returns:
+        List[Tuple[Tuple, Tuple[float, float]]] -- The (parameters, (RMSE, Ratio)) of the front, sorted by RMSE
+    """
+
+    front = []
+    best_ratio = float('inf')
+
+    # By RMSE, then Ratio: a point is on the front if its Ratio is lower than that of every point before it
+    for params, (rmse, ratio) in sorted(results.items(), key=lambda kv: kv[1]):
+        if ratio < best_ratio:
+            front.append((params, (rmse, ratio)))
+            best_ratio = ratio
+
+    return front
+
+
+def best_on_front(front: List[Tuple[Tuple, Tuple[float, float]]], option: str = None, max_rmse: float = None, max_ratio: float = None) -> Tuple[Tuple, Tuple[float, float]]:
+    """Picks a point of a Pareto front (see `pareto_front()`): the best for an option of `crit()`, among the points within the bounds.
+    Without an option, the lowest Ratio (or the lowest RMSE, if only max_ratio is given).
+
+    Arguments:
+        front {List[Tuple[Tuple, Tuple[float, float]]]} -- The front
+
+    Keyword Arguments:
+        option {str} -- Option of `crit()` (default: {None})
+        max_rmse {float} -- Upper bound of the RMSE (default: {None})
+        max_ratio {float} -- Upper bound of the Ratio (default: {None})
+
+    Returns:
+        Tuple[Tuple, Tuple[float, float]] -- The (parameters, (RMSE, Ratio)), or None if no point is within the bounds
+    """
+
+    points = [kv for kv in front if (max_rmse is None or kv[1][0] <= max_rmse) and (max_ratio is None or kv[1][1] <= max_ratio)]
+    if not points:
+        return None
+
+    if option is not None:
+        return min(points, key=lambda kv: crit(kv[1][0], kv[1][1], option))
+    if max_rmse is None and max_ratio is not None:
+        return min(points, key=lambda kv: kv[1][0])
+    return min(points, key=lambda kv: kv[1][1])
+
+
 def interpolate(lon1: float, lat1: float, t1: int, lon2: float, lat2: float, t2: int, t: int) -> Tuple[float, float]:
     """Estimate the time-synchronized interpolated location at time t between two
     other timestamped locations (lon1, lat1, t1) and (lon2, lat2, t2) georeferenced at WGS84.
@@ -243,6 +372,24 @@ def estimate_RMSE(in_data: Dict[str, List[Tuple]], out_data: Dict[str, List[Tupl
         Tuple[float, float] -- RMSE and Compression Ratio
     """
 
+    total_rmse, total_raw_points, total_approx_points = reference_error_sums(in_data, out_data, noise, proj)
+
+    # Calculate total error
+    total_rmse = sqrt(total_rmse/total_raw_points)
+
+    # Calculate Compression Ratio
+    total_ratio = total_approx_points/total_raw_points
+
+    return total_rmse, total_ratio
+
+
+def reference_error_sums(in_data: Dict[str, List[Tuple]], out_data: Dict[str, List[Tuple]], noise: Dict[str, Dict[Tuple, int]], proj: bool = False) -> Tuple[float, int, int]:
+    """The loop of `estimate_RMSE()`, with the same arguments: the sums that give the RMSE and Ratio, as `squared_error_sums()` gives them.
+
+    Returns:
+        Tuple[float, int, int] -- Sum of squared errors, number of uncompressed points, number of compressed points
+    """
+
     total_rmse = 0.0
     total_raw_points = 0
     total_approx_points = 0
@@ -257,426 +404,1357 @@ def estimate_RMSE(in_data: Dict[str, List[Tuple]], out_data: Dict[str, List[Tupl
         # Get list of approximate-compressed points, sorted in time
         approx = sorted(out_data[idd], key=lambda t: t[2])
 
-        n = len(raw)
-        m = len(approx)
-
         # Add to total apprroximate points the number of (unique) critical points
         total_approx_points += len(set(map(lambda t: t[2], approx)))
 
-        i = 0
-        rmse = 0
+        # Add error and raw points of this ship to previously computed ones
+        rmse, raw_points = vessel_squared_error(idd, raw, approx, noise, proj)
+        total_rmse += rmse
+        total_raw_points += raw_points
 
-        for j in range(m-1):
+    return total_rmse, total_raw_points, total_approx_points
 
-            # Get first approx point
-            lon1 = approx[j][0]
-            lat1 = approx[j][1]
-            t1 = approx[j][2]
 
-            # Get second approx point
-            lon2 = approx[j+1][0]
-            lat2 = approx[j+1][1]
-            t2 = approx[j+1][2]
+def vessel_squared_error(idd: str, raw: List[Tuple], approx: List[Tuple], noise: Dict[str, Dict[Tuple, int]], proj: bool = False) -> Tuple[float, int]:
+    """The inner loop of `estimate_RMSE()`: the sum of squared errors of a single ship.
 
-            if t1 > t2:
-                raise RuntimeError('Approximate Data not in order')
+    Arguments:
+        idd {str} -- The ship-ID
+        raw {List[Tuple[float,float,int]]} -- Uncompressed points of the ship (lon,lat,t), in the order they were reported
+        approx {List[Tuple[float,float,int]]} -- Compressed points of the ship (lon,lat,t), sorted in time
+        noise {Dict[str, Dict[Tuple[float, float, int], int]]} -- Noisy points, as in `estimate_RMSE()`. The counters are reduced.
 
-            # Iterate over the respective items of RAW data during the specified time interval
-            while i < n:
+    Keyword Arguments:
+        proj {bool} -- Whether to use a projection instead of time interpolation (default: {False})
 
-                # Get raw point
-                lon = raw[i][0]
-                lat = raw[i][1]
-                t = raw[i][2]
+    Returns:
+        Tuple[float, int] -- The sum of squared errors and the number of raw points it was computed on
+    """
 
-                # Make key for noise dictionary
-                k = (lon, lat, t)
+    n = len(raw)
+    m = len(approx)
 
-                # Ignore points before first point
-                if t < t1:
-                    i += 1
-                # If raw point is noisy ignore it
-                elif idd in noise and k in noise[idd] and noise[idd][k] > 0:
-                    i += 1
-                    noise[idd][k] -= 1
-                # Else, it holds that t \in [t1,t2]
-                # Calculate distance of raw point from approximation
-                elif t <= t2:
-
-                    # Increase the counter of raw points
-                    total_raw_points += 1
-
-                    if proj:
-                        # Simply project point into line
-                        est_lon, est_lat = project(lon1, lat1, lon2, lat2, lon, lat)
-                    else:
-                        # Estimated location after interpolation at time t
-                        est_lon, est_lat = interpolate(lon1, lat1, t1, lon2, lat2, t2, t)
-
-                    # Deviation between raw and interpolated location
-                    h = haversine(lon, lat, est_lon, est_lat)
-
-                    # Update summation of error values
-                    rmse += h * h
-                    i += 1
-                else:
-                    break  # Consider the next time interval between successive locations in the COMPRESSED dataset
+    i = 0
+    rmse = 0
+    raw_points = 0
 
-        # Add error to previously computed errors
-        total_rmse += rmse
+    for j in range(m-1):
 
-    # Calculate total error
-    total_rmse = sqrt(total_rmse/total_raw_points)
+        # Get first approx point
+        lon1 = approx[j][0]
+        lat1 = approx[j][1]
+        t1 = approx[j][2]
 
-    # Calculate Compression Ratio
-    total_ratio = total_approx_points/total_raw_points
+        # Get second approx point
+        lon2 = approx[j+1][0]
+        lat2 = approx[j+1][1]
+        t2 = approx[j+1][2]
 
-    return total_rmse, total_ratio
+        if t1 > t2:
+            raise RuntimeError('Approximate Data not in order')
 
+        # Iterate over the respective items of RAW data during the specified time interval
+        while i < n:
 
-class Daemon:
-    """Daemon made for controling the synopses. It makes that correct files, passes the parameters, uses flink, etc.
-    """
+            # Get raw point
+            lon = raw[i][0]
+            lat = raw[i][1]
+            t = raw[i][2]
 
-    def __init__(self, ship_type: str, parts: List[str], dataset: str, file_names: List[str], one_file: bool = False, syn_prints_noise: str = 'true'):        
-        """Constructor. Initializes input files and commands that will be used to run app.
+            # Make key for noise dictionary
+            k = (lon, lat, t)
 
-        Arguments:
-            ship_type (str): The number that corresponds to the ship type.
-            parts (List[str]): A list of the parts to run on. (the strings in the list should be numbers).
-            dataset (str): The dataset to use. Possible values: The folders of '../../data/'
-            file_names (List[str]): [description]
-            one_file (bool, optional): [description]. Defaults to False.
-            syn_prints_noise (str, optional): Whether the Synopses-Generator will output noisy points or noiseless points. Defaults to 'true'.
-        """
+            # Ignore points before first point
+            if t < t1:
+                i += 1
+            # If raw point is noisy ignore it
+            elif idd in noise and k in noise[idd] and noise[idd][k] > 0:
+                i += 1
+                noise[idd][k] -= 1
+            # Else, it holds that t \in [t1,t2]
+            # Calculate distance of raw point from approximation
+            elif t <= t2:
 
-        self.home = os.path.expanduser('~/infore')
-        scripts_fold = join(self.home, 'datacron/implementation/parameter_optimizer/scripts')
+                # Increase the counter of raw points
+                raw_points += 1
 
-        # If temp folder does not exist, create it
-        if not os.path.exists('tmp'):
-            os.mkdir('tmp')
+                if proj:
+                    # Simply project point into line
+                    est_lon, est_lat = project(lon1, lat1, lon2, lat2, lon, lat)
+                else:
+                    # Estimated location after interpolation at time t
+                    est_lon, est_lat = interpolate(lon1, lat1, t1, lon2, lat2, t2, t)
 
-        # File that contains ids of other applications. To know what this is read the Daemon entry in ReadMe.md.
-        self.ids_file = join(scripts_fold, 'tmp/ids.txt')
-
-        # Create application unique id
-        self.id = ''
-        if os.path.exists(self.ids_file):
-            with open(self.ids_file, 'r') as f:
-                taken = set(f.read().split())
-                for i in range(10):
-                    j = str(i)
-                    if j not in taken:
-                        taken.add(j)
-                        self.id = j
-                        break
-            if self.id == '':
-                raise RuntimeError('All ids taken')
-        else:
-            taken = ['0']
-            self.id = '0'
+                # Deviation between raw and interpolated location
+                h = haversine(lon, lat, est_lon, est_lat)
 
-        # Store new file with previous ids + this application id
-        with open(self.ids_file, 'w') as f:
-            for i in taken:
-                f.write(i + ' ')
+                # Update summation of error values
+                rmse += h * h
+                i += 1
+            else:
+                break  # Consider the next time interval between successive locations in the COMPRESSED dataset
 
-        self.type = ship_type
+    return rmse, raw_points
 
-        # File location from where input data for the compression will be read
-        self.input_file = join(scripts_fold, 'tmp/type{}.in'.format(self.id))
 
-        # File location where 1st output data will be stored (critical points without gap_start).
-        self.output_file = join(scripts_fold, 'tmp/type{}.out'.format(self.id))
+# A track holds the points of a single ship as three aligned arrays: (lon, lat, t)
+Track = Tuple[np.ndarray, np.ndarray, np.ndarray]
 
-        # File location where 2nd output data will be stored (noisy or noiseless points, depending on the value of param `syn_prints_noise`).
-        self.noise_file = join(scripts_fold, 'tmp/type{}_loc.out'.format(self.id))
 
-        # File location where 3rd output data will be stored (originally called notifications, is basically gap_start critical points)
-        self.not_file = join(scripts_fold, 'tmp/type{}_not.out'.format(self.id))
+def to_track(points: Union[List[Tuple], Track]) -> Track:
+    """Converts a list of points (lon,lat,t) to a track. Tracks are returned as they are.
 
-        # Template-File that will be modified to include the right set of parameters each time
-        self.template_file_loc = join(self.home, 'datacron/implementation/parameter_optimizer/parameters/maritime_config_template.properties')
-        if not os.path.exists(self.template_file_loc):
-            raise FileNotFoundError(f'Template file does not exist in {self.template_file_loc}')
+    Arguments:
+        points {Union[List[Tuple[float,float,int]], Track]} -- The points of a ship
 
-        # Location of file that will include the parameters used for the synopses
-        self.param_file_loc = join(scripts_fold, 'tmp/maritime_config{}.properties'.format(self.id))
+    Returns:
+        Track -- The arrays (lon, lat, t), with dtypes float64, float64 and int64
+    """
 
-        # Jar file location to run from
-        self.synopses_jar_loc = join(self.home, 'datacron/implementation/synopses_generator/target/datacron_trajectory_synopses-0.7-type{}.jar'.format(self.id))
+    if isinstance(points, tuple):
+        return points
 
-        # Command that starts application and gives it as an argument the unique id and the input/outputfiles
-        self.start_app = [
-            'nice',
-            join(self.home, 'flink-0.10.2/bin/flink'),
-            'run',
-            '-c',
-            'eu.datacron.synopses.maritime.TrajectoryStreamManager',
-            self.synopses_jar_loc,
-            self.id, 
-            self.input_file,
-            self.output_file,
-            self.noise_file,
-            self.not_file,
-            syn_prints_noise # 'true' or 'false': whether to print noiseless or noisy messages. Noisy messages are fewer => runs faster
-        ]
+    if len(points) == 0:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
 
-        if not os.path.exists(self.synopses_jar_loc):
-            raise FileNotFoundError(f'Synopses jar file does not exist in {self.synopses_jar_loc}. Run make.py in that folder')
+    lon, lat, t = zip(*points)
+    return np.array(lon, dtype=np.float64), np.array(lat, dtype=np.float64), np.array(t, dtype=np.int64)
 
-        # Location where input data are stored
-        self.data_folder = join(self.home, 'datacron/implementation/data/{}/'.format(dataset))
 
-        if not isinstance(file_names, list):
-            file_names = [file_names]
+def interpolate_np(lon1: np.ndarray, lat1: np.ndarray, t1: np.ndarray, lon2: np.ndarray, lat2: np.ndarray, t2: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched version of `interpolate()`. All arguments are arrays of the same length.
 
-        if not one_file:
-            # Place correct input file with desired time-length and ship-type
-            self.place_input(ship_type, parts, file_names=file_names)
-        else:
-            self.place_input2(ship_type)
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- Interpolated (lon, lat)
+    """
 
-    def place_input(self, ship_type: str, parts: List[str], file_names: List[str]):
-        """Creates a concatenate input file, from where the synopses will be created.
+    # Where timestamps coincide, divide by 1 and then pick the second position
+    ordered = t2 > t1
+    dt = np.where(ordered, t2 - t1, 1)
 
-        Arguments:
-           ship_type {str} -- The nmber that indicates the type of ship
-           parts {List[str]} -- A list that contains all the parts to use.
-           file_names {List[str]} -- A list of the file names to use e.g. month, march, etc. See `../../data`.
-        """
+    lon = np.where(ordered, lon1 + (t - t1) * (lon2 - lon1) / dt, lon2)
+    lat = np.where(ordered, lat1 + (t - t1) * (lat2 - lat1) / dt, lat2)
+    return lon, lat
 
-        # Copy file from ../../data/
-        with open(self.input_file, 'w') as w: # open target file
-            for file_name in file_names:
-                for p in parts:
 
-                    # For each combination of part and file_name
-                    src = join(self.data_folder, f'data_per_type/cross/type{ship_type}/{file_name}{p}.csv')
-                    # Copy the lines to the target file
-                    for line in open(src, 'r'):
-                        if len(line) > 2:
-                            w.write(line)
+def project_np(lon1: np.ndarray, lat1: np.ndarray, lon2: np.ndarray, lat2: np.ndarray, lon: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched version of `project()`. All arguments are arrays of the same length.
 
-        self.save_input_file_to_dict()
+    Returns:
+        Tuple[np.ndarray, np.ndarray] -- Projected (lon, lat)
+    """
 
+    same = (lon1 == lon2) & (lat1 == lat2)
 
-    def place_input2(self, ship_type: str):
-        """Creates an input file, from where the Synopses-Generator will read the input.
-        Copies from only one file, `../../data/{dataset}/data_per_type/all/type_x.csv`.
+    a = -(lat2-lat1)
+    b = lon2-lon1
+    c = lon1*(lat2-lat1) - lat1*(lon2-lon1)
+    d = np.where(same, 1.0, a**2 + b**2)
 
-        Arguments:
-           ship_type {str} -- The nmber that indicates the type of ship
-        """
+    est_lon = np.where(same, lon1, (b*(b*lon - a*lat) - a*c)/d)
+    est_lat = np.where(same, lat1, (a*(-b*lon + a*lat) - b*c)/d)
+    return est_lon, est_lat
 
-        # Copy file from data/
-        with open(self.input_file, 'w') as w:
-            src = join(self.data_folder, 'data_per_type/all/type_{}.csv'.format(ship_type))
-            for line in open(src, 'r'):
-                if len(line) > 2:
-                    w.write(line)
 
-        self.save_input_file_to_dict()
+def haversine_np(lon1: np.ndarray, lat1: np.ndarray, lon2: np.ndarray, lat2: np.ndarray) -> np.ndarray:
+    """Batched version of `haversine()`. All arguments are arrays of the same length.
 
+    Returns:
+        np.ndarray -- haversine distances in meters
+    """
 
-    def save_input_file_to_dict(self):
-        """Reads self.input_file and saves it to a dictionary.
+    # convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(np.radians, [lon1, lat1, lon2, lat2])
 
-        Raises:
-            RuntimeError: In case self.input_file is empty.
-        """        
+    # haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat/2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    c = 2 * np.arcsin(np.sqrt(a))
+    r = 6371000    # Approximate radius of the Earth in meters
+    return c * r   # distance in meters
 
-        # Dictionary that contains points
-        # The key is an string, the id of the ship
-        # The value is a list of tuples: (lon,lat,t)
-        self.in_data = {} # pylint: disable=attribute-defined-outside-init
 
-        for x in open(self.input_file, 'r'):
-            words = x.split(' ') # File is a space separated .csv file
-            idd = words[1] # ID might not be an int
-            lon = float(words[2])
-            lat = float(words[3])
-            t = int(words[0])
+def noise_counts_to_mask(raw: Track, counts: Dict[Tuple, int], t_start: int) -> np.ndarray:
+    """Translates the noise counters of a ship to a boolean mask over its raw points.
+    As in `estimate_RMSE()`, a point (lon,lat,t) that was reported as noise k times masks
+    its first k occurrences that are not earlier than the first compressed point.
 
-            # If id not in data initialize with empty list
-            if idd not in self.in_data:
-                self.in_data[idd] = []
+    Arguments:
+        raw {Track} -- The raw points of the ship, sorted in time
+        counts {Dict[Tuple[float, float, int], int]} -- How many times each point was reported as noise
+        t_start {int} -- Timestamp of the first compressed point of the ship
 
-            # Append to list: (lon, lat, t)
-            self.in_data[idd].append((lon, lat, t))
+    Returns:
+        np.ndarray -- Boolean mask, True for the raw points to ignore
+    """
 
-        if len(self.in_data) == 0:
-            raise RuntimeError("Couldn't Read Raw Data")
+    lon, lat, t = raw
+    mask = np.zeros(len(t), dtype=bool)
 
+    for (k_lon, k_lat, k_t), c in counts.items():
+        if c <= 0 or k_t < t_start:
+            continue
 
-    def make_config(self, params: Dict[str, int]):
-        """Function that creates the config file that will contain the paramaters
-        """
+        # Raw points are sorted in time, so the candidates are a contiguous range
+        lo = np.searchsorted(t, k_t, side='left')
+        hi = np.searchsorted(t, k_t, side='right')
+        hits = lo + np.flatnonzero((lon[lo:hi] == k_lon) & (lat[lo:hi] == k_lat))
+        mask[hits[:c]] = True
 
-        # Copy template file to location from where Synopses-Generator reads the params
-        shutil.copyfile(self.template_file_loc, self.param_file_loc)
+    return mask
 
-        with open(self.param_file_loc, 'a') as f:  # Append new params to template
-            for k, v in params.items():
-                f.write('val_' + k)  # Append param name
-                f.write('=')
-                f.write(str(v))  # Append param value
-                f.write('\n')
 
+def track_squared_error(raw: Track, approx: Track, noise_mask: np.ndarray = None, proj: bool = False) -> Tuple[float, int]:
+    """Vectorized counterpart of `vessel_squared_error()`. Raw points MUST be sorted in time.
 
-    def read_synopses_files(self) -> Tuple[Dict, Dict]:
-        """Func that reads and merges the output of the synopses
+    Each raw point in [t_first, t_last] of the compressed points is matched to the first segment
+    of consecutive compressed points (t1, t2] that contains it (found with a binary search),
+    and the error of all points is computed at once.
 
-        Returns:
-            Tuple -- A 2-tuple containing the output data and the noisy points.
-                     If the output was not read, returns None
-        """
+    Arguments:
+        raw {Track} -- Uncompressed points of the ship, sorted in time
+        approx {Track} -- Compressed points of the ship, sorted in time
 
-        # Similar to self.in_data:
-        # Dict of ID to list,
-        # where list contains tuples: (lon,lat,t)
-        out_data = {}
+    Keyword Arguments:
+        noise_mask {np.ndarray} -- Boolean mask over the raw points, True for the noisy ones (default: {None})
+        proj {bool} -- Whether to use a projection instead of time interpolation (default: {False})
 
-        # wrong=True if not read anything
-        wrong = True
+    Returns:
+        Tuple[float, int] -- The sum of squared errors and the number of raw points it was computed on
+    """
 
-        # For each point in critical points
-        for point in open(self.output_file, 'r'):
-            if len(point) > 1:
-                wrong = False
-                # Translate json and get id
-                t = json.loads(point)
-                idd = t['id']
+    lon, lat, t = raw
+    a_lon, a_lat, a_t = approx
 
-                # Create list for that id
-                if idd not in out_data:
-                    out_data[idd] = []
+    if len(a_t) < 2:
+        return 0.0, 0
 
-                # Append point info to list, as a tuple
-                out_data[idd].append((
-                    t['longitude'],
-                    t['latitude'],
-                    t['timestamp']
-                ))
+    # Raw points inside the span of the compressed points, which are not noise
+    keep = (t >= a_t[0]) & (t <= a_t[-1])
+    if noise_mask is not None:
+        keep &= ~noise_mask
 
-        if wrong:
-            return None
+    lon = lon[keep]
+    lat = lat[keep]
+    t = t[keep]
 
-        if os.path.exists(self.not_file):
-            # For each point in notifications (gap_start points)
-            for point in open(self.not_file, 'r'):
-                if len(point) > 1:
-                    # Translate json and get id
-                    t = json.loads(point)
-                    idd = t['id']
+    if len(t) == 0:
+        return 0.0, 0
 
-                    # If id not in dict create listy
-                    if idd not in out_data:
-                        out_data[idd] = []
+    # j is the segment (approx[j], approx[j+1]) of each raw point
+    j = np.searchsorted(a_t[1:], t, side='left')
 
-                    # Append point info to list, as a tuple
-                    out_data[idd].append((
-                        t['longitude'],
-                        t['latitude'],
-                        t['timestamp']
-                    ))
+    if proj:
+        est_lon, est_lat = project_np(a_lon[j], a_lat[j], a_lon[j+1], a_lat[j+1], lon, lat)
+    else:
+        est_lon, est_lat = interpolate_np(a_lon[j], a_lat[j], a_t[j], a_lon[j+1], a_lat[j+1], a_t[j+1], t)
 
-        # Initialize noisy points
-        # Variable 'noise' is a dictionry, where the key is a ship-id(string) and the value is another dictionary,
-        # whose key is a tuple (lon,lat,t) and value is an integer that counts how many times that specific point has been classified as noise
-        noise = {}
+    h = haversine_np(lon, lat, est_lon, est_lat)
+    return float(np.dot(h, h)), len(t)
 
-        if os.path.exists(self.noise_file):
-            # For each point in noisy points
-            for point in open(self.noise_file, 'r'):
-                if len(point) <= 1:
-                    continue
 
-                # Translate json and get id
-                t = json.loads(point)
-                idd = t['id']
-                k = (t['longitude'], t['latitude'], t['timestamp'])
+def ship_squared_error(in_data: Mapping[str, Union[List[Tuple], Track]], idd: str, approx: Union[List[Tuple], Track], noise: Union[Dict[str, Dict[Tuple, int]], np.ndarray], proj: bool = False) -> Tuple[float, int, int]:
+    """The loop body of `estimate_RMSE_np()`: the error of a single ship, given all its compressed points.
 
-                if idd not in noise:
-                    noise[idd] = {}
+    Arguments:
+        in_data {Mapping[str, Union[List[Tuple[float,float,int]], Track]]} -- The uncompressed points, as in `estimate_RMSE_np()`
+        idd {str} -- The ship-ID, which must be in in_data
+        approx {Union[List[Tuple[float,float,int]], Track]} -- The compressed points of the ship, in any order
+        noise {Union[Dict[str, Dict[Tuple[float, float, int], int]], np.ndarray]} -- The noisy points, as in `estimate_RMSE_np()`
 
-                if k not in noise[idd]:
-                    # Initialize counter for that spesific point to 1
-                    noise[idd][k] = 1
-                else:
-                    # Increment counter for that spesific point to 1
-                    noise[idd][k] += 1
+    Keyword Arguments:
+        proj {bool} -- Whether to use a projection instead of time interpolation (default: {False})
 
-        return (out_data, noise)
+    Returns:
+        Tuple[float, int, int] -- The sum of squared errors, the number of raw points it was computed on and the number of (unique) critical points
+    """
 
-    def run_synopses_and_copy_files(self, params: Dict[str, float], out_target: str, noise_target: str):
-        """Method that reads and merges the output of the synopses. Then writes them to files.
+    raw = to_track(in_data[idd])
+    approx = to_track(approx)
 
-        Args:
-            params (Dict[str, float]): Dictionary that maps synopses params to their values
-            out_target (str): File location to store ALL critical points
-            noise_target (str): File location to store noiseless (or noisy) points.
-        """
+    # Stable sort, like `sorted()` in the reference loop
+    order = np.argsort(approx[2], kind='stable')
+    approx = (approx[0][order], approx[1][order], approx[2][order])
 
-        # Write params to file
-        self.make_config(params)
+    # The number of (unique) critical points
+    approx_points = len(np.unique(approx[2]))
 
-        # Run Synopses-Generator and wit for finish
-        app = Popen(self.start_app, stdout=PIPE, stderr=PIPE)
-        app.wait()
+    if isinstance(noise, np.ndarray):
+        mask = noise[in_data.row[in_data.slice(idd)]]
+    elif idd in noise and len(approx[2]) > 0:
+        mask = noise_counts_to_mask(raw, noise[idd], approx[2][0])
+    else:
+        mask = None
 
-        # Dict that maps id to list,
-        # Said list contains all the jsons, which is the output of the Synopses-Generator
-        out_data = {}
+    if np.any(raw[2][1:] < raw[2][:-1]):
+        # Unsorted ship, use the reference loop on a copy of its noise counters
+        if isinstance(noise, np.ndarray):
+            ship_noise = {idd: Counter(zip(raw[0][mask].tolist(), raw[1][mask].tolist(), raw[2][mask].tolist()))}
+        else:
+            ship_noise = {idd: dict(noise[idd])} if idd in noise else {}
+        points = list(zip(raw[0].tolist(), raw[1].tolist(), raw[2].tolist()))
+        approx = list(zip(approx[0].tolist(), approx[1].tolist(), approx[2].tolist()))
+        rmse, raw_points = vessel_squared_error(idd, points, approx, ship_noise, proj)
+    else:
+        rmse, raw_points = track_squared_error(raw, approx, mask, proj)
 
-        # For each point in critical points
-        for point in open(self.output_file, 'r'):
-            if len(point) > 1:
-                wrong = False
-                # Translate json and get id
-                t = json.loads(point)
-                idd = t['id']
+    return rmse, raw_points, approx_points
 
-                if idd not in out_data:
-                    out_data[idd] = []
 
-                # Append point
-                out_data[idd].append(t)
+def rmse_ratio(sq_error: float, raw_points: int, approx_points: int) -> Tuple[float, float]:
+    """The RMSE and Compression Ratio of the sums of `squared_error_sums()`. The sums of several inputs can be added first.
 
-        if wrong:
-            raise RuntimeError('Not run correctly')
+    Arguments:
+        sq_error {float} -- Sum of the squared errors
+        raw_points {int} -- Number of uncompressed points
+        approx_points {int} -- Number of compressed points
 
-        if os.path.exists(self.not_file):
+    Returns:
+        Tuple[float, float] -- RMSE and Compression Ratio
+    """
+
+    return sqrt(sq_error/raw_points), approx_points/raw_points
+
+
+def squared_error_sums(in_data: Mapping[str, Union[List[Tuple], Track]], out_data: Dict[str, List[Tuple]], noise: Union[Dict[str, Dict[Tuple, int]], np.ndarray], proj: bool = False) -> Tuple[float, int, int]:
+    """The sufficient statistics of `estimate_RMSE_np()`, with the same arguments: sums over the ships that are added,
+    so that the RMSE and Ratio of several inputs together can be found from the sums of each one (see `rmse_ratio()`).
+
+    Returns:
+        Tuple[float, int, int] -- Sum of squared errors, number of uncompressed points, number of compressed points
+    """
+
+    total_rmse = 0.0
+    total_raw_points = 0
+    total_approx_points = 0
+
+    for idd in in_data:
+
+        if idd not in out_data:
+            continue
+
+        rmse, raw_points, approx_points = ship_squared_error(in_data, idd, out_data[idd], noise, proj)
+
+        total_rmse += rmse
+        total_raw_points += raw_points
+        total_approx_points += approx_points
+
+    return total_rmse, total_raw_points, total_approx_points
+
+
+def estimate_RMSE_np(in_data: Mapping[str, Union[List[Tuple], Track]], out_data: Dict[str, List[Tuple]], noise: Union[Dict[str, Dict[Tuple, int]], np.ndarray], proj: bool = False) -> Tuple[float, float]:
+    """NumPy engine of `estimate_RMSE()`, with the same arguments and results (up to floating point rounding).
+    The noise counters are not modified, so there is no need to send a copy.
+
+    Ships whose raw points are not sorted in time are passed to the reference loop `vessel_squared_error()`.
+
+    Arguments:
+        in_data {Mapping[str, Union[List[Tuple[float,float,int]], Track]]} -- The uncompressed points, as a list of points or as a track per ship-ID
+        out_data {Dict[str, List[Tuple[float,float,int]]]} -- The compressed points
+        noise {Union[Dict[str, Dict[Tuple[float, float, int], int]], np.ndarray]} -- The noisy points. Either the counters of `estimate_RMSE()`,
+            or a boolean bitmap over the rows of the input file (see `Daemon.read_noise_bitmap()`), in which case in_data must be a `raw_cache.RawTracks`.
+
+    Keyword Arguments:
+        proj {bool} -- Whether to use a projection instead of time interpolation (default: {False})
+
+    Returns:
+        Tuple[float, float] -- RMSE and Compression Ratio
+    """
+
+    return rmse_ratio(*squared_error_sums(in_data, out_data, noise, proj))
+
+
+# Engines that can be used to estimate the RMSE and Ratio. 'python' is the reference implementation.
+RMSE_ENGINES = {
+    'numpy': estimate_RMSE_np,
+    'python': estimate_RMSE
+}
+
+
+class Censored(transport.Abort):
+    """Raised when an evaluation is stopped by its cutoff (see `StreamingRMSE`): the parameters are proven worse than the cutoff,
+    but their RMSE and Ratio are not known. The attribute `bounds` holds lower bounds of the (RMSE, Ratio).
+    """
+
+    def __init__(self, bounds: Tuple[float, float]):
+        super().__init__(f'Censored at RMSE >= {bounds[0]}, Ratio >= {bounds[1]}')
+        self.bounds = bounds
+
+
+class StreamingRMSE:
+    """Incremental version of `estimate_RMSE_np()`, that is given the compressed points in batches while they are produced,
+    instead of all of them at the end. The points of a ship are kept until it is finalized, i.e. until it is known that
+    its output is complete. Then its error is added to the running sums, and its points are dropped.
+    The jar writes the ships interleaved in time, so its ships are all finalized at the end (in `sums()`), and only the
+    ship-by-ship output of the 'python' generator (`consume(..., complete=True)`) keeps a single ship at a time.
+
+    With a cutoff `(option, value)`, the evaluation stops with `Censored` as soon as `crit()` of lower bounds of the RMSE and Ratio
+    is above the value. The final number of uncompressed points is at most the number of points of in_data, so the squared errors of
+    the finalized ships give a lower bound of the RMSE, and the (unique) compressed points so far a lower bound of the Ratio.
+
+    Example:
+        est = StreamingRMSE(daemon.in_tracks, bitmap)
+        est.consume(batches)  # (ship-ID, points) pairs, in any order
+        rmse, ratio = est.result()
+    """
+
+    def __init__(self, in_data: Mapping[str, Union[List[Tuple], Track]], noise: Union[Dict[str, Dict[Tuple, int]], np.ndarray] = None, proj: bool = False,
+                 cutoff: Tuple[str, float] = None):
+        """Constructor.
+
+        Arguments:
+            in_data {Mapping[str, Union[List[Tuple[float,float,int]], Track]]} -- The uncompressed points, as in `estimate_RMSE_np()`
+
+        Keyword Arguments:
+            noise {Union[Dict[str, Dict[Tuple[float, float, int], int]], np.ndarray]} -- The noisy points, as in `estimate_RMSE_np()`.
+                It is only used when the ships are finalized, so it can be set later through the attribute `noise` (default: {None})
+            proj {bool} -- Whether to use a projection instead of time interpolation (default: {False})
+            cutoff {Tuple[str, float]} -- An option of `crit()` and the fitness above which to stop (default: {None})
+        """
+
+        self.in_data = in_data
+        self.noise = {} if noise is None else noise
+        self.proj = proj
+        self.cutoff = cutoff
+
+        # Compressed points of the ships that are not finalized yet
+        self.pending = {}
+
+        if cutoff is not None:
+            # Upper bound of the uncompressed points, and the unique timestamps of the pending ships (their compressed points)
+            self.max_raw_points = in_data.n_points() if hasattr(in_data, 'n_points') else sum(len(to_track(v)[2]) for v in in_data.values())
+            self.pending_times = {}
+            self.pending_approx_points = 0
+
+        # Number of compressed points given so far, including those of unknown ships
+        self.points = 0
+
+        self.total_rmse = 0.0
+        self.total_raw_points = 0
+        self.total_approx_points = 0
+
+    def add(self, idd: str, points: List[Tuple]):
+        """Adds some compressed points of a ship. Ships without uncompressed points are ignored, as in `estimate_RMSE_np()`.
+
+        Arguments:
+            idd {str} -- Ship-ID
+            points {List[Tuple[float,float,int]]} -- Compressed points (lon,lat,t)
+        """
+
+        self.points += len(points)
+
+        if idd not in self.in_data:
+            return
+
+        if idd not in self.pending:
+            self.pending[idd] = []
+        self.pending[idd].extend(points)
+
+        if self.cutoff is not None:
+            times = self.pending_times.setdefault(idd, set())
+            before = len(times)
+            times.update(p[2] for p in points)
+            self.pending_approx_points += len(times) - before
+
+    def finalize(self, idd: str):
+        """Adds the error of a ship to the running sums. No more points of this ship must be added after this.
+
+        Arguments:
+            idd {str} -- Ship-ID
+        """
+
+        points = self.pending.pop(idd, None)
+        if points is None:
+            return
+
+        if self.cutoff is not None:
+            self.pending_approx_points -= len(self.pending_times.pop(idd))
+
+        rmse, raw_points, approx_points = ship_squared_error(self.in_data, idd, points, self.noise, self.proj)
+
+        self.total_rmse += rmse
+        self.total_raw_points += raw_points
+        self.total_approx_points += approx_points
+
+    def consume(self, batches: Iterable[Tuple[str, List[Tuple]]], complete: bool = False):
+        """Adds batches of compressed points.
+
+        Arguments:
+            batches {Iterable[Tuple[str, List[Tuple[float,float,int]]]]} -- (ship-ID, points) pairs
+
+        Keyword Arguments:
+            complete {bool} -- Whether each batch holds all the points of its ship, so that the ship is finalized at once (default: {False})
+
+        Raises:
+            Censored: When the cutoff is crossed
+        """
+
+        for idd, points in batches:
+            self.add(idd, points)
+            if complete:
+                self.finalize(idd)
+            if self.cutoff is not None:
+                self.check()
+
+    def bounds(self) -> Tuple[float, float]:
+        """Lower bounds of the final RMSE and Ratio, from the points given so far. Only with a cutoff.
+
+        Returns:
+            Tuple[float, float] -- RMSE and Compression Ratio
+        """
+
+        return rmse_ratio(self.total_rmse, max(self.max_raw_points, 1), self.total_approx_points + self.pending_approx_points)
+
+    def check(self):
+        """Stops the evaluation if the lower bounds are worse than the cutoff.
+
+        Raises:
+            Censored: When `crit()` of the lower bounds is above the cutoff
+        """
+
+        bounds = self.bounds()
+        if crit(bounds[0], bounds[1], self.cutoff[0]) > self.cutoff[1]:
+            raise Censored(bounds)
+
+    def sums(self) -> Tuple[float, int, int]:
+        """Finalizes the remaining ships and returns the running sums, as `squared_error_sums()`.
+
+        Returns:
+            Tuple[float, int, int] -- Sum of squared errors, number of uncompressed points, number of compressed points
+        """
+
+        # In the order of in_data, so that the sums are the same as those of `estimate_RMSE_np()`
+        if self.pending:
+            for idd in self.in_data:
+                if idd in self.pending:
+                    self.finalize(idd)
+
+        return self.total_rmse, self.total_raw_points, self.total_approx_points
+
+    def result(self) -> Tuple[float, float]:
+        """Finalizes the remaining ships and returns the totals.
+
+        Returns:
+            Tuple[float, float] -- RMSE and Compression Ratio
+        """
+
+        return rmse_ratio(*self.sums())
+
+def iter_point_batches(lines: Iterable[str]) -> Iterator[Tuple[str, List[Tuple]]]:
+    """Parses output lines of the Synopses-Generator in batches, one for each run of consecutive points of the same ship.
+
+    Arguments:
+        lines {Iterable[str]} -- Lines of an output file (JSON records), empty lines are skipped
+
+    Yields:
+        Tuple[str, List[Tuple[float, float, int]]] -- The ship-ID and the points (lon,lat,t) of the batch
+    """
+
+    idd, batch = None, []
+    for point in lines:
+        if len(point) <= 1:
+            continue
+
+        p_id, lon, lat, t = output_parser.parse_point(point)
+        if p_id != idd:
+            if batch:
+                yield idd, batch
+            idd, batch = p_id, []
+
+        batch.append((lon, lat, t))
+
+    if batch:
+        yield idd, batch
+
+
+def iter_noise_points(lines: Iterable[str]) -> Iterator[Tuple]:
+    """Parses the lines of the noisy points of the Synopses-Generator.
+
+    Arguments:
+        lines {Iterable[str]} -- Lines of the output file (JSON records), empty lines are skipped
+
+    Yields:
+        Tuple[str, float, float, int] -- The points (id, lon, lat, t)
+    """
+
+    for point in lines:
+        if len(point) > 1:
+            yield output_parser.parse_point(point)
+
+
+def take_slot(folder: str) -> Tuple[str, int]:
+    """Takes the first free id, i.e. the first file `{folder}/{id}.lock` that no other process has locked.
+    The lock is held while the returned file descriptor is open. The system releases it when the process dies,
+    so the ids of crashed processes are taken again without any cleanup.
+
+    Arguments:
+        folder {str} -- Folder of the lock files
+
+    Returns:
+        Tuple[str, int] -- The id and the file descriptor of its lock file
+    """
+
+    os.makedirs(folder, exist_ok=True)
+
+    i = 0
+    while True:
+        fd = os.open(join(folder, f'{i}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            i += 1
+            continue
+
+        # Only informative, the lock is what marks the id as taken
+        os.ftruncate(fd, 0)
+        os.write(fd, f'{os.getpid()}\n'.encode())
+        return str(i), fd
+
+
+def release_slot(fd: int):
+    """Releases an id taken with `take_slot()`.
+
+    Arguments:
+        fd {int} -- The file descriptor of its lock file, or None if it is already released
+    """
+
+    if fd is None:
+        return
+
+    os.ftruncate(fd, 0)
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+# Synopses-Generators that a Daemon can run: the jar with Flink, or its port in `py_synopses.py`
+GENERATORS = ('flink', 'python')
+
+
+def generator_version(generator: str = 'flink') -> str:
+    """A version of a Synopses-Generator, that changes whenever its results may change:
+    the sha1 of the jar (or of `py_synopses.py`) and of the template of the parameters.
+
+    Arguments:
+        generator {str} -- One of GENERATORS (default: {'flink'})
+
+    Returns:
+        str -- e.g. 'flink-3f2a...'
+    """
+
+    home = os.path.expanduser('~/infore/datacron/implementation')
+    if generator == 'flink':
+        code = join(home, 'synopses_generator/target/datacron_trajectory_synopses-0.7.jar')
+    else:
+        code = py_synopses.__file__
+
+    h = hashlib.sha1()
+    for path in (code, join(home, 'parameter_optimizer/parameters/maritime_config_template.properties')):
+        h.update(raw_cache.file_sha1(path).encode())
+    return f'{generator}-{h.hexdigest()[:12]}'
+
+
+class Daemon:
+    """Daemon made for controling the synopses. It makes that correct files, passes the parameters, uses flink, etc.
+    """
+
+    def __init__(self, ship_type: str, parts: List[str], dataset: str, file_names: List[str], one_file: bool = False, syn_prints_noise: str = 'true', rmse_engine: str = 'numpy', noise_cache: bool = True, session: bool = True, generator: str = 'flink', streaming: bool = True, scratch: str = None, fifo: bool = False, compact: bool = False, input_cache: bool = True, fraction: float = 1.0, timeout: float = None):        
+        """Constructor. Initializes input files and commands that will be used to run app.
+
+        Arguments:
+            ship_type (str): The number that corresponds to the ship type.
+            parts (List[str]): A list of the parts to run on. (the strings in the list should be numbers).
+            dataset (str): The dataset to use. Possible values: The folders of '../../data/'
+            file_names (List[str]): [description]
+            one_file (bool, optional): [description]. Defaults to False.
+            syn_prints_noise (str, optional): Whether the Synopses-Generator will output noisy points or noiseless points. Defaults to 'true'.
+            rmse_engine (str, optional): Which function of `RMSE_ENGINES` estimates the RMSE and Ratio. Defaults to 'numpy'.
+            noise_cache (bool, optional): Whether to compute the noisy points once and reuse them as a bitmap (see `noise_bitmap()`).
+                Only used with the 'numpy' engine and when the Synopses-Generator outputs the noisy points. Defaults to True.
+            session (bool, optional): Whether to keep the Synopses-Generator running between evaluations (see `start_session()`).
+                If the session can not start or fails, every evaluation starts it with `flink run`, as before. Defaults to True.
+            generator (str, optional): Which Synopses-Generator to run: 'flink' (the jar) or 'python' (`py_synopses.py`, in-process and without Flink).
+                Defaults to 'flink'.
+            streaming (bool, optional): Whether `run_synopses()` gives the output to a `StreamingRMSE` while reading it (see `stream_synopses()`).
+                Only used with the 'numpy' engine, and with the noise as a bitmap. Defaults to True.
+            scratch (str, optional): Root of the folder of the input, output and parameter files (see `transport.py`).
+                Defaults to `/dev/shm`, or `tmp/` if it can not be written.
+            fifo (bool, optional): Whether the output of the jar is read while it is written, through named pipes (see `stream_synopses()`).
+                Only used when the output is streamed. Defaults to False.
+            compact (bool, optional): Whether the jar writes binary records keyed by the row of each point in the input, instead of JSON lines
+                (see `read_compact_files()`). Only used with the noise cache. Defaults to False.
+            input_cache (bool, optional): Whether the input file is placed through the cache of `input_cache.py`, that keeps one copy of each input
+                for all Daemons. Defaults to True.
+            fraction (float, optional): The fraction of the ships of the input to run on, a deterministic sample stratified by the length of their tracks
+                (see `raw_cache.subsample()`), for cheaper low-fidelity evaluations. Defaults to 1.0, all the ships.
+            timeout (float, optional): Seconds after which a run of the generator is killed, and raises `GeneratorTimeout` (see `supervisor.py`).
+                Defaults to None, `supervisor.time_limit()` of the number of points of the input.
+        """
+
+        if not 0 < fraction <= 1:
+            raise ValueError(f'The fraction of the ships must be in (0, 1], not {fraction}')
+
+        if rmse_engine not in RMSE_ENGINES:
+            raise ValueError(f'Unknown RMSE engine {rmse_engine}. Use one of {sorted(RMSE_ENGINES)}')
+
+        if generator not in GENERATORS:
+            raise ValueError(f'Unknown Synopses-Generator {generator}. Use one of {GENERATORS}')
+
+        self.generator = generator
+
+        self.rmse_engine = rmse_engine
+
+        self.streaming = streaming
+
+        # Raw points as lists of tuples, see property in_data
+        self._in_data = None
+
+        self.home = os.path.expanduser('~/infore')
+        scripts_fold = join(self.home, 'datacron/implementation/parameter_optimizer/scripts')
+
+        # If temp folder does not exist, create it
+        if not os.path.exists('tmp'):
+            os.mkdir('tmp')
+
+        # Folder with one lock file per id. To know what this is read the Daemon entry in ReadMe.md.
+        self.slots_folder = join(scripts_fold, 'tmp/slots')
+
+        # Create application unique id, held as long as self.slot_lock is open
+        self.id, self.slot_lock = take_slot(self.slots_folder)
+
+        # Kill the generators left by killed Daemons
+        supervisor.reap(self.slots_folder)
+
+        # Folder of the files below, removed by end() or at exit
+        self.scratch_folder = transport.scratch_folder(scratch or transport.scratch_root(join(scripts_fold, 'tmp')), self.slots_folder, self.id)
+        self.remove_scratch = weakref.finalize(self, transport.remove_folder, self.scratch_folder)
+
+        self.fifo = fifo
+
+        self.type = ship_type
+
+        # File location from where input data for the compression will be read
+        self.input_file = join(self.scratch_folder, 'type{}.in'.format(self.id))
+
+        # File location where 1st output data will be stored (critical points without gap_start).
+        self.output_file = join(self.scratch_folder, 'type{}.out'.format(self.id))
+
+        # File location where 2nd output data will be stored (noisy or noiseless points, depending on the value of param `syn_prints_noise`).
+        self.noise_file = join(self.scratch_folder, 'type{}_loc.out'.format(self.id))
+
+        # File location where 3rd output data will be stored (originally called notifications, is basically gap_start critical points)
+        self.not_file = join(self.scratch_folder, 'type{}_not.out'.format(self.id))
+
+        # Template-File that will be modified to include the right set of parameters each time
+        self.template_file_loc = join(self.home, 'datacron/implementation/parameter_optimizer/parameters/maritime_config_template.properties')
+        if not os.path.exists(self.template_file_loc):
+            raise FileNotFoundError(f'Template file does not exist in {self.template_file_loc}')
+
+        # Location of file that will include the parameters used for the synopses
+        self.param_file_loc = join(self.scratch_folder, 'maritime_config{}.properties'.format(self.id))
+
+        # Jar file location to run from, the same for all the Daemons
+        self.synopses_jar_loc = join(self.home, 'datacron/implementation/synopses_generator/target/datacron_trajectory_synopses-0.7.jar')
+
+        # 'true' or 'false': whether to print noiseless or noisy messages. Noisy messages are fewer => runs faster
+        self.syn_prints_noise = syn_prints_noise
+
+        # Command that starts application and gives it as an argument the unique id and the input/outputfiles.
+        # `run_generator()` appends the last two arguments: what to print in self.noise_file and the parameter file
+        self.start_app = [
+            'nice',
+            join(self.home, 'flink-0.10.2/bin/flink'),
+            'run',
+            '-c',
+            'eu.datacron.synopses.maritime.TrajectoryStreamManager',
+            self.synopses_jar_loc,
+            self.id, 
+            self.input_file,
+            self.output_file,
+            self.noise_file,
+            self.not_file
+        ]
+
+        if generator == 'flink' and not os.path.exists(self.synopses_jar_loc):
+            raise FileNotFoundError(f'Synopses jar file does not exist in {self.synopses_jar_loc}. Run make.py in that folder')
+
+        # Command that starts a long-lived Synopses-Generator, that reads the input once and then runs the compression on request.
+        # It runs Flink inside its own JVM, so it needs the jars of Flink in the classpath
+        self.start_session_app = [
+            'nice',
+            'java',
+            '-cp',
+            self.synopses_jar_loc + ':' + join(self.home, 'flink-0.10.2/lib/*'),
+            'eu.datacron.synopses.maritime.SynopsesSession',
+            self.id,
+            self.input_file
+        ]
+
+        # The running session (a `supervisor.Supervised`), or None when every evaluation runs `flink run`
+        self.session = None
+
+        # Lock of `run_synopses_async()`, and the event loop it belongs to (a lock is bound to the loop that first waits on it)
+        self.async_lock = None
+        self.async_loop = None
+
+        # Location where input data are stored
+        self.data_folder = join(self.home, 'datacron/implementation/data/{}/'.format(dataset))
+
+        # Noise bitmaps, stored in memory by key (see `noise_key()`) and on disk in this folder
+        self.noise_cache = noise_cache and syn_prints_noise == 'true' and rmse_engine != 'python'
+
+        # The compact output has the noise as rows, so it is read as a bitmap; it is small, so it is never read through pipes
+        self.compact = compact and generator == 'flink' and self.noise_cache
+        if self.compact:
+            self.fifo = False
+        self.noise_bitmaps = {}
+        self.noise_folder = join(self.data_folder, 'cache/noise')
+        self.template_sha1 = raw_cache.file_sha1(self.template_file_loc)
+        self.input_cache = input_cache
+
+        # Copies of the cached inputs on the file system of the scratch folders, next to them (see `input_cache.stage()`)
+        self.stage_folder = join(os.path.dirname(self.scratch_folder), 'placed')
+
+        # The fraction of the ships in the input, and their IDs (None for all of them), see load_input_tracks()
+        self.fraction = fraction
+        self.ships = None
+
+        if not isinstance(file_names, list):
+            file_names = [file_names]
+
+        if not one_file:
+            # Place correct input file with desired time-length and ship-type
+            self.place_input(ship_type, parts, file_names=file_names)
+        else:
+            self.place_input2(ship_type)
+
+        # Limit of a run of the generator
+        self.timeout = timeout if timeout is not None else supervisor.time_limit(self.in_tracks.n_points())
+
+        if session and generator == 'flink':
+            self.start_session()
+
+    def start_session(self):
+        """Starts a Synopses-Generator session, that keeps self.input_file in memory and runs the compression
+        each time it is asked to (see `run_generator()`). This way an evaluation does not pay the startup of the JVM and of the Flink job.
+
+        If the session does not start (e.g. old jars without the session, or no java in the path), self.session stays None.
+        """
+
+        try:
+            self.session = Supervised(self.start_session_app, self.slots_folder, self.id, stdin=PIPE, stdout=PIPE, universal_newlines=True, bufsize=1)
+        except OSError:
+            self.session = None
+            return
+
+        with self.session.watch(self.timeout):
+            reply = self.read_session_reply()
+        if reply is None or not reply.startswith('ready'):
+            self.stop_session()
+
+    def read_session_reply(self) -> str:
+        """Reads the next reply of the session. Lines that do not start with 'SESSION' are logs of Flink and are skipped.
+
+        Returns:
+            str -- The reply without the 'SESSION ' prefix, or None if the session exited
+        """
+
+        for line in self.session.stdout:
+            if line.startswith('SESSION '):
+                return line[len('SESSION '):].strip()
+        return None
+
+    def stop_session(self):
+        """Stops the session, if there is one. Next evaluations run the one-shot Synopses-Generator."""
+
+        if self.session is None:
+            return
+
+        try:
+            self.session.stdin.write('quit\n')
+            self.session.stdin.close()
+            self.session.wait(timeout=10)
+        except (OSError, ValueError, TimeoutExpired):
+            pass
+
+        # Kills what is left
+        self.session.close()
+        self.session = None
+
+    def output_format(self) -> str:
+        """The last argument of the generator: 'compact' for the binary records (see `read_compact_files()`), or 'json'."""
+        return 'compact' if self.compact else 'json'
+
+    def run_generator(self, print_noise: str, aborted: Callable[[], bool] = None):
+        """Runs the Synopses-Generator once on self.input_file, with the parameters in self.param_file_loc.
+        Uses the session if there is one, otherwise (or if the session fails) starts the generator with `flink run`.
+
+        Arguments:
+            print_noise {str} -- The last argument of the generator: 'true', 'false' or 'none' (see `run_synopses_and_read_result()`)
+
+        Keyword Arguments:
+            aborted {Callable[[], bool]} -- Whether the run was stopped on purpose (see `run_generator_fifo()`), so that a failure
+                of the session is not taken for a broken session (default: {None})
+
+        Raises:
+            GeneratorTimeout: When the run takes longer than self.timeout. The generator is killed (and the session started again)
+        """
+
+        if self.session is not None:
+            try:
+                with self.session.watch(self.timeout):
+                    self.session.stdin.write(' '.join(['run', self.output_file, self.noise_file, self.not_file, print_noise, self.param_file_loc, self.output_format()]) + '\n')
+                    reply = self.read_session_reply()
+            except OSError:
+                reply = None
+
+            if self.session.timed_out:
+                stderr = self.session.stderr_tail()
+                self.stop_session()
+                self.start_session()
+                raise GeneratorTimeout(self.timeout, stderr)
+
+            if reply == 'done' or (aborted is not None and aborted()):
+                return
+
+            # The session is broken, go back to the one-shot mode
+            self.stop_session()
+
+        app = Supervised(self.start_app + [print_noise, self.param_file_loc, self.output_format()], self.slots_folder, self.id)
+        try:
+            with app.watch(self.timeout):
+                app.wait()
+        finally:
+            app.close()
+
+        if app.timed_out:
+            raise GeneratorTimeout(self.timeout, app.stderr_tail())
+
+    def place_input(self, ship_type: str, parts: List[str], file_names: List[str]):
+        """Creates a concatenate input file, from where the synopses will be created.
+
+        Arguments:
+           ship_type {str} -- The nmber that indicates the type of ship
+           parts {List[str]} -- A list that contains all the parts to use.
+           file_names {List[str]} -- A list of the file names to use e.g. month, march, etc. See `../../data`.
+        """
+
+        # For each combination of part and file_name
+        sources = [join(self.data_folder, f'data_per_type/cross/type{ship_type}/{file_name}{p}.csv') for file_name in file_names for p in parts]
+
+        self.copy_input(sources)
+
+
+    def place_input2(self, ship_type: str):
+        """Creates an input file, from where the Synopses-Generator will read the input.
+        Copies from only one file, `../../data/{dataset}/data_per_type/all/type_x.csv`.
+
+        Arguments:
+           ship_type {str} -- The nmber that indicates the type of ship
+        """
+
+        self.copy_input([join(self.data_folder, 'data_per_type/all/type_{}.csv'.format(ship_type))])
+
+
+    def copy_input(self, sources: List[str]):
+        """Writes the non-empty lines of some files of ../../data/ to self.input_file, and loads their raw points.
+        With self.input_cache the file is linked from the cache of `input_cache.py`, where it is built once.
+
+        Arguments:
+            sources {List[str]} -- The files to concatenate, in order
+        """
+
+        parts = self.load_input_tracks(sources)
+
+        if self.input_cache:
+            input_cache.place(sources, [p.digest for p in parts], self.input_file, self.data_folder, ships=self.ships, stage_folder=self.stage_folder)
+            return
+
+        ships = None if self.ships is None else set(self.ships)
+
+        # Copy file from ../../data/
+        with open(self.input_file, 'w') as w: # open target file
+            for src in sources:
+                # Copy the lines to the target file
+                for line in open(src, 'r'):
+                    if len(line) > 2 and (ships is None or line.split(' ', 2)[1] in ships):
+                        w.write(line)
+
+
+    def load_input_tracks(self, sources: List[str]) -> List[raw_cache.RawTracks]:
+        """Loads the raw points of the files that are copied to self.input_file, from their columnar caches (see `raw_cache.py`).
+        The points are stored in self.in_tracks, a mapping from ship-id to a track of arrays (lon, lat, t).
+        With self.fraction < 1, only the ships of the sample self.ships are kept.
+
+        Arguments:
+            sources {List[str]} -- The files in the order they are copied
+
+        Raises:
+            RuntimeError: In case the files are empty.
+
+        Returns:
+            List[raw_cache.RawTracks] -- The points of each file
+        """
+
+        parts = [raw_cache.load(src, self.data_folder) for src in sources]
+        self.in_tracks = raw_cache.compose(parts) # pylint: disable=attribute-defined-outside-init
+
+        if len(self.in_tracks) == 0:
+            raise RuntimeError("Couldn't Read Raw Data")
+
+        if self.fraction < 1:
+            self.ships = raw_cache.subsample(self.in_tracks, self.fraction)
+            self.in_tracks = raw_cache.subset(self.in_tracks, self.ships) # pylint: disable=attribute-defined-outside-init
+
+        return parts
+
+
+    @property
+    def in_data(self) -> Dict[str, List[Tuple]]:
+        """The raw points as a dictionary that maps the ship-id to a list of tuples (lon,lat,t).
+        Only built when needed (e.g. by the 'python' engine), because it takes several times the memory of self.in_tracks.
+        """
+
+        if self._in_data is None:
+            self._in_data = self.in_tracks.to_points() # pylint: disable=attribute-defined-outside-init
+        return self._in_data
+
+
+    def make_config(self, params: Dict[str, int]):
+        """Function that creates the config file that will contain the paramaters
+        """
+
+        # Copy template file to location from where Synopses-Generator reads the params
+        shutil.copyfile(self.template_file_loc, self.param_file_loc)
+
+        with open(self.param_file_loc, 'a') as f:  # Append new params to template
+            for k, v in params.items():
+                f.write('val_' + k)  # Append param name
+                f.write('=')
+                f.write(str(v))  # Append param value
+                f.write('\n')
+
+
+    def read_synopses_files(self, read_noise: bool = True) -> Tuple[Dict, Dict]:
+        """Func that reads and merges the output of the synopses
+
+        Arguments:
+            read_noise {bool} -- Whether to read the noisy points. If False, they are returned as an empty dict (default: {True})
+
+        Returns:
+            Tuple -- A 2-tuple containing the output data and the noisy points.
+                     If the output was not read, returns None
+        """
+
+        # Similar to self.in_data:
+        # Dict of ID to list,
+        # where list contains tuples: (lon,lat,t)
+        out_data = {}
+
+        # wrong=True if not read anything
+        wrong = True
+
+        # For each point in critical points
+        for point in open(self.output_file, 'r'):
+            if len(point) > 1:
+                wrong = False
+                # Read id and position (see output_parser.py)
+                idd, lon, lat, t = output_parser.parse_point(point)
+
+                # Create list for that id
+                if idd not in out_data:
+                    out_data[idd] = []
+
+                # Append point info to list, as a tuple
+                out_data[idd].append((lon, lat, t))
+
+        if wrong:
+            return None
+
+        if os.path.exists(self.not_file):
+            # For each point in notifications (gap_start points)
+            for point in open(self.not_file, 'r'):
+                if len(point) > 1:
+                    # Read id and position
+                    idd, lon, lat, t = output_parser.parse_point(point)
+
+                    # If id not in dict create listy
+                    if idd not in out_data:
+                        out_data[idd] = []
+
+                    # Append point info to list, as a tuple
+                    out_data[idd].append((lon, lat, t))
+
+        # Initialize noisy points
+        # Variable 'noise' is a dictionry, where the key is a ship-id(string) and the value is another dictionary,
+        # whose key is a tuple (lon,lat,t) and value is an integer that counts how many times that specific point has been classified as noise
+        noise = {}
+
+        if read_noise and os.path.exists(self.noise_file):
+            # For each point in noisy points
+            for point in open(self.noise_file, 'r'):
+                if len(point) <= 1:
+                    continue
+
+                # Read id and position
+                idd, lon, lat, t = output_parser.parse_point(point)
+                k = (lon, lat, t)
+
+                if idd not in noise:
+                    noise[idd] = {}
+
+                if k not in noise[idd]:
+                    # Initialize counter for that spesific point to 1
+                    noise[idd][k] = 1
+                else:
+                    # Increment counter for that spesific point to 1
+                    noise[idd][k] += 1
+
+        return (out_data, noise)
+
+    def iter_synopses_batches(self, path: str) -> Iterator[Tuple[str, List[Tuple]]]:
+        """Reads an output file of the synopses in batches, one for each run of consecutive points of the same ship.
+
+        Arguments:
+            path {str} -- The output file (self.output_file or self.not_file). A missing file has no points
+
+        Yields:
+            Tuple[str, List[Tuple[float, float, int]]] -- The ship-ID and the points (lon,lat,t) of the batch
+        """
+
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'r') as f:
+            yield from iter_point_batches(f)
+
+    def run_synopses_and_copy_files(self, params: Dict[str, float], out_target: str, noise_target: str):
+        """Method that reads and merges the output of the synopses. Then writes them to files.
+
+        Args:
+            params (Dict[str, float]): Dictionary that maps synopses params to their values
+            out_target (str): File location to store ALL critical points
+            noise_target (str): File location to store noiseless (or noisy) points.
+        """
+
+        # Write params to file
+        self.make_config(params)
+
+        if self.generator == 'python':
+            py_synopses.write_output(self.in_tracks, py_synopses.read_properties(self.param_file_loc), out_target, noise_target,
+                                     print_noise=self.syn_prints_noise != 'false')
+            return
+
+        # Run Synopses-Generator and wit for finish
+        self.run_generator(self.syn_prints_noise)
+
+        if self.compact:
+            self.expand_compact_files(out_target, noise_target)
+            return
+
+        # Dict that maps id to list,
+        # Said list contains all the json lines, which is the output of the Synopses-Generator
+        out_data = {}
+
+        # wrong=True if not read anything
+        wrong = True
+
+        # For each point in critical points
+        for point in open(self.output_file, 'r'):
+            if len(point) > 1:
+                wrong = False
+                # Only the id is needed, the line is copied as it is
+                idd = output_parser.parse_id(point)
+
+                if idd not in out_data:
+                    out_data[idd] = []
+
+                # Append point
+                out_data[idd].append(point.rstrip('\n'))
+
+        if wrong:
+            raise RuntimeError('Not run correctly')
+
+        if os.path.exists(self.not_file):
             # For each point in notifications (gap_start points)
             for point in open(self.not_file, 'r'):
                 if len(point) > 1:
-                    # Translate json and get id
-                    t = json.loads(point)
-                    idd = t['id']
+                    # Only the id is needed, the line is copied as it is
+                    idd = output_parser.parse_id(point)
 
                     # If id not in set with raw points raise error
                     if idd not in out_data:
                         out_data[idd] = []
 
-                    # Append point info to second list, as a tuple
-                    out_data[idd].append(t)
+                    # Append point
+                    out_data[idd].append(point.rstrip('\n'))
 
         # Write output to file
         with open(out_target, 'w') as f:
-            for dics in out_data.values():
-                for dic in dics:
-                    f.write(str(json.dumps(dic)))
+            for lines in out_data.values():
+                for line in lines:
+                    f.write(line)
                     f.write('\n')
 
         # Copy noiseless file
         copyfile(self.noise_file, noise_target)
 
 
+    def expand_compact_files(self, out_target: str, noise_target: str):
+        """Writes the compact output of the jar as the JSON lines of its text output (see `output_parser.expand_compact()`),
+        grouped by ship-ID as `run_synopses_and_copy_files()` does.
+
+        Args:
+            out_target (str): File location to store ALL critical points
+            noise_target (str): File location to store noiseless (or noisy) points.
+        """
+
+        records = output_parser.read_compact(self.output_file)
+        if len(records) == 0:
+            raise RuntimeError('Not run correctly')
+
+        records = np.concatenate((records, output_parser.read_compact(self.not_file)))
+
+        # Group by ship, in the order each ship first appears
+        pos = self.in_tracks.positions()[records['row']]
+        ship = np.searchsorted(self.in_tracks.offsets, pos, side='right') - 1
+        ships, first, group = np.unique(ship, return_index=True, return_inverse=True)
+        order = np.empty(len(ships), dtype=np.int64)
+        order[np.argsort(first)] = np.arange(len(ships))
+        records = records[np.argsort(order[group], kind='stable')]
+
+        with open(out_target, 'w') as f:
+            for line in output_parser.expand_compact(records, self.in_tracks):
+                f.write(line)
+                f.write('\n')
+
+        with open(noise_target, 'w') as f:
+            for line in output_parser.expand_compact(output_parser.read_compact(self.noise_file), self.in_tracks):
+                f.write(line)
+                f.write('\n')
+
+    def noise_key(self, params: Dict[str, float]) -> str:
+        """The key under which the noise bitmap of some parameters is stored.
+        Depends on the input, the template and the parameters in `NOISE_PARAMETERS`.
+
+        Arguments:
+            params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
+
+        Returns:
+            str -- The key (a sha1)
+        """
+
+        key = [self.in_tracks.digest, self.template_sha1] + [str(params[k]) for k in NOISE_PARAMETERS]
+        return hashlib.sha1(' '.join(key).encode()).hexdigest()
+
+
+    def noise_bitmap(self, params: Dict[str, float]) -> np.ndarray:
+        """Returns the noise bitmap of some parameters, if it has been computed before (by this or by another Daemon).
+        The bitmap is a boolean array with an item for each row of self.input_file, that is True for the noisy points.
+
+        Arguments:
+            params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
+
+        Returns:
+            np.ndarray -- The bitmap, or None if it is not known
+        """
+
+        key = self.noise_key(params)
+
+        if key not in self.noise_bitmaps:
+            path = join(self.noise_folder, key + '.npy')
+            if not os.path.exists(path):
+                return None
+            # Stored with 1 bit per row
+            self.noise_bitmaps[key] = np.unpackbits(np.load(path), count=self.in_tracks.n_points()).astype(bool)
+
+        return self.noise_bitmaps[key]
+
+
+    def read_noise_bitmap(self, params: Dict[str, float], points: List[Tuple] = None) -> np.ndarray:
+        """Reads the noisy points from self.noise_file, translates them to a bitmap over the rows of self.input_file,
+        and stores it for the next runs with the same noise (see `noise_bitmap()`).
+
+        A point that was reported as noise k times marks its first k rows, as the counters of `estimate_RMSE()` do.
+
+        Arguments:
+            params {Dict[str, float]} -- The parameters that were used to produce self.noise_file
+
+        Keyword Arguments:
+            points {List[Tuple[str, float, float, int]]} -- The noisy points (id, lon, lat, t), if they are already read (default: {None})
+
+        Returns:
+            np.ndarray -- The bitmap
+        """
+
+        if points is None:
+            points = []
+            if os.path.exists(self.noise_file):
+                with open(self.noise_file, 'r') as f:
+                    points.extend(iter_noise_points(f))
+
+        bitmap = np.zeros(self.in_tracks.n_points(), dtype=bool)
+        rows = self.in_tracks.find_rows(points)
+        bitmap[rows[rows >= 0]] = True
+
+        self.store_noise_bitmap(params, bitmap)
+        return bitmap
+
+    def store_noise_bitmap(self, params: Dict[str, float], bitmap: np.ndarray):
+        """Stores the noise bitmap of some parameters, in memory and on disk (see `noise_bitmap()`).
+
+        Arguments:
+            params {Dict[str, float]} -- The parameters that the bitmap was computed with
+            bitmap {np.ndarray} -- The bitmap
+        """
+
+        key = self.noise_key(params)
+        self.noise_bitmaps[key] = bitmap
+
+        # Write under a temporary name and rename, so that other Daemons never read half a file
+        os.makedirs(self.noise_folder, exist_ok=True)
+        tmp = join(self.noise_folder, f'{key}.{os.getpid()}.npy')
+        np.save(tmp, np.packbits(bitmap))
+        os.replace(tmp, join(self.noise_folder, key + '.npy'))
+
+    def read_compact_files(self, params: Dict[str, float], bitmap: np.ndarray) -> Tuple[Dict[str, Track], np.ndarray]:
+        """Reads the compact output of the jar: fixed-width records with the row of each point in self.input_file
+        (see `output_parser.COMPACT_RECORD`). The positions of the points are taken from self.in_tracks, so no number is parsed.
+
+        Arguments:
+            params {Dict[str, float]} -- The parameters that were used to produce the output
+            bitmap {np.ndarray} -- The noise bitmap if it is known, or None to read it from self.noise_file (and store it)
+
+        Returns:
+            Tuple -- The compressed points as a track per ship-ID, and the noise bitmap.
+                     If the output was not read, returns None
+        """
+
+        records = output_parser.read_compact(self.output_file)
+        if len(records) == 0:
+            return None
+
+        # Critical points, then notifications (gap_start points), as read_synopses_files() merges them
+        rows = np.concatenate((records['row'], output_parser.read_compact(self.not_file)['row']))
+        out_data = self.in_tracks.tracks_of_rows(rows)
+
+        if bitmap is None:
+            bitmap = np.zeros(self.in_tracks.n_points(), dtype=bool)
+            bitmap[output_parser.read_compact(self.noise_file)['row']] = True
+            self.store_noise_bitmap(params, bitmap)
+
+        return out_data, bitmap
+
+
     def run_synopses_and_read_result(self, params: Dict[str, float], retries: int = 0, delete: bool = True) -> Tuple[Dict[str, List[Tuple]], Dict[str, List[Tuple]], Dict[str, Dict[Tuple, int]]]:
         """Runs the synopses for a given set of parameters.
         Returns the uncompressed points, the compressed points, and the noisy points
 
+        If self.noise_cache is set, the noisy points are returned as a bitmap (see `noise_bitmap()`) and the uncompressed points as self.in_tracks.
+        When the bitmap is already known the Synopses-Generator does not output the noisy points at all.
+        The 'python' generator always returns a bitmap, unless the RMSE engine is 'python'.
+
         Arguments:
            params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
            retries {int} -- A counter which counts how many failures have happened.
@@ -695,15 +1773,30 @@ class Daemon:
         # Write params to file
         self.make_config(params)
 
-        # Run Synopses-Generator and wit for finish
-        app = Popen(self.start_app, stdout=PIPE, stderr=PIPE)
-        app.wait()
+        if self.generator == 'python':
+            out_data, bitmap = py_synopses.run(self.in_tracks, py_synopses.read_properties(self.param_file_loc))
+            if self.rmse_engine == 'python':
+                return self.in_data, out_data, py_synopses.noise_counts(self.in_tracks, bitmap)
+            return self.in_tracks, out_data, bitmap
+
+        bitmap = self.noise_bitmap(params) if self.noise_cache else None
+
+        # Run Synopses-Generator and wit for finish. If the noise is known, the generator is told not to output it
+        self.run_generator(self.syn_prints_noise if bitmap is None else 'none')
 
         # Read result: 2 dicts, one with the crit-points, one with the noisy ones
-        res = self.read_synopses_files()
+        if self.compact:
+            res = self.read_compact_files(params, bitmap)
+        else:
+            res = self.read_synopses_files(read_noise=not self.noise_cache)
 
         if res is not None:
 
+            if self.compact:
+                bitmap = res[1]
+            elif self.noise_cache and bitmap is None:
+                bitmap = self.read_noise_bitmap(params)
+
             # Clean files
             if delete:
                 os.remove(self.output_file)
@@ -713,6 +1806,8 @@ class Daemon:
                     os.remove(self.not_file)
 
             # Return in_data, out_data, noisy_points
+            if self.noise_cache:
+                return self.in_tracks, res[0], bitmap
             return self.in_data, res[0], res[1]
 
         if retries < 2:
@@ -720,47 +1815,605 @@ class Daemon:
 
         raise RuntimeError('Couldn\'t Read Output Data')
 
-    def run_synopses(self, params: Dict[str, float], retries: int = 0) -> Tuple[float, float]:
+    def stream_synopses(self, params: Dict[str, float], retries: int = 0, delete: bool = True, cutoff: Tuple[str, float] = None) -> Tuple[float, int, int]:
+        """Runs the synopses for a given set of parameters, and gives their output to a `StreamingRMSE` while it is read,
+        so the output is never held as a whole next to the uncompressed points.
+        The 'python' generator produces the ships one after the other, and each one is finalized at once.
+        With a cutoff, the generator is stopped when the output read so far proves the parameters worse than it (with self.fifo).
+
+        Only for the 'numpy' engine, with the noise as a bitmap (self.noise_cache or the 'python' generator).
+
+        Arguments:
+            params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
+            retries {int} -- A counter which counts how many failures have happened.
+            delete {bool} -- A flag that indicates whether to delete files after reading them.
+            cutoff {Tuple[str, float]} -- An option of `crit()` and the fitness above which to stop (see `StreamingRMSE`).
+
+        Raises:
+            RuntimeError: When output has not been produced for 3 consecutive times.
+            Censored: When the cutoff is crossed
+
+        Returns:
+            Tuple[float, int, int] -- The sums of `squared_error_sums()`
+        """
+
+        # Write params to file
+        self.make_config(params)
+
+        if self.generator == 'python':
+            bitmap = np.zeros(self.in_tracks.n_points(), dtype=bool)
+            est = StreamingRMSE(self.in_tracks, bitmap, cutoff=cutoff)
+            est.consume(py_synopses.iter_run(self.in_tracks, py_synopses.read_properties(self.param_file_loc), bitmap), complete=True)
+            return est.sums()
+
+        bitmap = self.noise_bitmap(params)
+
+        # If the noise is known, the generator is told not to output it
+        print_noise = self.syn_prints_noise if bitmap is None else 'none'
+
+        # The noise is only needed when the ships are finalized, in est.result()
+        est = StreamingRMSE(self.in_tracks, bitmap, cutoff=cutoff)
+        noise_points = None
+
+        if self.fifo:
+            noise_points = self.run_generator_fifo(print_noise, est)
+
+            if est.points == 0:
+                # The jar did not write to the pipes (e.g. it was built before LineSink), use files from now on
+                self.fifo = False
+        else:
+            # Run Synopses-Generator and wit for finish
+            self.run_generator(print_noise)
+            est.consume(self.iter_synopses_batches(self.output_file))
+
+        if est.points > 0:
+            est.consume(self.iter_synopses_batches(self.not_file))
+
+            if bitmap is None:
+                est.noise = self.read_noise_bitmap(params, noise_points)
+
+            # Clean files
+            if delete:
+                for f in (self.output_file, self.noise_file, self.not_file):
+                    if os.path.exists(f):
+                        os.remove(f)
+
+            return est.sums()
+
+        if retries < 2:
+            return self.stream_synopses(params, retries+1, delete, cutoff)
+
+        raise RuntimeError('Couldn\'t Read Output Data')
+
+    def run_generator_fifo(self, print_noise: str, est: StreamingRMSE) -> List[Tuple]:
+        """Runs the Synopses-Generator with self.output_file (and self.noise_file, if it is printed) as named pipes,
+        and reads them in threads while the generator writes them. The critical points are given to est as they arrive.
+        The pipes are removed afterwards, so the other methods find regular files. If est raises `Censored`, its pipe is closed,
+        so the generator fails instead of finishing the run, and the error is raised here.
+
+        Arguments:
+            print_noise {str} -- The last argument of the generator: 'true', 'false' or 'none'
+            est {StreamingRMSE} -- The estimator of this run
+
+        Raises:
+            Censored: When the cutoff of est is crossed
+
+        Returns:
+            List[Tuple[str, float, float, int]] -- The points of self.noise_file (id, lon, lat, t), or None if it is not printed
+        """
+
+        noise_points = None if print_noise == 'none' else []
+
+        readers = []
+        try:
+            transport.make_fifo(self.output_file)
+            readers.append(transport.FifoReader(self.output_file, lambda lines: est.consume(iter_point_batches(lines))))
+
+            if noise_points is not None:
+                transport.make_fifo(self.noise_file)
+                readers.append(transport.FifoReader(self.noise_file, lambda lines: noise_points.extend(iter_noise_points(lines))))
+
+            self.run_generator(print_noise, lambda: any(reader.aborted for reader in readers))
+        finally:
+            # Every reader is closed and every pipe removed, even if one of them fails; then the first error is raised
+            error = None
+            for reader in readers:
+                try:
+                    reader.close()
+                except BaseException as e: # pylint: disable=broad-except
+                    error = error or e
+            for f in (self.output_file, self.noise_file):
+                try:
+                    if os.path.lexists(f):
+                        os.remove(f)
+                except OSError as e:
+                    error = error or e
+            if error is not None:
+                raise error
+
+        return noise_points
+
+    def run_synopses(self, params: Dict[str, float], retries: int = 0, cutoff: Tuple[str, float] = None) -> Tuple[float, float]:
         """Runs the synopses for a given set of parameters.
         Returns the RMSE and Compression Ratio.
 
         Arguments:
             params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
             retries {int} -- An integer that counts how many times a synopses has gone wrong (default: {0})
+            cutoff {Tuple[str, float]} -- An option of `crit()` and a fitness. The evaluation stops as soon as the parameters
+                are proven worse than it (see `StreamingRMSE`). Only for the 'numpy' engine (default: {None})
+
+        Raises:
+            Censored: When the cutoff is crossed
 
         Returns:
             Tuple[float, float] -- (RMSE, Compr.Ratio)
         """
 
+        if self.rmse_engine == 'python':
+            # Run Synopses-Generator and read the output
+            _, out_data, noise = self.run_synopses_and_read_result(params, retries)
+
+            # Calculate RMSE and Comprasion Ratio
+            return estimate_RMSE(self.in_data, out_data, deepcopy(noise))
+
+        return rmse_ratio(*self.run_synopses_sums(params, retries, cutoff))
+
+
+    def run_synopses_sums(self, params: Dict[str, float], retries: int = 0, cutoff: Tuple[str, float] = None) -> Tuple[float, int, int]:
+        """Runs the synopses for a given set of parameters, and returns the sums that give the RMSE and Compression Ratio
+        (see `squared_error_sums()`). The sums of Daemons on different parts can be added, and given to `rmse_ratio()`.
+        With the 'python' engine they are the sums of `estimate_RMSE()` (see `reference_error_sums()`), and the cutoff is not used.
+
+        Without streaming, a cutoff stops the estimation of the RMSE, but the generator runs to the end.
+
+        Arguments:
+            params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
+            retries {int} -- An integer that counts how many times a synopses has gone wrong (default: {0})
+            cutoff {Tuple[str, float]} -- See `run_synopses()` (default: {None})
+
+        Raises:
+            Censored: When the cutoff is crossed
+
+        Returns:
+            Tuple[float, int, int] -- Sum of squared errors, number of uncompressed points, number of compressed points
+        """
+
+        if self.rmse_engine == 'python':
+            # Run Synopses-Generator and read the output
+            _, out_data, noise = self.run_synopses_and_read_result(params, retries)
+            return reference_error_sums(self.in_data, out_data, deepcopy(noise))
+
+        if self.streaming and not self.compact and (self.noise_cache or self.generator == 'python'):
+            return self.stream_synopses(params, retries, cutoff=cutoff)
+
         # Run Synopses-Generator and read the output
         _, out_data, noise = self.run_synopses_and_read_result(params, retries)
 
-        # Calculate RMSE and Comprasion Ratio
-        rmse, comp_ratio = estimate_RMSE(self.in_data, out_data, deepcopy(noise))
+        if cutoff is not None:
+            # Ship by ship, in the order of squared_error_sums() so that the sums are the same
+            est = StreamingRMSE(self.in_tracks, noise, cutoff=cutoff)
+            est.consume(((idd, out_data[idd]) for idd in self.in_tracks if idd in out_data), complete=True)
+            return est.sums()
+
+        return squared_error_sums(self.in_tracks, out_data, noise)
+
+
+    async def run_synopses_async(self, params: Dict[str, float], cutoff: Tuple[str, float] = None, sums: bool = False) -> Union[Tuple[float, float], Tuple[float, int, int]]:
+        """Coroutine of `run_synopses()` (or `run_synopses_sums()` with sums), for an event loop that also waits for other work.
+        It is a wrapper of the blocking run in the default (thread pool) executor of the loop: the generator is still started and
+        read by `run_synopses()` in that thread, not by asyncio subprocesses with non-blocking reads. The Daemon has a single set
+        of files and a single session, so its runs wait for each other. To run several at once, use an `AsyncDaemonPool`.
+
+        Arguments:
+            params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
+
+        Keyword Arguments:
+            cutoff {Tuple[str, float]} -- See `run_synopses()` (default: {None})
+            sums {bool} -- Whether to return the sums of `run_synopses_sums()` (default: {False})
+
+        Raises:
+            Censored: When the cutoff is crossed
+            GeneratorTimeout: When the run takes longer than self.timeout
+
+        Returns:
+            Union[Tuple[float, float], Tuple[float, int, int]] -- (RMSE, Compr.Ratio), or the sums
+        """
+
+        # A new lock for each loop, e.g. for each asyncio.run()
+        loop = asyncio.get_running_loop()
+        if self.async_loop is not loop:
+            self.async_loop = loop
+            self.async_lock = asyncio.Lock()
+
+        run = self.run_synopses_sums if sums else self.run_synopses
+        async with self.async_lock:
+            return await loop.run_in_executor(None, functools.partial(run, params, cutoff=cutoff))
+
+    def end(self):
+        """Stops the session
+        Removes the scratch folder (input, output and parameter files)
+        Releases the id
+        """
+
+        self.stop_session()
+
+        # Delete csv, output and parameter files that were created during runs
+        self.remove_scratch()
+
+        # The staged input of this Daemon, if no other one links it
+        if self.input_cache:
+            input_cache.unstage(self.stage_folder)
+
+        # Last, so that no other Daemon takes the id while its files are still used
+        release_slot(self.slot_lock)
+        self.slot_lock = None
+
+
+def exit_on_signal(signum, frame):
+    """Signal handler that raises SystemExit, so that the `finally` blocks and the finalizers run."""
+    raise SystemExit(128 + signum)
+
+
+def daemon_worker(conn, args: Tuple, kwargs: Dict):
+    """Main function of a process of a `DaemonPool`: builds a Daemon and runs the (parameters, cutoff, sums) it receives until it receives None.
+    With sums, the result is the one of `Daemon.run_synopses_sums()` instead of `Daemon.run_synopses()`.
+
+    Arguments:
+        conn {multiprocessing.connection.Connection} -- Connection with the pool
+        args {Tuple} -- Arguments of the Daemon
+        kwargs {Dict} -- Keyword arguments of the Daemon
+    """
+
+    # Terminated by the pool: exit normally, so that the Daemon ends
+    signal.signal(signal.SIGTERM, exit_on_signal)
+
+    try:
+        daemon = Daemon(*args, **kwargs)
+    except Exception as e: # pylint: disable=broad-except
+        conn.send(('error', repr(e)))
+        return
+
+    conn.send(('ready', daemon.id))
+
+    try:
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+
+            params, cutoff, sums = msg
+            start_time = time.time()
+            try:
+                res = daemon.run_synopses_sums(params, cutoff=cutoff) if sums else daemon.run_synopses(params, cutoff=cutoff)
+            except Censored as e:
+                conn.send(('censored', e.bounds, time.time() - start_time))
+                continue
+            except GeneratorTimeout as e:
+                conn.send(('timeout', (e.secs, e.stderr), time.time() - start_time))
+                continue
+            except Exception as e: # pylint: disable=broad-except
+                conn.send(('error', repr(e)))
+                continue
+            conn.send(('done', tuple(res), time.time() - start_time))
+    finally:
+        daemon.end()
+
+
+def worker_result(msg: Tuple) -> Tuple[Union[Tuple[float, float], Censored, GeneratorTimeout], float]:
+    """The result of a reply of `daemon_worker()` to a run.
+
+    Arguments:
+        msg {Tuple} -- The reply
+
+    Raises:
+        RuntimeError: If the Daemon failed to run the parameters
+
+    Returns:
+        Tuple[Union[Tuple[float, float], Censored, GeneratorTimeout], float] -- The result (or a `Censored` or a `GeneratorTimeout`, not raised)
+            and the running time in seconds
+    """
+
+    if msg[0] == 'censored':
+        return Censored(msg[1]), msg[2]
+    if msg[0] == 'timeout':
+        return GeneratorTimeout(*msg[1]), msg[2]
+    if msg[0] != 'done':
+        raise RuntimeError(f'Daemon of pool failed: {msg[1]}')
+    return msg[1], msg[2]
+
+
+class DaemonPool:
+    """A pool of processes, each with its own Daemon (and so its own id), that run sets of parameters in parallel.
+    """
+
+    def __init__(self, workers: int, *args, **kwargs):
+        """Constructor. Starts the processes, one after the other, and waits for their Daemons to be built.
+
+        Arguments:
+            workers {int} -- Number of processes
+            args, kwargs -- The arguments of each `Daemon`
+
+        Raises:
+            RuntimeError: If a Daemon could not be built
+        """
+
+        self.processes = []
+        self.conns = []
+
+        # Connections of the Daemons that wait for work, and of the ones that run (connection -> (tag, parameters))
+        self.free = []
+        self.running = {}
+
+        # Time in seconds of each run of the last call of `map()`
+        self.run_times = []
+
+        for _ in range(workers):
+            parent, child = multiprocessing.Pipe()
+            p = multiprocessing.Process(target=daemon_worker, args=(child, args, kwargs), daemon=True)
+            p.start()
+            self.processes.append(p)
+            self.conns.append(parent)
+            self.free.append(parent)
+
+            # Wait for this Daemon to take its id before starting the next
+            msg = parent.recv()
+            if msg[0] != 'ready':
+                self.end()
+                raise RuntimeError(f'Daemon of pool could not start: {msg[1]}')
+
+    def map(self, params_list: List[Dict[str, float]], cutoff: Tuple[str, float] = None, sums: bool = False) -> List[Union[Tuple[float, float], Censored, GeneratorTimeout]]:
+        """Runs the synopses for each set of parameters, on the first free Daemon.
+
+        Arguments:
+            params_list {List[Dict[str, float]]} -- Sets of parameters, each maps the name of a parameter to its value.
+
+        Keyword Arguments:
+            cutoff {Tuple[str, float]} -- The cutoff of every run, see `Daemon.run_synopses()` (default: {None})
+            sums {bool} -- Whether to return the sums of `Daemon.run_synopses_sums()` instead of the (RMSE, Compr.Ratio) (default: {False})
 
-        return rmse, comp_ratio
+        Raises:
+            RuntimeError: If a Daemon failed to run a set of parameters
+
+        Returns:
+            List[Union[Tuple[float, float], Censored, GeneratorTimeout]] -- (RMSE, Compr.Ratio) of each set of parameters, in the same order,
+                or a `Censored` (not raised) for the runs that crossed the cutoff, or a `GeneratorTimeout` (not raised) for the runs that were killed
+        """
+
+        results = [None] * len(params_list)
+        self.run_times = []
+
+        todo = list(enumerate(params_list))[::-1]
+        errors = []
+
+        while todo or self.running:
+            # Give work to every free Daemon
+            while self.free and todo and not errors:
+                i, params = todo.pop()
+                self.submit(params, i, cutoff, sums)
+
+            if not self.running:
+                break
+
+            try:
+                i, res, secs = self.next_result()
+            except RuntimeError as e:
+                # Wait for the other runs before raising
+                errors.append(e)
+                continue
+
+            results[i] = res
+            self.run_times.append(secs)
+
+        if errors:
+            raise errors[0]
+
+        return results
+
+    def submit(self, params: Dict[str, float], tag=None, cutoff: Tuple[str, float] = None, sums: bool = False):
+        """Gives a set of parameters to a free Daemon, without waiting for the result (see `next_result()`).
+
+        Arguments:
+            params {Dict[str, float]} -- Maps the name of a parameter to its value
+
+        Keyword Arguments:
+            tag -- Returned with the result, to know which run it is (default: {None})
+            cutoff {Tuple[str, float]} -- See `Daemon.run_synopses()` (default: {None})
+            sums {bool} -- See `map()` (default: {False})
 
+        Raises:
+            RuntimeError: If no Daemon is free
+        """
+
+        if not self.free:
+            raise RuntimeError('No Daemon of the pool is free')
+
+        conn = self.free.pop()
+        conn.send((params, cutoff, sums))
+        self.running[conn] = (tag, params)
+
+    def next_result(self) -> Tuple[object, Union[Tuple[float, float], Censored, GeneratorTimeout], float]:
+        """Waits for the first of the submitted runs to finish. Its Daemon becomes free.
+
+        Raises:
+            RuntimeError: If the Daemon failed to run the parameters
+
+        Returns:
+            Tuple[object, Union[Tuple[float, float], Censored, GeneratorTimeout], float] -- The tag of the run, the (RMSE, Compr.Ratio)
+                (or a `Censored` if it crossed its cutoff, or a `GeneratorTimeout` if it was killed) and the running time in seconds
+        """
+
+        conn = wait(list(self.running))[0]
+        tag, params = self.running.pop(conn)
+        try:
+            msg = conn.recv()
+        except EOFError:
+            # The process died, do not use it again
+            raise RuntimeError(f'Daemon of pool failed: process of parameters {params} exited') from None
+
+        self.free.append(conn)
+        return (tag,) + worker_result(msg)
 
     def end(self):
-        """Removes id from ids file
-        Removes input file and parameter files
+        """Stops the processes, which end their Daemons.
         """
 
-        with open(self.ids_file, 'r') as f:
-            taken = set(f.read().split())
-            taken.remove(self.id)
+        for conn, p in zip(self.conns, self.processes):
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            p.join()
+
+        self.conns = []
+        self.processes = []
+        self.free = []
+        self.running = {}
 
-        with open(self.ids_file, 'w') as f:
-            for i in taken:
-                f.write(i + ' ')
 
-        # Delete csv and parameter files that were created during runs
+class AsyncDaemonPool:
+    """The processes of a `DaemonPool`, driven by an event loop: each run is a coroutine that sends the parameters to a free
+    Daemon and awaits its reply, and the replies are read when their pipes are readable, without threads. Any number of runs
+    can be gathered; at most one runs on each Daemon, and the others wait for a free one in the order they came.
+    Between two event loops, the processes can also be given one run at a time with `submit()` and `next_result()` of `self.pool`.
+
+    Example:
+        pool = AsyncDaemonPool(4, ship_type, parts, dataset, fcode)
         try:
-            os.remove(self.input_file)
-        except FileNotFoundError:
-            pass
+            results = asyncio.run(pool.map(params_list))
+        finally:
+            pool.end()
+    """
+
+    def __init__(self, workers: int, *args, **kwargs):
+        """Constructor. Starts the processes, see `DaemonPool`.
+
+        Arguments:
+            workers {int} -- Number of processes
+            args, kwargs -- The arguments of each `Daemon`
+        """
+
+        self.pool = DaemonPool(workers, *args, **kwargs)
+
+        # Connections of the Daemons that run, and of the ones whose process died
+        self.busy = set()
+        self.dead = set()
+
+        # Queue of the free connections, made for each event loop that uses the pool
+        self.loop = None
+        self.free = None
+
+        # Time in seconds of each run of the last call of `map()`
+        self.run_times = []
+
+    def free_queue(self) -> asyncio.Queue:
+        """The queue of the free connections, for the running loop."""
+
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.free = asyncio.Queue()
+            for conn in self.pool.conns:
+                if conn in self.busy:
+                    # Its run was cancelled with the previous loop, so its reply is still unread
+                    loop.create_task(self.drain(conn))
+                elif conn not in self.dead:
+                    self.free.put_nowait(conn)
+            if len(self.dead) == len(self.pool.conns):
+                self.free.put_nowait(None)
+        return self.free
+
+    def lost(self, conn):
+        """Marks the connection of a process that died, so it is not used again. When no Daemon is left,
+        None is put on the queue of the free connections, which wakes the runs that wait for one (see `run()`).
+        """
+
+        self.busy.discard(conn)
+        self.dead.add(conn)
+        if len(self.dead) == len(self.pool.conns):
+            self.free_queue().put_nowait(None)
 
+    async def reply(self, conn) -> Tuple:
+        """Waits until a connection is readable, and reads its message."""
+
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        loop.add_reader(conn.fileno(), lambda: ready.done() or ready.set_result(None))
         try:
-            os.remove(self.param_file_loc)
-        except FileNotFoundError:
-            pass
+            await ready
+        finally:
+            loop.remove_reader(conn.fileno())
+        return conn.recv()
+
+    async def drain(self, conn):
+        """Reads the reply of a cancelled run, then frees its Daemon."""
+
+        try:
+            await self.reply(conn)
+        except (EOFError, OSError):
+            self.lost(conn)
+            return
+        self.busy.discard(conn)
+        self.free_queue().put_nowait(conn)
+
+    async def run(self, params: Dict[str, float], cutoff: Tuple[str, float] = None, sums: bool = False) -> Union[Tuple[float, float], Censored, GeneratorTimeout]:
+        """Runs a set of parameters on the first free Daemon.
+
+        Arguments:
+            params {Dict[str, float]} -- Maps the name of a parameter to its value
+
+        Keyword Arguments:
+            cutoff {Tuple[str, float]} -- See `Daemon.run_synopses()` (default: {None})
+            sums {bool} -- See `DaemonPool.map()` (default: {False})
+
+        Raises:
+            RuntimeError: If the Daemon failed to run the parameters, or if every Daemon of the pool died
+
+        Returns:
+            Union[Tuple[float, float], Censored, GeneratorTimeout] -- As an item of `DaemonPool.map()`
+        """
+
+        conn = await self.free_queue().get()
+        if conn is None:
+            # Left on the queue for the next run that waits
+            self.free_queue().put_nowait(None)
+            raise RuntimeError('Every Daemon of the pool failed')
+
+        self.busy.add(conn)
+        try:
+            conn.send((params, cutoff, sums))
+            msg = await self.reply(conn)
+        except (EOFError, OSError):
+            # The process died, do not use it again
+            self.lost(conn)
+            raise RuntimeError(f'Daemon of pool failed: process of parameters {params} exited') from None
+        except asyncio.CancelledError:
+            # The Daemon is given no other run until its reply is read
+            asyncio.get_running_loop().create_task(self.drain(conn))
+            raise
+
+        self.busy.discard(conn)
+        self.free_queue().put_nowait(conn)
+
+        res, secs = worker_result(msg)
+        self.run_times.append(secs)
+        return res
+
+    async def map(self, params_list: List[Dict[str, float]], cutoff: Tuple[str, float] = None, sums: bool = False) -> List[Union[Tuple[float, float], Censored, GeneratorTimeout]]:
+        """Runs the sets of parameters, as many at once as there are Daemons. Same as `DaemonPool.map()`, as a coroutine.
+
+        Raises:
+            RuntimeError: If a Daemon failed to run a set of parameters, once all the runs have ended
+        """
+
+        self.run_times = []
+        outs = await asyncio.gather(*(self.run(params, cutoff, sums) for params in params_list), return_exceptions=True)
+
+        for res in outs:
+            if isinstance(res, Exception) and not isinstance(res, (Censored, GeneratorTimeout)):
+                raise res
+        return outs
+
+    def end(self):
+        """Stops the processes, which end their Daemons."""
+        self.pool.end()
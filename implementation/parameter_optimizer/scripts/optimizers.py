@@ -0,0 +1,220 @@
+"""Backends that search the synopses parameters, all driven through the same deap toolbox as `genetic.py`:
+`toolbox.evaluate` gives the fitness of an individual (a list of values of `PARAMETERS`) and `toolbox.map` evaluates
+a batch of them, e.g. on the pool of Daemons. So each backend uses the `results`, the `crit()` option and the save format of the script.
+
+* 'ga' -- `algorithms.eaSimple` of deap, as before.
+* 'cmaes' -- CMA-ES (`deap.cma.Strategy`) on the parameters scaled to [0, 1], started from the best individual of the initial population.
+* 'bo' -- Batch Bayesian optimization: a Gaussian process (see `surrogate.py`) of the log-fitness proposes each batch,
+  every individual of the batch with the lowest confidence bound for a different weight of the uncertainty.
+
+Every backend evaluates the initial population and then `ngen` batches of `len(population)` individuals, and logs
+a line for each batch, in the format of eaSimple. See `bench_optimizers.py` for a comparison.
+"""
+
+import random
+from typing import List
+
+import numpy as np
+from deap import algorithms, cma, tools
+
+from local_lib import PARAMETERS, round_param
+from surrogate import GaussianProcess, scale
+
+
+BACKENDS = ('ga', 'cmaes', 'bo')
+
+# Fitness of the individuals that are out of range or whose run was killed by the timeout (see `genetic.py`)
+FAILED = 1e20
+
+# Number of random candidates that the Bayesian optimization scores for each batch (plus as many around the best individuals)
+CANDIDATES = 2000
+
+
+def to_values(x: np.ndarray) -> List:
+    """The values of the parameters at a point of [0, 1]^8, rounded by `local_lib.round_param()` as the genetic algorithms make them."""
+
+    values = []
+    for xi, (low, high) in zip(np.clip(x, 0, 1), PARAMETERS.values()):
+        v = low + xi * (high - low)
+        values.append(round_param(round(v) if isinstance(low, int) else v, low, high))
+    return values
+
+
+def random_values() -> List:
+    """Random values of the parameters, as `genetic.py` picks them."""
+    return to_values(np.random.random(len(PARAMETERS)))
+
+
+def mutate_values(ind, indpb: float):
+    """Mutation of `genetic.py`: gaussian noise with a std of a quarter of the range, to each value with probability indpb."""
+
+    x = scale([ind])[0]
+    for i in range(len(ind)):
+        if random.random() < indpb:
+            x[i] += np.random.normal(scale=0.25)
+    ind[:] = to_values(x)
+    return ind,
+
+
+def log_batch(logbook: tools.Logbook, population: List, gen: int, nevals: int, stats=None, halloffame=None, verbose: bool = True):
+    """Records (and prints) a line of the log, and updates the hall of fame, as eaSimple does."""
+
+    if halloffame is not None:
+        halloffame.update(population)
+    record = stats.compile(population) if stats else {}
+    logbook.record(gen=gen, nevals=nevals, **record)
+    if verbose:
+        print(logbook.stream)
+
+
+def evaluate_batch(toolbox, individuals: List) -> int:
+    """Sets the fitness of the individuals without one, with toolbox.map. Returns how many were evaluated."""
+
+    invalid = [ind for ind in individuals if not ind.fitness.valid]
+    for ind, fit in zip(invalid, toolbox.map(toolbox.evaluate, invalid)):
+        ind.fitness.values = fit
+    return len(invalid)
+
+
+def ea_cmaes(population: List, toolbox, ngen: int, stats=None, halloffame=None, verbose: bool = True, sigma: float = 0.25):
+    """CMA-ES on the scaled parameters, with batches of len(population).
+
+    Args:
+        population (List): The initial population, evaluated first. The best individual is the first mean.
+        toolbox (deap.base.Toolbox): With evaluate and map
+        ngen (int): The number of batches after the initial population
+        stats (deap.tools.Statistics, optional): Compiled at each batch. Defaults to None.
+        halloffame (optional): Updated at each batch. Defaults to None.
+        verbose (bool, optional): Whether to print the log. Defaults to True.
+        sigma (float, optional): The initial step on the scaled parameters. Defaults to 0.25.
+
+    Returns:
+        Tuple: The last batch and the deap.tools.Logbook
+    """
+
+    ind_class = type(population[0])
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+    log_batch(logbook, population, 0, evaluate_batch(toolbox, population), stats, halloffame, verbose)
+
+    best = min(population, key=lambda ind: ind.fitness.values[0])
+    strategy = cma.Strategy(centroid=list(scale([best])[0]), sigma=sigma, lambda_=len(population))
+
+    for gen in range(1, ngen + 1):
+        points = strategy.generate(ind_class)
+        batch = [ind_class(to_values(np.array(p))) for p in points]
+        nevals = evaluate_batch(toolbox, batch)
+
+        # The strategy is updated with the points it generated, and the fitness of their rounded values
+        for p, ind in zip(points, batch):
+            p.fitness.values = ind.fitness.values
+        strategy.update(points)
+
+        population = batch
+        log_batch(logbook, population, gen, nevals, stats, halloffame, verbose)
+
+    return population, logbook
+
+
+def propose_batch(x: np.ndarray, y: np.ndarray, size: int, seen: set) -> List[List]:
+    """Proposes a batch with a Gaussian process of the log-fitness: the i-th individual has the lowest mean - kappa_i * std
+    among random candidates and candidates around the best points, with kappa from 0 (exploit) to 3 (explore).
+
+    Args:
+        x (np.ndarray): The scaled parameters of the evaluated individuals
+        y (np.ndarray): Their log-fitness
+        size (int): Size of the batch
+        seen (set): Values (tuples) that must not be proposed, updated with the batch
+
+    Returns:
+        List[List]: The values of the parameters of each individual of the batch
+    """
+
+    model = GaussianProcess().fit(x, y)
+
+    best = x[np.argsort(y)[:10]]
+    around = best[np.random.randint(len(best), size=CANDIDATES)] + np.random.normal(scale=0.1, size=(CANDIDATES, x.shape[1]))
+    candidates = np.clip(np.vstack((np.random.random((CANDIDATES, x.shape[1])), around)), 0, 1)
+
+    mean, std = model.predict(candidates, return_std=True)
+
+    batch = []
+    for kappa in np.linspace(0, 3, size):
+        for i in np.argsort(mean - kappa * std):
+            values = to_values(candidates[i])
+            if tuple(values) not in seen:
+                seen.add(tuple(values))
+                batch.append(values)
+                break
+    return batch
+
+
+def random_batch(size: int, seen: set) -> List[List]:
+    """A batch of random values of the parameters that are not in seen (which is updated), e.g. while no fitness is measured."""
+
+    batch = []
+    while len(batch) < size:
+        values = random_values()
+        if tuple(values) not in seen:
+            seen.add(tuple(values))
+            batch.append(values)
+    return batch
+
+
+def ea_bayes(population: List, toolbox, ngen: int, stats=None, halloffame=None, verbose: bool = True):
+    """Batch Bayesian optimization, with batches of len(population).
+
+    Args:
+        population (List): The initial population, evaluated first
+        toolbox (deap.base.Toolbox): With evaluate and map
+        ngen (int): The number of batches after the initial population
+        stats (deap.tools.Statistics, optional): Compiled at each batch. Defaults to None.
+        halloffame (optional): Updated at each batch. Defaults to None.
+        verbose (bool, optional): Whether to print the log. Defaults to True.
+
+    Returns:
+        Tuple: The last batch and the deap.tools.Logbook
+    """
+
+    ind_class = type(population[0])
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + (stats.fields if stats else [])
+
+    log_batch(logbook, population, 0, evaluate_batch(toolbox, population), stats, halloffame, verbose)
+
+    evaluated = list(population)
+    seen = {tuple(ind) for ind in evaluated}
+
+    for gen in range(1, ngen + 1):
+        # The failed individuals are left out of the model, as their fitness is not measured; they stay in seen
+        fitness = np.array([ind.fitness.values[0] for ind in evaluated])
+        ok = fitness < FAILED
+
+        if ok.sum() >= 2:
+            batch = [ind_class(values) for values in propose_batch(scale(evaluated)[ok], np.log(fitness[ok] + 1e-12), len(population), seen)]
+        else:
+            batch = [ind_class(values) for values in random_batch(len(population), seen)]
+        nevals = evaluate_batch(toolbox, batch)
+        evaluated += batch
+
+        population = batch
+        log_batch(logbook, population, gen, nevals, stats, halloffame, verbose)
+
+    return population, logbook
+
+
+def run(backend: str, population: List, toolbox, cxpb: float, mutpb: float, ngen: int, stats=None, halloffame=None, verbose: bool = True):
+    """Runs a backend with the arguments of eaSimple (cxpb and mutpb are only used by 'ga').
+
+    Returns:
+        Tuple: The final population and the deap.tools.Logbook
+    """
+
+    if backend == 'ga':
+        return algorithms.eaSimple(population, toolbox, cxpb=cxpb, mutpb=mutpb, ngen=ngen, stats=stats, halloffame=halloffame, verbose=verbose)
+    if backend == 'cmaes':
+        return ea_cmaes(population, toolbox, ngen, stats, halloffame, verbose)
+    if backend == 'bo':
+        return ea_bayes(population, toolbox, ngen, stats, halloffame, verbose)
+    raise ValueError(f'Unknown backend {backend}. Use one of {BACKENDS}')
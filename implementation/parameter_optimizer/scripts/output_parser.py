@@ -0,0 +1,163 @@
+"""Parser of the output of the Synopses-Generator, for the four fields that the scripts use.
+
+Each line is a JSON record (the `toString()` of an Avro `critical_point`), that begins with the fields
+`timestamp`, `id`, `longitude` and `latitude`, followed by a dozen fields (annotation, speed, heading, ...)
+that are not needed. `parse_point()` reads the first four fields with a regular expression, and only lines
+that do not start in this form (e.g. other writers, or other spacing) are decoded with `json.loads()`.
+
+See `bench_parse.py` for a comparison with `json.loads()`.
+
+The jar can also write compact binary records (see `CompactOutput.scala`), that identify each point by its row
+in the input. `read_compact()` reads them, and `expand_compact()` turns them back to JSON lines.
+"""
+
+import json
+import os
+import re
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+
+# A JSON number as written by Java (Double.toString) or by Python
+NUMBER = r'-?(?:\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|NaN|Infinity)'
+
+# The beginning of an output line: timestamp, id, longitude, latitude
+POINT_PREFIX = re.compile(r'\{"timestamp": (-?\d+), "id": "([^"\\]*)", "longitude": (' + NUMBER + r'), "latitude": (' + NUMBER + r')[,}]')
+
+# The beginning of an output line, up to the id
+ID_PREFIX = re.compile(r'\{"timestamp": -?\d+, "id": "([^"\\]*)"')
+
+
+def parse_point(line: str) -> Tuple[str, float, float, int]:
+    """Reads a point from an output line.
+
+    Arguments:
+        line {str} -- A non-empty output line
+
+    Returns:
+        Tuple[str, float, float, int] -- (id, lon, lat, t), with the values that `json.loads()` would give
+    """
+
+    m = POINT_PREFIX.match(line)
+    if m is not None:
+        return m.group(2), float(m.group(3)), float(m.group(4)), int(m.group(1))
+
+    t = json.loads(line)
+    return t['id'], t['longitude'], t['latitude'], t['timestamp']
+
+
+def parse_id(line: str) -> str:
+    """Reads the ship-ID of an output line.
+
+    Arguments:
+        line {str} -- A non-empty output line
+
+    Returns:
+        str -- The ship-ID
+    """
+
+    m = ID_PREFIX.match(line)
+    if m is not None:
+        return m.group(1)
+
+    return json.loads(line)['id']
+
+
+def read_columns(lines: Iterable[str], size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Reads the points of some output lines into arrays, allocated once with the given size.
+
+    Arguments:
+        lines {Iterable[str]} -- Output lines, empty lines are skipped
+        size {int} -- An upper bound of the number of points, e.g. the number of lines (grows if it is exceeded)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray] -- The ids (object), lon, lat (float64) and t (int64) of the points, in order
+    """
+
+    ids = np.empty(size, dtype=object)
+    lon = np.empty(size, dtype=np.float64)
+    lat = np.empty(size, dtype=np.float64)
+    t = np.empty(size, dtype=np.int64)
+
+    n = 0
+    for line in lines:
+        if len(line) <= 1:
+            continue
+
+        if n == len(t):
+            size = max(2*size, 1024)
+            ids, lon, lat, t = (np.resize(a, size) for a in (ids, lon, lat, t))
+
+        ids[n], lon[n], lat[n], t[n] = parse_point(line)
+        n += 1
+
+    return ids[:n], lon[:n], lat[:n], t[:n]
+
+
+def read_columns_file(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """`read_columns()` of a file, with arrays sized by its number of lines."""
+
+    with open(path, 'rb') as f:
+        size = sum(chunk.count(b'\n') for chunk in iter(lambda: f.read(1 << 20), b'')) + 1
+
+    with open(path, 'r') as f:
+        return read_columns(f, size)
+
+
+# A record of the compact output of the jar (see CompactOutput.scala), big-endian
+COMPACT_RECORD = np.dtype([('row', '>i8'), ('timestamp', '>i8'), ('flags', '>u2'), ('speed', '>f8'), ('heading', '>f8')])
+
+# The flags of the annotation of a critical point, bit i of `flags` is ANNOTATION[i]
+ANNOTATION = ('stop_start', 'stop_end', 'change_in_speed_start', 'change_in_speed_end', 'slow_motion_start',
+              'slow_motion_end', 'gap_start', 'gap_end', 'change_in_heading', 'noise')
+
+
+def read_compact(path: str) -> np.ndarray:
+    """Reads a file of compact records. A missing file has no records.
+
+    Arguments:
+        path {str} -- The file
+
+    Returns:
+        np.ndarray -- The records, with dtype `COMPACT_RECORD`
+    """
+
+    if not os.path.exists(path):
+        return np.empty(0, dtype=COMPACT_RECORD)
+    return np.fromfile(path, dtype=COMPACT_RECORD)
+
+
+def expand_compact(records: np.ndarray, tracks) -> Iterator[str]:
+    """Turns compact records to JSON lines with the fields of the text output of the jar (without the new line).
+    The fields that the records do not keep (distance, time_elapsed, msg_error_flag, heading_diff, percental_speed_change)
+    get their default values, and `ingestion_timestamp` is the row.
+
+    Arguments:
+        records {np.ndarray} -- Records of `read_compact()`
+        tracks {raw_cache.RawTracks} -- The raw points of the input that the records refer to
+
+    Yields:
+        str -- A JSON line per record
+    """
+
+    pos = tracks.positions()[records['row']]
+    ship = np.searchsorted(tracks.offsets, pos, side='right') - 1
+
+    for rec, p, s in zip(records.tolist(), pos.tolist(), ship.tolist()):
+        row, t, flags, speed, heading = rec
+        yield json.dumps({
+            'timestamp': t,
+            'id': str(tracks.ids[s]),
+            'longitude': float(tracks.lon[p]),
+            'latitude': float(tracks.lat[p]),
+            'annotation': {a: bool(flags >> i & 1) for i, a in enumerate(ANNOTATION)},
+            'distance': 0.0,
+            'speed': speed,
+            'heading': heading,
+            'time_elapsed': 0,
+            'msg_error_flag': '',
+            'ingestion_timestamp': row,
+            'heading_diff': -1.0,
+            'percental_speed_change': -1.0
+        })
@@ -0,0 +1,300 @@
+#!/usr/bin/python3
+
+'''
+Runs a single multi-objective GA (NSGA-II or SPEA2 of deap) that minimizes (RMSE, Ratio) at once, instead of one GA
+for each optimization function as `hyperparam.py` does. Saves the Pareto front of all the evaluated parameters,
+so that `front.py` can pick the best parameters for any option of `crit()` or any bound, without running the generator again.
+'''
+
+import argparse
+import os
+import pickle
+import sys
+from typing import List
+
+import numpy as np
+from deap import algorithms, base, creator, tools
+from termcolor import colored
+
+from eval_store import DEFAULT_PATH, EvalStore
+from local_lib import DEF_PARAMS, PARAMETERS, Daemon, DaemonPool, GeneratorTimeout, generator_version, mutate_ind, pareto_front, random_params
+
+
+# Selection operators of deap for each algorithm
+SELECTIONS = {
+    'nsga2': tools.selNSGA2,
+    'spea2': tools.selSPEA2
+}
+
+
+def eprint(*args, **kwargs):
+    """Print in std err.
+    """
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def individual_params(individual: List):
+    """Creates a dict that maps the parameter name to the value of an individual, or None if a value is outside of its range."""
+
+    params = {}
+    for v, (k, (low, high)) in zip(individual, PARAMETERS.items()):
+        if v < low or v > high:
+            return None
+        params[k] = v
+    return params
+
+
+def evaluate(individual: List):
+    """Returns the (RMSE, Ratio) of an individual, both to be minimized. Uses `results` and the store before running it.
+
+    Args:
+        individual (List): A list of values for the synopses parameters
+
+    Returns:
+        Tuple[float, float]: (RMSE, Ratio)
+    """
+
+    global results
+    global daemon
+    global store
+    global failed
+
+    key = tuple(individual)
+    if key in results:
+        return results[key]
+
+    params = individual_params(individual)
+
+    # If value outside of range, or killed by the timeout of the generator, return huge values
+    if params is None or key in failed:
+        return 1e20, 1e20
+
+    try:
+        if store is None:
+            results[key] = daemon.run_synopses(params)
+        else:
+            results[key] = store.evaluate(individual, lambda: daemon.run_synopses(params))
+    except GeneratorTimeout as e:
+        print(e, key, file=sys.stderr)
+        failed.add(key)
+        return 1e20, 1e20
+
+    return results[key]
+
+
+def parallel_map(func, individuals: List) -> List:
+    """Map of the toolbox when -workers > 1. Runs the new individuals on the pool of Daemons, then calls `func` (which is `evaluate`) that finds them in `results`.
+
+    Args:
+        func (Callable): The evaluation function
+        individuals (List): The individuals to evaluate
+
+    Returns:
+        List: The fitness of each individual
+    """
+
+    global results
+    global pool
+    global store
+    global failed
+
+    def run(params):
+        res = pool.map([params])[0]
+        if isinstance(res, GeneratorTimeout):
+            raise res
+        return res
+
+    todo = {}
+    for ind in individuals:
+        key = tuple(ind)
+        if key in results or key in failed or key in todo:
+            continue
+
+        params = individual_params(ind)
+        if params is None:
+            continue
+
+        res = None if store is None else store.get(key)
+        if res is not None:
+            results[key] = res
+        elif store is None or store.claim(key):
+            todo[key] = params
+        else:
+            # Another process runs it
+            try:
+                results[key] = store.evaluate(key, lambda: run(params))  # pylint: disable=cell-var-from-loop
+            except GeneratorTimeout as e:
+                print(e, key, file=sys.stderr)
+                failed.add(key)
+
+    if len(todo) > 0:
+        try:
+            outs = pool.map(list(todo.values()))
+        except BaseException:
+            if store is not None:
+                for key in todo:
+                    store.release(key)
+            raise
+
+        for key, res in zip(todo, outs):
+            if isinstance(res, GeneratorTimeout):
+                print(res, key, file=sys.stderr)
+                failed.add(key)
+                if store is not None:
+                    store.release(key)
+                continue
+
+            results[key] = res
+            if store is not None:
+                store.put(key, *res)
+
+    return list(map(func, individuals))
+
+
+def individual_generator():
+    """Generates an individual with random values in the ranges of PARAMETERS.
+
+    Returns:
+       [Individual]
+    """
+
+    return creator.Individual(random_params()) # pylint: disable=no-member
+
+
+my_parser = argparse.ArgumentParser(description='Runs a multi-objective genetic algorithm on (RMSE, Ratio), on 5 of 6 parts.',
+                                    formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=50))
+
+my_parser.add_argument('-type',
+                       type=int,
+                       required=True,
+                       help=colored('The type of ship\n', 'cyan'))
+
+my_parser.add_argument('-p',
+                       type=int,
+                       required=True,
+                       help=colored('The part to exclude, e.g. if -p=3, will train on parts 1,2,4,5,6\n', 'cyan'))
+
+my_parser.add_argument('-data',
+                       type=str,
+                       required=True,
+                       choices=sorted([d for d in os.listdir('../../data') if os.path.isdir(os.path.join('../../data/', d))]),
+                       help=colored('Dataset from which to read.\n', 'cyan'))
+
+my_parser.add_argument('-fcode',
+                       type=str,
+                       default='month',
+                       help=colored('The files from which to read. This refers to files in ../../data/*/data_per_type/cross/type*/\n', 'cyan'))
+
+my_parser.add_argument('-algo',
+                       type=str,
+                       default='nsga2',
+                       choices=sorted(SELECTIONS),
+                       help=colored('The multi-objective selection.\n', 'cyan'))
+
+my_parser.add_argument('-ngen',
+                       type=int,
+                       default=30,
+                       help=colored('Number of generations.\n', 'cyan'))
+
+my_parser.add_argument('-pops',
+                       type=int,
+                       default=40,
+                       help=colored('Population size.\n', 'cyan'))
+
+my_parser.add_argument('-workers',
+                       type=int,
+                       default=1,
+                       help=colored('Number of Daemons that evaluate the individuals of a generation in parallel.\n', 'cyan'))
+
+my_parser.add_argument('-store',
+                       type=str,
+                       default=DEFAULT_PATH,
+                       help=colored('SQLite database of the evaluations, shared with the other runs. Use none to not share them.\n', 'cyan'))
+
+args = my_parser.parse_args()
+
+ship_type = str(args.type)
+part = args.p
+dataset = args.data
+fcode = args.fcode
+
+# Find the 5 parts to train on
+s = part - (part-1) % 6
+parts = list(map(str, range(s, s+6)))
+parts.remove(str(part))
+
+# Low and High Limits for each parameter
+lows = [x[0] for x in PARAMETERS.values()]
+highs = [x[1] for x in PARAMETERS.values()]
+
+# Location where the results and the front are saved. The first item is as in the saves of genetic.py, so bounds.py can read it
+save_name = f'saves/{dataset}/type{ship_type}/{fcode}{part}_pareto.pkl'
+eprint(colored(save_name, 'blue'))
+
+os.makedirs(f'saves/{dataset}/type{ship_type}', exist_ok=True)
+
+if os.path.exists(save_name):
+    with open(save_name, 'rb') as file:
+        results = pickle.load(file)[0]
+else:
+    results = {}
+
+# Both objectives are minimized
+creator.create("FitnessPareto", base.Fitness, weights=(-1.0, -1.0))
+creator.create("Individual", list, fitness=creator.FitnessPareto)  # pylint: disable=no-member
+
+toolbox = base.Toolbox()
+toolbox.register("individual", individual_generator)
+toolbox.register("population", tools.initRepeat, list, toolbox.individual)  # pylint: disable=no-member
+toolbox.register("evaluate", evaluate)
+toolbox.register("mate", tools.cxOnePoint)
+toolbox.register("mutate", mutate_ind, low=lows, up=highs, indpb=0.5)
+toolbox.register("select", SELECTIONS[args.algo])
+
+stats = tools.Statistics(lambda ind: ind.fitness.values)
+stats.register("min", np.min, axis=0)
+stats.register("avg", np.mean, axis=0)
+
+daemon = None
+pool = None
+
+# Individuals whose run was killed by the timeout of the generator (see supervisor.py). They are not saved
+failed = set()
+store = None if args.store == 'none' else EvalStore(dataset, ship_type, parts, fcode, generator_version(), args.store)
+
+try:
+    if args.workers > 1:
+        pool = DaemonPool(args.workers, ship_type, parts, dataset, fcode)
+        toolbox.register("map", parallel_map)
+    else:
+        daemon = Daemon(ship_type, parts, dataset, fcode)
+
+    eprint(colored(f'\n ******** Starting {args.algo} ********\n', 'yellow'))
+
+    # The default parameters are in the first population
+    pop = toolbox.population(n=args.pops - 1) + [creator.Individual(DEF_PARAMS)]  # pylint: disable=no-member
+
+    # (mu + lambda): the parents and the offspring compete for the next population
+    pop, log = algorithms.eaMuPlusLambda(pop, toolbox, mu=args.pops, lambda_=args.pops, cxpb=0.4, mutpb=0.6,
+                                         ngen=args.ngen, stats=stats, verbose=True)
+
+finally:
+    # The front of everything that was evaluated, not only of the last population
+    front = pareto_front(results)
+
+    print(colored(f'\nFinished type {ship_type}, part {part}, {len(results)} evaluations, {len(front)} on the front', 'blue'))
+    for params, (rmse, ratio) in front:
+        print(f'\t{rmse:10.4f} {100*ratio:7.3f}%  {params}')
+
+    if len(results) > 0:
+        with open(save_name, 'wb') as file:
+            pickle.dump((results, front), file)
+
+    if daemon is not None:
+        daemon.end()
+    if pool is not None:
+        pool.end()
+    if store is not None:
+        store.close()
+
+    eprint(colored(f'\n ******** Ended {args.algo} ********\n', 'yellow'))
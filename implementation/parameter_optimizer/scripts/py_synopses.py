@@ -0,0 +1,631 @@
+#!/usr/bin/python3
+"""In-process port of the maritime Synopses-Generator (`eu.datacron.synopses.maritime` in `../../synopses_generator`),
+so that individuals can be evaluated without Flink.
+
+It detects the same critical points (stop, slow motion, change in speed, turn and gap) with the same noise filter,
+as implemented in `TrajectoryStreamManager.scala`, `ObjectState.scala` and `MobilityChecker.scala`, and follows the
+arithmetic of the JVM (Java 8 degree/radian conversions, `%` as fmod, NaN and infinities instead of exceptions).
+
+The Flink job runs its stages (filter, forward check, backward check) concurrently over a shared map of object states,
+so the jar itself is not fully deterministic near purged states. This port runs each message through all the stages
+before the next one. The ships only interact through the periodic purge of obsolete states, whose schedule depends only
+on the timestamps of the input. So it is computed once with NumPy and then each ship is processed on its own.
+
+Run it as a script to compare it with the jar on some data (parity mode):
+
+    python3 py_synopses.py {ship_type} {part} {dataset} {fcode} [{number of random parameter sets}]
+"""
+
+import json
+import math
+import random
+import re
+import sys
+from collections import Counter, deque
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from raw_cache import RawTracks
+
+
+# Keys of the configuration that the port does not support (parameters per ship type or per area)
+UNSUPPORTED_KEYS = ('val_SHIP_TYPES', 'file_AREAS')
+
+
+def read_properties(path: str) -> Dict[str, str]:
+    """Reads a .properties file (like `Daemon.param_file_loc`), as `java.util.Properties` would for the simple files used here.
+
+    Arguments:
+        path {str} -- The file
+
+    Returns:
+        Dict[str, str] -- The value of each key, later keys override former ones
+    """
+
+    props = {}
+    for line in open(path, 'r'):
+        line = line.lstrip()
+        if line == '' or line[0] in '#!':
+            continue
+        line = line.rstrip('\r\n')
+        k, _, v = re.split(r'\s*([=:])\s*', line, maxsplit=1) if re.search('[=:]', line) else (line, '', '')
+        props[k.strip()] = re.sub(r'\\u([0-9a-fA-F]{4})', lambda m: chr(int(m.group(1), 16)), v)
+    return props
+
+
+class Parameters:
+    """The parameters of the maritime Synopses-Generator, as `Parametrization.scala` and `Config.scala` read them."""
+
+    def __init__(self, props: Dict[str, str]):
+        """Constructor.
+
+        Arguments:
+            props {Dict[str, str]} -- The configuration (see `read_properties()`)
+
+        Raises:
+            NotImplementedError: If the configuration uses parameters per ship type or per area
+        """
+
+        for k in UNSUPPORTED_KEYS:
+            if props.get(k):
+                raise NotImplementedError(f'{k} is not supported by the Python Synopses-Generator')
+
+        self.DISTANCE_THRESHOLD = float(props['val_DISTANCE_THRESHOLD'])
+        self.ANGLE_THRESHOLD = float(props['val_ANGLE_THRESHOLD'])
+        self.GAP_PERIOD = int(props['val_GAP_PERIOD'])  # .toLong in Scala, so "1800.0" fails in both
+        self.HISTORY_PERIOD = int(props['val_HISTORY_PERIOD'])
+        self.BUFFER_SIZE = int(props['val_BUFFER_SIZE'])
+        self.SPEED_RATIO = float(props['val_SPEED_RATIO'])
+        self.NO_SPEED_THRESHOLD = float(props['val_NO_SPEED_THRESHOLD'])
+        self.LOW_SPEED_THRESHOLD = float(props['val_LOW_SPEED_THRESHOLD'])
+        self.MAX_SPEED_THRESHOLD = float(props['val_MAX_SPEED_THRESHOLD'])
+        self.MAX_RATE_OF_CHANGE = float(props['val_MAX_RATE_OF_CHANGE'])
+        self.MAX_RATE_OF_TURN = float(props['val_MAX_RATE_OF_TURN'])
+
+        # lon_min;lat_min;lon_max;lat_max
+        self.BBOX = tuple(float(x) for x in props['val_BBOX'].split(';'))
+
+
+#################### Arithmetic of the JVM ####################
+
+def to_radians(x: float) -> float:
+    """Math.toRadians of Java 8."""
+    return x / 180.0 * math.pi
+
+
+def to_degrees(x: float) -> float:
+    """Math.toDegrees of Java 8."""
+    return x * 180.0 / math.pi
+
+
+def jdiv(a: float, b: float) -> float:
+    """Division of doubles: x/0 is an infinity (or NaN) instead of an exception."""
+
+    if b != 0.0:
+        return a / b
+    if a == 0.0 or math.isnan(a):
+        return math.nan
+    return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def jsqrt(x: float) -> float:
+    """Math.sqrt: NaN for negative numbers."""
+    return math.sqrt(x) if x >= 0.0 else math.nan
+
+
+#################### MobilityChecker.scala ####################
+
+def haversine(old: 'Location', new: 'Location') -> float:
+    """Haversine distance in meters."""
+
+    delta_lat = to_radians(new.lat - old.lat)
+    delta_lon = to_radians(new.lon - old.lon)
+    a = math.sin(delta_lat / 2.0) ** 2 + math.cos(to_radians(new.lat)) * math.cos(to_radians(old.lat)) * math.sin(delta_lon / 2.0) ** 2
+    return 6371000.0 * (2.0 * math.atan2(jsqrt(a), jsqrt(1.0 - a)))
+
+
+def bearing(old: 'Location', new: 'Location') -> float:
+    """Azimuth from old to new, in degrees."""
+
+    y = math.sin(to_radians(new.lon) - to_radians(old.lon)) * math.cos(to_radians(new.lat))
+    x = math.cos(to_radians(old.lat)) * math.sin(to_radians(new.lat)) - math.sin(to_radians(old.lat)) * math.cos(to_radians(new.lat)) * math.cos(to_radians(new.lon) - to_radians(old.lon))
+    return to_degrees(math.fmod(math.atan2(y, x) + 2 * math.pi, 2 * math.pi))
+
+
+def angle_difference(heading1: float, heading2: float) -> float:
+    """Angular difference of two headings, in degrees."""
+
+    phi = math.fmod(abs(heading1 - heading2), 360)
+    return 360.0 - phi if phi > 180 else phi
+
+
+def slope_difference(heading1: float, heading2: float) -> float:
+    """Signed difference of two headings, in degrees."""
+    return 180.0 - abs(180.0 - (heading2 - heading1))
+
+
+def rate_of_change_knots(old: 'Location', new: 'Location') -> float:
+    """Acceleration in knots per hour."""
+
+    if new.time_elapsed > 0:
+        return jdiv(3600000.0 * (new.speed - old.speed), 1.0 * new.time_elapsed)
+    return 0.0
+
+
+def rate_of_turn(new: 'Location', old: 'Location') -> float:
+    """Change in heading in degrees per second."""
+
+    a = new.heading - old.heading
+    phi = math.fmod(math.fmod(a + 180, 360) + 360, 360) - 180
+    if phi > 180:
+        return jdiv(360.0 - phi, 0.001 * new.time_elapsed)
+    return jdiv(phi, 0.001 * new.time_elapsed)
+
+
+#################### critical_point.java ####################
+
+class Location:
+    """A critical point: a raw location with its annotation and its spatiotemporal features."""
+
+    __slots__ = ('t', 'lon', 'lat', 'row', 'distance', 'speed', 'heading', 'time_elapsed', 'heading_diff', 'percental_speed_change',
+                 'stop_start', 'stop_end', 'change_in_speed_start', 'change_in_speed_end', 'slow_motion_start', 'slow_motion_end',
+                 'gap_start', 'gap_end', 'change_in_heading', 'noise')
+
+    # The annotation flags that make a critical point (all except noise)
+    FLAGS = ('stop_start', 'stop_end', 'change_in_speed_start', 'change_in_speed_end', 'slow_motion_start', 'slow_motion_end',
+             'gap_start', 'gap_end', 'change_in_heading')
+
+    def __init__(self, t: int, lon: float, lat: float, row: int):
+        self.t = t
+        self.lon = lon
+        self.lat = lat
+        self.row = row
+        self.distance = 0.0
+        self.speed = 0.0
+        self.heading = 0.0
+        self.time_elapsed = 0
+        self.heading_diff = -1.0
+        self.percental_speed_change = -1.0
+        for f in Location.FLAGS:
+            setattr(self, f, False)
+        self.noise = False
+
+    def copy(self) -> 'Location':
+        """A copy, as Flink (de)serializes a record between two operators."""
+
+        c = Location.__new__(Location)
+        for f in Location.__slots__:
+            setattr(c, f, getattr(self, f))
+        return c
+
+    def is_critical(self) -> bool:
+        """The filter of the critical points at the end of the pipeline."""
+        return self.time_elapsed > 0 and not self.noise and any(getattr(self, f) for f in Location.FLAGS)
+
+
+#################### ObjectState.scala ####################
+
+class ObjectState:
+    """The recent, noise-free locations and the status of a ship."""
+
+    def __init__(self, loc: Location, history_period: int, buffer_size: int):
+        self.history = deque([loc])
+        self.stopped = False
+        self.changed_speed = False
+        self.slow_motion = False
+        self.time_span = history_period * 1000
+        self.buffer_size = buffer_size
+
+    def purge(self):
+        self.history.clear()
+        self.stopped = self.changed_speed = self.slow_motion = False
+
+    def update(self, loc: Location):
+        self.history.append(loc)
+        while self.history[0].t < loc.t - self.time_span or len(self.history) > self.buffer_size:
+            self.history.popleft()
+
+    def cleanup(self):
+        while len(self.history) > 2:
+            self.history.popleft()
+
+    def restore(self, loc: Location):
+        self.history.append(loc)
+        self.stopped = self.changed_speed = self.slow_motion = False
+
+    def mean_speed(self) -> float:
+        front, last = self.history[0], self.history[-1]
+        return jdiv(3600000.0 * haversine(front, last), 1852.0 * (last.t - front.t))
+
+    def mean_heading(self) -> float:
+        if len(self.history) > 1:
+            return bearing(self.history[0], self.history[1])
+        return 0.0
+
+    def cumulative_heading(self) -> float:
+        diff = 0.0
+        first = self.history[-1]
+        for i in range(len(self.history) - 2, -1, -1):
+            second = self.history[i]
+            diff += slope_difference(first.heading, second.heading)
+            first = second
+        return diff
+
+
+#################### TrajectoryStreamManager.scala ####################
+
+def eliminate_noise(state: ObjectState, old: Location, new: Location, P: Parameters) -> bool:
+    """Whether a location is noise (eliminateNoise)."""
+
+    if new.gap_end:
+        state.purge()
+        state.restore(new)
+        return False
+
+    if new.speed < 0.0 or new.speed >= P.MAX_SPEED_THRESHOLD:
+        return True
+    if abs(rate_of_change_knots(old, new)) >= P.MAX_RATE_OF_CHANGE:
+        return True
+    if new.speed > P.LOW_SPEED_THRESHOLD and rate_of_turn(new, old) >= P.MAX_RATE_OF_TURN:
+        return True
+    return False
+
+
+def forward_check(state: ObjectState, prev: Location, new: Location, gaps: List[Location], P: Parameters) -> Location:
+    """Annotates the current location of a pair (forwardCheckMobilityFeatures). The GAP_START locations are appended to gaps."""
+
+    if prev.noise and len(state.history) > 0:
+        old = state.history[-1]
+    else:
+        old = prev
+
+    new.distance = haversine(old, new)
+    new.heading = bearing(old, new)
+    new.time_elapsed = new.t - old.t
+
+    if new.time_elapsed <= 0:
+        new.noise = True
+        return new
+
+    new.speed = (3600000.0 * new.distance) / (1852.0 * new.time_elapsed)
+
+    if new.time_elapsed > 1000 * P.GAP_PERIOD:
+        new.gap_end = True
+        old.gap_start = True
+        gaps.append(old.copy())
+        state.purge()
+        state.update(new)
+        return new
+
+    new.noise = eliminate_noise(state, old, new, P)
+    if new.noise:
+        return new
+    state.update(new)
+
+    if len(state.history) < 2:
+        return new
+
+    mean_speed = state.mean_speed()
+    new.percental_speed_change = abs(jdiv(new.speed - mean_speed, mean_speed))
+
+    if new.speed < P.NO_SPEED_THRESHOLD and not state.stopped:
+        new.stop_start = True
+        state.stopped = True
+        if state.slow_motion:
+            new.slow_motion_end = True
+            state.slow_motion = False
+        if state.changed_speed:
+            new.change_in_speed_end = True
+            state.changed_speed = False
+    elif (new.speed >= P.NO_SPEED_THRESHOLD or new.distance >= P.DISTANCE_THRESHOLD) and state.stopped:
+        new.stop_end = True
+        state.stopped = False
+
+    if not state.stopped:
+        if new.percental_speed_change > P.SPEED_RATIO and not state.changed_speed:
+            new.change_in_speed_start = True
+            state.changed_speed = True
+        if new.percental_speed_change <= P.SPEED_RATIO and state.changed_speed:
+            new.change_in_speed_end = True
+            state.changed_speed = False
+        if new.speed <= P.LOW_SPEED_THRESHOLD and old.speed > P.LOW_SPEED_THRESHOLD and not state.slow_motion:
+            new.slow_motion_start = True
+            state.slow_motion = True
+        if new.speed > P.LOW_SPEED_THRESHOLD and old.speed <= P.LOW_SPEED_THRESHOLD and state.slow_motion:
+            new.slow_motion_end = True
+            state.slow_motion = False
+
+    return new
+
+
+def backward_check(state: ObjectState, old: Location, new: Location, P: Parameters) -> Location:
+    """Annotates the previous location of a pair as a turning point (backwardCheckMobilityFeatures)."""
+
+    old.heading_diff = max(angle_difference(new.heading, state.mean_heading()), abs(state.cumulative_heading()))
+
+    if not state.stopped and old.heading_diff > P.ANGLE_THRESHOLD:
+        old.change_in_heading = True
+        state.cleanup()
+
+    return old
+
+
+def cleanup_schedule(t: np.ndarray, history_period: int) -> Tuple[np.ndarray, np.ndarray]:
+    """When the states of all the ships are checked for obsolete ones, as in the first filter of the pipeline.
+
+    Arguments:
+        t {np.ndarray} -- The timestamps of the messages in the order of the input
+        history_period {int} -- HISTORY_PERIOD in seconds
+
+    Returns:
+        np.ndarray -- The position of each cleanup in the input
+        np.ndarray -- Its threshold: states whose latest location is older are discarded
+    """
+
+    # The check happens only when a message has a timestamp greater than all the previous ones
+    running = np.maximum.accumulate(np.concatenate(([0], t)))
+    new_max = np.flatnonzero(t > running[:-1])
+    values = t[new_max]
+
+    positions = []
+    last_cleanup = 0
+    while True:
+        i = int(np.searchsorted(values, last_cleanup + 1000 * history_period, side='right'))
+        if i == len(values):
+            break
+        positions.append(new_max[i])
+        last_cleanup = int(values[i])
+
+    positions = np.array(positions, dtype=np.int64)
+    return positions, t[positions] - 1000 * history_period
+
+
+def run_ship(lon: List[float], lat: List[float], t: List[int], rows: List[int], pos: np.ndarray, cleanups: Tuple[np.ndarray, np.ndarray], P: Parameters, located: List[Location] = None) -> Tuple[List[Location], List[Location], List[int]]:
+    """Runs the pipeline on the messages of a single ship.
+
+    Arguments:
+        lon, lat, t, rows {List} -- The messages of the ship in the order of the input, and their rows in the input
+        pos {np.ndarray} -- The position of each message in the whole (filtered) input
+        cleanups {Tuple[np.ndarray, np.ndarray]} -- See `cleanup_schedule()`
+
+    Keyword Arguments:
+        located {List[Location]} -- If given, every location that leaves the backward check is appended to it,
+            noisy or not (the stream that the jar filters into its loc_file) (default: {None})
+
+    Returns:
+        List[Location] -- The critical points
+        List[Location] -- The GAP_START points
+        List[int] -- The rows of the noisy points
+    """
+
+    # Last cleanup before or at each message: the state is discarded if any cleanup since the previous message finds it obsolete
+    last_cleanup = np.searchsorted(cleanups[0], pos, side='right') - 1
+
+    crit, gaps, noise = [], [], []
+    state = None
+    prev = None   # Previous element of the window of the forward check
+    bprev = None  # Previous element of the window of the backward check
+
+    def emit(loc: Location):
+        if located is not None:
+            located.append(loc)
+        if loc.is_critical():
+            crit.append(loc)
+        if loc.noise:
+            noise.append(loc.row)
+
+    for k in range(len(t)):
+        loc = Location(t[k], lon[k], lat[k], rows[k])
+
+        # Filter: purge obsolete states, and start a new state after a gap
+        c = last_cleanup[k]
+        if state is not None and c >= 0 and (k == 0 or c > last_cleanup[k-1]):
+            if len(state.history) > 0 and state.history[-1].t < cleanups[1][c]:
+                state.purge()
+                state = None
+
+        if state is None:
+            loc.gap_end = True
+            state = ObjectState(loc.copy(), P.HISTORY_PERIOD, P.BUFFER_SIZE)
+
+        # Forward check: the first message of the window is emitted as it is
+        out = loc if prev is None else forward_check(state, prev, loc, gaps, P)
+        prev = loc
+
+        # Backward check on what the forward check emitted
+        out = out.copy()
+        emit(out if bprev is None else backward_check(state, bprev, out, P))
+        bprev = out
+
+    return crit, gaps, noise
+
+
+def iter_ships(tracks: RawTracks, props: Dict[str, str], locations: bool = False) -> Iterator[Tuple[str, List[Location], List[Location], List[int], List[Location]]]:
+    """Runs the Synopses-Generator on some raw points, one ship after the other.
+
+    Arguments:
+        tracks {RawTracks} -- The raw points (e.g. `Daemon.in_tracks`)
+        props {Dict[str, str]} -- The configuration, with the parameters (see `read_properties()`)
+
+    Keyword Arguments:
+        locations {bool} -- Whether to also keep all the locations of each ship (see `run_ship()`) (default: {False})
+
+    Yields:
+        Tuple -- The ship-ID, its critical points, its GAP_START points, the rows of its noisy points and its locations (None without locations)
+    """
+
+    P = Parameters(props)
+
+    # Only the messages in the area of monitoring enter the pipeline
+    lon_min, lat_min, lon_max, lat_max = P.BBOX
+    inside = (lon_min <= tracks.lon) & (tracks.lon <= lon_max) & (lat_min <= tracks.lat) & (tracks.lat <= lat_max)
+
+    # Position of each message in the filtered input
+    rows = np.asarray(tracks.row)
+    pos = np.full(len(rows), -1, dtype=np.int64)
+    order = np.argsort(rows[inside], kind='stable')
+    pos[np.flatnonzero(inside)[order]] = np.arange(len(order))
+
+    cleanups = cleanup_schedule(np.asarray(tracks.t)[inside][order], P.HISTORY_PERIOD)
+
+    for idd in tracks:
+        s = tracks.slice(idd)
+        keep = inside[s]
+        located = [] if locations else None
+        crit, gaps, noise = run_ship(tracks.lon[s][keep].tolist(), tracks.lat[s][keep].tolist(), tracks.t[s][keep].tolist(),
+                                     rows[s][keep].tolist(), pos[s][keep], cleanups, P, located)
+        yield idd, crit, gaps, noise, located
+
+
+def iter_run(tracks: RawTracks, props: Dict[str, str], bitmap: np.ndarray) -> Iterator[Tuple[str, List[Tuple]]]:
+    """Runs the Synopses-Generator on some raw points, one ship after the other.
+
+    Arguments:
+        tracks {RawTracks} -- The raw points (e.g. `Daemon.in_tracks`)
+        props {Dict[str, str]} -- The configuration, with the parameters (see `read_properties()`)
+        bitmap {np.ndarray} -- The noise bitmap over the rows of the input (see `Daemon.noise_bitmap()`), all False.
+            The noisy points of each ship are marked before its output is yielded
+
+    Yields:
+        Tuple[str, List[Tuple[float, float, int]]] -- The ship-ID and all its compressed points, for the ships that have any
+    """
+
+    for idd, crit, gaps, noise, _ in iter_ships(tracks, props):
+        bitmap[noise] = True
+        if len(crit) > 0 or len(gaps) > 0:
+            yield idd, [(p.lon, p.lat, p.t) for p in crit + gaps]
+
+
+def to_json(idd: str, loc: Location) -> str:
+    """A location as a JSON line of the text output of the jar (without the new line), with the fields of
+    `output_parser.expand_compact()`: the message error flag of the input is not kept, and `ingestion_timestamp` is the row.
+    """
+
+    return json.dumps({
+        'timestamp': loc.t,
+        'id': idd,
+        'longitude': loc.lon,
+        'latitude': loc.lat,
+        'annotation': {f: getattr(loc, f) for f in Location.FLAGS + ('noise',)},
+        'distance': loc.distance,
+        'speed': loc.speed,
+        'heading': loc.heading,
+        'time_elapsed': loc.time_elapsed,
+        'msg_error_flag': '',
+        'ingestion_timestamp': loc.row,
+        'heading_diff': loc.heading_diff,
+        'percental_speed_change': loc.percental_speed_change
+    })
+
+
+def write_output(tracks: RawTracks, props: Dict[str, str], out_target: str, loc_target: str, print_noise: bool = True):
+    """Runs the Synopses-Generator on some raw points, and writes its output as JSON lines, like the jar:
+    the critical points and then the GAP_START points of each ship (grouped by ship, as `Daemon.run_synopses_and_copy_files()`
+    writes them) and the noisy (or noise-free) locations.
+
+    Arguments:
+        tracks {RawTracks} -- The raw points (e.g. `Daemon.in_tracks`)
+        props {Dict[str, str]} -- The configuration, with the parameters (see `read_properties()`)
+        out_target {str} -- File of the critical points
+        loc_target {str} -- File of the locations
+
+    Keyword Arguments:
+        print_noise {bool} -- Whether to write the noisy locations, or the noise-free ones (default: {True})
+    """
+
+    with open(out_target, 'w') as out, open(loc_target, 'w') as loc_out:
+        for idd, crit, gaps, _, located in iter_ships(tracks, props, locations=True):
+            idd = str(idd)
+            for loc in crit + gaps:
+                out.write(to_json(idd, loc))
+                out.write('\n')
+            for loc in located:
+                if loc.noise == print_noise:
+                    loc_out.write(to_json(idd, loc))
+                    loc_out.write('\n')
+
+
+def run(tracks: RawTracks, props: Dict[str, str]) -> Tuple[Dict[str, List[Tuple]], np.ndarray]:
+    """Runs the Synopses-Generator on some raw points.
+
+    Arguments:
+        tracks {RawTracks} -- The raw points (e.g. `Daemon.in_tracks`)
+        props {Dict[str, str]} -- The configuration, with the parameters (see `read_properties()`)
+
+    Returns:
+        Dict[str, List[Tuple[float, float, int]]] -- The compressed points, as `Daemon.read_synopses_files()` returns them
+        np.ndarray -- The noise bitmap over the rows of the input (see `Daemon.noise_bitmap()`)
+    """
+
+    bitmap = np.zeros(tracks.n_points(), dtype=bool)
+    out_data = dict(iter_run(tracks, props, bitmap))
+    return out_data, bitmap
+
+
+def noise_counts(tracks: RawTracks, bitmap: np.ndarray) -> Dict[str, Dict[Tuple, int]]:
+    """Converts a noise bitmap to the counters of `local_lib.estimate_RMSE()`."""
+
+    noise = {}
+    for idd in tracks:
+        s = tracks.slice(idd)
+        mask = bitmap[tracks.row[s]]
+        if np.any(mask):
+            noise[idd] = dict(Counter(zip(tracks.lon[s][mask].tolist(), tracks.lat[s][mask].tolist(), tracks.t[s][mask].tolist())))
+    return noise
+
+
+def parity(daemon, params: Dict[str, float]) -> Dict[str, int]:
+    """Runs the jar of a Daemon (with `generator='flink'`) and this port with the same parameters, and compares their output.
+
+    Arguments:
+        daemon {local_lib.Daemon} -- The Daemon
+        params {Dict[str, float]} -- A mapping from the name of the parameter to its value.
+
+    Returns:
+        Dict[str, int] -- Counts of critical points and of noisy points of each, and of the ones found by only one of them
+    """
+
+    tracks, jar_out, jar_noise = daemon.run_synopses_and_read_result(params)
+    if not isinstance(jar_noise, np.ndarray):
+        points = [(idd,) + k for idd, ks in jar_noise.items() for k, c in ks.items() for _ in range(c)]
+        rows = daemon.in_tracks.find_rows(points)
+        jar_noise = np.zeros(daemon.in_tracks.n_points(), dtype=bool)
+        jar_noise[rows[rows >= 0]] = True
+
+    # make_config() has just written the parameters
+    py_out, py_noise = run(daemon.in_tracks, read_properties(daemon.param_file_loc))
+
+    jar_points = Counter((idd,) + p for idd, ps in jar_out.items() for p in ps)
+    py_points = Counter((idd,) + p for idd, ps in py_out.items() for p in ps)
+
+    return {
+        'crit_jar': sum(jar_points.values()),
+        'crit_python': sum(py_points.values()),
+        'crit_only_jar': sum((jar_points - py_points).values()),
+        'crit_only_python': sum((py_points - jar_points).values()),
+        'noise_jar': int(jar_noise.sum()),
+        'noise_python': int(py_noise.sum()),
+        'noise_mismatch': int((jar_noise != py_noise).sum())
+    }
+
+
+if __name__ == '__main__':
+
+    from local_lib import Daemon, DEF_PARAMS, PARAMETERS
+
+    if len(sys.argv) < 5:
+        raise RuntimeError('Not enough args')
+
+    daemon = Daemon(sys.argv[1], [sys.argv[2]], sys.argv[3], sys.argv[4], noise_cache=False)
+    try:
+        sets = [dict(zip(PARAMETERS, DEF_PARAMS))]
+        for _ in range(int(sys.argv[5]) if len(sys.argv) > 5 else 0):
+            # Integer parameters must stay integers, as the jar reads them with toLong/toInt
+            sets.append({k: random.randint(a, b) if isinstance(a, int) else random.uniform(a, b) for k, (a, b) in PARAMETERS.items()})
+
+        for params in sets:
+            print(params)
+            print(parity(daemon, params))
+    finally:
+        daemon.end()
@@ -4,7 +4,6 @@
 import argparse
 import os
 import pickle
-import random
 import sys
 from copy import deepcopy
 from time import time
@@ -15,7 +14,8 @@ from deap import algorithms, base, creator, tools
 from termcolor import colored as col
 from tqdm import tqdm
 
-from local_lib import PARAMETERS, Daemon, crit
+from eval_store import DEFAULT_PATH, EvalStore
+from local_lib import PARAMETERS, Daemon, GeneratorTimeout, crit, generator_version, mutate_ind, random_params
 
 
 class progress_bar:
@@ -80,6 +80,7 @@ def evaluate(individual: List) -> float:
     global opt # optimizaton option
     global daemon # daemon that runs the synopses
     global PARAMETERS # List of synopses-parameter names and limites
+    global store # evaluations shared with other processes
 
     if tuple(individual) in results:
         # If already found this individual, return the already found fitness
@@ -101,8 +102,16 @@ def evaluate(individual: List) -> float:
         params[k] = individual[i]
         i += 1
 
-    # Run synopses and estimate RMSE and compression ratio
-    rmse, ratio = daemon.run_synopses(params)
+    # Run synopses and estimate RMSE and compression ratio, only if no other process has evaluated them (or is evaluating them)
+    try:
+        if store is None:
+            rmse, ratio = daemon.run_synopses(params)
+        else:
+            rmse, ratio = store.evaluate(individual, lambda: daemon.run_synopses(params))
+    except GeneratorTimeout as e:
+        # Killed by the timeout of the generator (see supervisor.py): not a result, so it is not saved
+        print(e, tuple(individual), file=sys.stderr)
+        return 1e20,
 
     # Add result to results-dictionary
     results[tuple(individual)] = (rmse, ratio)
@@ -122,82 +131,7 @@ def individual_generator():
        [Individual]
     """
 
-    ind = []
-    # For each parameter
-    for v in PARAMETERS.values():
-
-        # If parameter is int
-        if isinstance(v[0], int):
-            # Pick at random from the range
-            x = random.randint(*v)
-
-            # If range of params is large, roung the value to be a multiple of 50
-            if x > 200:
-                x = 50*round(x/50)
-
-            ind.append(x)
-
-        # If parameter is float
-        elif isinstance(v[0], float):
-            ind.append(round(random.uniform(*v), 2))
-
-        else: # Should never reach here
-            raise NotImplementedError('Generator only supports int and float')
-
-    # Convert list to individual
-    return creator.Individual(ind) # pylint: disable=no-member
-
-
-def mutate_ind(ind, low: List, up: List, indpb: float):
-    """Mutates an individual of values (int or float)
-    by adding gaussian noise with std proportional to the range of values.
-
-    Arguments:
-       ind {Individual} -- The individual to mutate
-       low {List} -- List of values (int or float). Lower bounds for each parameter
-       up {List} -- List of values (int or float). Upper bounds for each parameter
-       indpb {float} -- Probability with which to mutate each characteristic
-
-    Returns:
-       Individual -- New individual
-    """
-
-    # Loop for every value of the individual
-    for i in range(len(ind)):
-
-        # Mutate this value with probability indpb
-        if random.random() < indpb:
-
-            # Make Gaussian Noise from upper and lower bounds
-            std = (up[i] - low[i])/4
-            div = np.random.normal(scale=std)
-
-            if isinstance(ind[i], int):
-
-                # Add noise to individual and round
-                x = int(ind[i]+div)
-
-                # Re adjust individual to bounds
-                x = max(x, low[i])
-                x = min(x, up[i])
-
-                if x > 200:
-                    ind[i] = 50*round(x/50)
-                else:
-                    ind[i] = x
-
-            elif isinstance(ind[i], float):
-                x = round(ind[i]+div, 2)
-
-                # Re adjust individual to bounds
-                x = max(x, low[i])
-                x = min(x, up[i])
-                ind[i] = x
-
-            else:
-                raise NotImplementedError(
-                    'mutate_ind only supports float or int')
-    return ind,
+    return creator.Individual(random_params()) # pylint: disable=no-member
 
 
 my_parser = argparse.ArgumentParser(description='Runs an online genetic algorithm',
@@ -229,6 +163,11 @@ my_parser.add_argument('--start_from', '-s',
                        default=0,
                        help=col('How many of the first batches to skip (used to start from the middle).\n', 'cyan'))
 
+my_parser.add_argument('--store',
+                       type=str,
+                       default=DEFAULT_PATH,
+                       help=col('SQLite database of the evaluations, shared with the other runs. Use none to not share them.\n', 'cyan'))
+
 args = my_parser.parse_args()
 
 dataset = args.data
@@ -296,6 +235,9 @@ for m in range(start_from, len(months) - 1):
     # Dictionary with mapping from individual to (RMSE, Ratio)
     results = {}
 
+    # Shared evaluations of this batch, see below
+    store = None
+
     # Population size and Number of generations for this training
     pop_size = pop_sizes[min(m, len(pop_sizes))]
     ngen = gen_numbers[min(m, len(gen_numbers))]
@@ -323,6 +265,9 @@ for m in range(start_from, len(months) - 1):
         daemon = Daemon(ship_type, ['1', '2', '3',
                                     '4', '5', '6'], dataset, months[:m+1])
 
+        # Evaluations shared with the other runs on the same batches
+        store = None if args.store == 'none' else EvalStore(dataset, ship_type, ['1', '2', '3', '4', '5', '6'], ','.join(months[:m+1]), generator_version(), args.store)
+
         eprint(col(f'\n ******** Starting Genetic Algo on {months[m]} ********\n', 'yellow'))
 
         # Initial Population
@@ -346,6 +291,8 @@ for m in range(start_from, len(months) - 1):
         t = time() - t
     finally:
         daemon.end()
+        if store is not None:
+            store.close()
 
     # Best contains the individuals of this training, sorted by fitness from best to worst
     hof = sorted(results.items(), key=lambda kv: crit(kv[1][0], kv[1][1], opt))
@@ -0,0 +1,259 @@
+"""Racing of candidate parameters over the parts of the cross-validation (see `-race` in `genetic.py` and `valuate.py`).
+
+Instead of scoring every candidate on all the training parts at once, the candidates are run one part at a time
+(all the candidates that are left on the same part, so in parallel). After each part, every candidate is compared with the
+leader (the lowest mean of `crit()` over the parts so far) by a one-sided paired t-test on the `crit()` of each part,
+and the ones that are worse with a p-value under `ALPHA` are eliminated. The others go on to the next part.
+
+The runs give the sums of `local_lib.squared_error_sums()` of each part, which are kept in the `eval_store.PartStore` of the part.
+So the parts that an eliminated candidate did run are stored, and finishing it later (e.g. with `eval_store.fold_evaluate()`)
+only runs the parts that it did not.
+"""
+
+from math import exp, lgamma, log, sqrt
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from eval_store import PartStore
+from local_lib import crit, rmse_ratio
+
+
+# p-value under which a candidate is eliminated
+ALPHA = 0.05
+
+# Parts that every candidate runs before the first test
+MIN_PARTS = 2
+
+
+def betainc(a: float, b: float, x: float) -> float:
+    """The regularized incomplete beta function I_x(a, b), by its continued fraction (modified Lentz)."""
+
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+
+    # The continued fraction converges fast for x < (a+1)/(a+b+2), otherwise use the symmetry
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - betainc(b, a, 1 - x)
+
+    front = exp(lgamma(a + b) - lgamma(a) - lgamma(b) + a * log(x) + b * log(1 - x)) / a
+
+    tiny = 1e-300
+    f, c, d = 1.0, 1.0, 0.0
+    for i in range(400):
+        m = i // 2
+        if i == 0:
+            num = 1.0
+        elif i % 2 == 0:
+            num = m * (b - m) * x / ((a + 2*m - 1) * (a + 2*m))
+        else:
+            num = -(a + m) * (a + b + m) * x / ((a + 2*m) * (a + 2*m + 1))
+
+        d = 1 + num * d
+        d = 1 / (d if abs(d) > tiny else tiny)
+        c = 1 + num / c
+        c = c if abs(c) > tiny else tiny
+        f *= c * d
+        if abs(1 - c * d) < 1e-12:
+            break
+
+    return front * (f - 1)
+
+
+def t_sf(t: float, dof: int) -> float:
+    """The survival function of the Student t distribution, P(T > t)."""
+
+    tail = 0.5 * betainc(dof / 2, 0.5, dof / (dof + t * t))
+    return tail if t > 0 else 1 - tail
+
+
+def paired_pvalue(a: Sequence[float], b: Sequence[float]) -> float:
+    """One-sided paired t-test: the p-value of the mean of a - b being positive (a worse than b, when lower is better).
+
+    Arguments:
+        a {Sequence[float]} -- The values of a candidate on each part
+        b {Sequence[float]} -- The values of the leader on the same parts
+
+    Returns:
+        float -- The p-value
+    """
+
+    n = len(a)
+    if n < 2:
+        return 1.0
+
+    diffs = [x - y for x, y in zip(a, b)]
+    mean = sum(diffs) / n
+
+    var = sum((d - mean)**2 for d in diffs) / (n - 1)
+    if var == 0:
+        return 0.0 if mean > 0 else 1.0
+
+    return t_sf(mean / sqrt(var / n), n - 1)
+
+
+class Race:
+    """The state of a race: the sums and the `crit()` of each candidate on the parts it ran, and whether it is eliminated.
+
+    Example:
+        race = Race(keys, opt)
+        for part in parts:
+            race.add(run(part, race.alive))
+            race.eliminate()
+        fitness = race.fitness(key)
+    """
+
+    def __init__(self, keys: List[Tuple], option: str, alpha: float = ALPHA, min_parts: int = MIN_PARTS):
+        """Constructor.
+
+        Arguments:
+            keys {List[Tuple]} -- The candidates (the values of their parameters)
+            option {str} -- The option of `crit()`
+
+        Keyword Arguments:
+            alpha {float} -- The p-value under which a candidate is eliminated (default: {ALPHA})
+            min_parts {int} -- The parts that every candidate runs before the first test (default: {MIN_PARTS})
+        """
+
+        self.option = option
+        self.alpha = alpha
+        self.min_parts = min_parts
+
+        self.alive = list(keys)
+        self.sums = {key: (0.0, 0, 0) for key in keys}
+        self.crits = {key: [] for key in keys}
+
+        # The number of parts after which each eliminated candidate was eliminated, and the candidates left before each part
+        self.eliminated = {}
+        self.counts = []
+
+        # The candidates whose run failed on a part (e.g. it timed out), eliminated at once
+        self.failed = set()
+
+    def add(self, part_sums: List[Tuple[float, int, int]]):
+        """Adds the sums of the candidates that are left on the next part, in the order of `alive`. The sums of a failed run are None."""
+
+        self.counts.append(len(self.alive))
+        for key, sums in zip(self.alive, part_sums):
+            if sums is None:
+                self.failed.add(key)
+                self.eliminated[key] = len(self.crits[key])
+                continue
+
+            total = self.sums[key]
+            self.sums[key] = (total[0] + sums[0], total[1] + int(sums[1]), total[2] + int(sums[2]))
+            self.crits[key].append(crit(*rmse_ratio(*sums), self.option))
+
+        self.alive = [key for key in self.alive if key not in self.failed]
+
+    def leader(self) -> Tuple:
+        """The candidate that is left with the lowest mean `crit()` over the parts."""
+        return min(self.alive, key=lambda key: sum(self.crits[key]) / len(self.crits[key]))
+
+    def eliminate(self) -> List[Tuple]:
+        """Eliminates the candidates that are worse than the leader.
+
+        Returns:
+            List[Tuple] -- The candidates eliminated now
+        """
+
+        if len(self.alive) < 2 or len(self.crits[self.alive[0]]) < self.min_parts:
+            return []
+
+        best = self.leader()
+        out = [key for key in self.alive if key != best and paired_pvalue(self.crits[key], self.crits[best]) < self.alpha]
+        for key in out:
+            self.eliminated[key] = len(self.crits[key])
+        self.alive = [key for key in self.alive if key not in self.eliminated]
+        return out
+
+    def runs(self) -> int:
+        """The number of runs on a part that the race made (or took from a store), out of len(keys) * len(parts) without racing."""
+        return sum(self.counts)
+
+    def fitness(self, key: Tuple) -> float:
+        """`crit()` of the sums of a candidate over the parts it ran (all of them, if it was not eliminated), or inf if it failed."""
+
+        if key in self.failed:
+            return float('inf')
+        return crit(*rmse_ratio(*self.sums[key]), self.option)
+
+
+def stored_run(stores: Dict[str, PartStore], run: Callable[[str, List[Tuple]], List[Tuple[float, int, int]]]) -> Callable:
+    """The `run` of `run_race()` that takes the sums from the store of each part, and runs only the candidates without them.
+    As in `EvalStore.evaluate()`, the candidates are claimed first: the ones that another process runs are waited for,
+    and run here only if it drops them.
+
+    Arguments:
+        stores {Dict[str, PartStore]} -- The store of each part
+        run {Callable[[str, List[Tuple]], List[Tuple[float, int, int]]]} -- Gives the sums of some candidates on a part by running them
+            (None for a failed run, which is not stored)
+
+    Returns:
+        Callable -- The function of (part, candidates) to their sums
+    """
+
+    def run_claimed(part: str, keys: List[Tuple], sums: Dict[Tuple, Tuple[float, int, int]]):
+        # Runs candidates claimed by this process, and stores their sums or drops their claims
+        store = stores[part]
+        try:
+            outs = run(part, keys) if keys else []
+        except BaseException:
+            for key in keys:
+                store.release(key)
+            raise
+
+        for key, res in zip(keys, outs):
+            if res is None:
+                store.release(key)
+            else:
+                store.put(key, *res)
+                res = tuple(res)
+            sums[key] = res
+
+    def run_stored(part: str, keys: List[Tuple]) -> List[Tuple[float, int, int]]:
+        store = stores[part]
+        sums = {key: store.get(key) for key in keys}
+
+        todo = [key for key in keys if sums[key] is None]
+        mine = [key for key in todo if store.claim(key)]
+        run_claimed(part, mine, sums)
+
+        # Wait for the other processes, and run the candidates that they dropped (wait() claims them)
+        dropped = []
+        for key in todo:
+            if key not in mine:
+                sums[key] = store.wait(key)
+                if sums[key] is None:
+                    dropped.append(key)
+        run_claimed(part, dropped, sums)
+
+        return [sums[key] for key in keys]
+
+    return run_stored
+
+
+def run_race(keys: List[Tuple], parts: List[str], run: Callable[[str, List[Tuple]], List[Tuple[float, int, int]]], option: str,
+             alpha: float = ALPHA, min_parts: int = MIN_PARTS) -> Race:
+    """Races some candidates over some parts.
+
+    Arguments:
+        keys {List[Tuple]} -- The candidates (the values of their parameters)
+        parts {List[str]} -- The parts, in the order they are run
+        run {Callable[[str, List[Tuple]], List[Tuple[float, int, int]]]} -- Gives the sums of some candidates on a part, e.g. from the
+            `PartStore` of the part, or by running the ones that are not stored on the Daemons of the part
+        option {str} -- The option of `crit()`
+
+    Keyword Arguments:
+        alpha {float} -- The p-value under which a candidate is eliminated (default: {ALPHA})
+        min_parts {int} -- The parts that every candidate runs before the first test (default: {MIN_PARTS})
+
+    Returns:
+        Race -- The race, after all the parts
+    """
+
+    race = Race(keys, option, alpha, min_parts)
+    for part in parts:
+        race.add(run(part, race.alive))
+        race.eliminate()
+    return race
@@ -0,0 +1,444 @@
+"""Columnar, memory-mapped cache of the raw input files of the Synopses-Generator.
+
+Each file `../../data/{dataset}/{path}.csv` is parsed once into the folder `../../data/{dataset}/cache/{path}/`,
+that holds the points grouped by ship-ID as .npy files:
+
+* `ids.npy` the sorted ship-IDs.
+* `offsets.npy` where the points of each ship begin, i.e. the points of ship `ids[i]` are in `offsets[i]:offsets[i+1]`.
+* `lon.npy`, `lat.npy`, `t.npy` the points. The points of each ship keep the order of the file.
+* `row.npy` the line of each point in the file (counting only non-empty lines).
+* `meta.json` the modification time, size and sha1 of the file, used to invalidate the cache.
+
+`subsample()` and `subset()` give the points of a deterministic sample of the ships, for evaluations on a fraction of the input.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import zlib
+from collections.abc import Mapping
+from os.path import join
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+
+# Increase when the format of the cache changes, to rebuild all the caches
+CACHE_VERSION = 1
+
+# Names of the arrays of a cache folder
+ARRAYS = ('ids', 'offsets', 'lon', 'lat', 't', 'row')
+
+
+class RawTracks(Mapping):
+    """The raw points of some ships, stored as columns. It is a mapping from ship-ID to a track (lon, lat, t),
+    so it can be given to `local_lib.estimate_RMSE_np()` as it is.
+    """
+
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray, lon: np.ndarray, lat: np.ndarray, t: np.ndarray, row: np.ndarray, digest: str = ''):
+        """Constructor.
+
+        Arguments:
+            ids {np.ndarray} -- Sorted ship-IDs
+            offsets {np.ndarray} -- Where the points of each ship begin (has one more item than `ids`)
+            lon {np.ndarray} -- Longitudes
+            lat {np.ndarray} -- Latitudes
+            t {np.ndarray} -- Timestamps
+            row {np.ndarray} -- Line of each point in the input file of the Synopses-Generator
+
+        Keyword Arguments:
+            digest {str} -- A hash of the input files these points were read from (default: {''})
+        """
+
+        self.ids = ids
+        self.offsets = offsets
+        self.lon = lon
+        self.lat = lat
+        self.t = t
+        self.row = row
+        self.digest = digest
+
+        # Position of each ship-ID in `ids`
+        self.index = {idd: i for i, idd in enumerate(ids.tolist())}
+
+        # Whether the points of each ship are sorted in time, filled when needed
+        self.sorted = {}
+
+        # Position of each row in the columns, see positions()
+        self._positions = None
+
+    def __getitem__(self, idd: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        s = self.slice(idd)
+        return self.lon[s], self.lat[s], self.t[s]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, idd) -> bool:
+        return idd in self.index
+
+    def slice(self, idd: str) -> slice:
+        """The position of the points of a ship in the columns.
+
+        Arguments:
+            idd {str} -- Ship-ID
+
+        Returns:
+            slice -- The slice of the columns that holds the points of the ship
+        """
+
+        i = self.index[idd]
+        return slice(int(self.offsets[i]), int(self.offsets[i+1]))
+
+    def n_points(self) -> int:
+        """Number of points of all the ships."""
+        return len(self.t)
+
+    def nbytes(self) -> int:
+        """Size of the columns in bytes."""
+        return sum(getattr(self, a).nbytes for a in ARRAYS)
+
+    def find_rows(self, points: List[Tuple]) -> np.ndarray:
+        """Finds the rows of some points. A point that appears multiple times in the list
+        is matched to the first rows of its equal points, in order.
+
+        Arguments:
+            points {List[Tuple[str, float, float, int]]} -- Points (id, lon, lat, t)
+
+        Returns:
+            np.ndarray -- The row of each point, or -1 for points that do not exist
+        """
+
+        rows = np.full(len(points), -1, dtype=np.int64)
+
+        # How many times each point was already matched
+        used = {}
+
+        for i, point in enumerate(points):
+            idd, lon, lat, t = point
+            if idd not in self.index:
+                continue
+
+            s = self.slice(idd)
+            ts = self.t[s]
+
+            if idd not in self.sorted:
+                self.sorted[idd] = not np.any(ts[1:] < ts[:-1])
+
+            if self.sorted[idd]:
+                # The candidates are a contiguous range
+                lo = int(np.searchsorted(ts, t, side='left'))
+                hi = int(np.searchsorted(ts, t, side='right'))
+                hits = lo + np.flatnonzero((self.lon[s][lo:hi] == lon) & (self.lat[s][lo:hi] == lat))
+            else:
+                hits = np.flatnonzero((ts == t) & (self.lon[s] == lon) & (self.lat[s] == lat))
+
+            k = used.get(point, 0)
+            if k < len(hits):
+                rows[i] = self.row[s.start + hits[k]]
+                used[point] = k + 1
+
+        return rows
+
+    def positions(self) -> np.ndarray:
+        """The inverse of `row`: the position in the columns of each row of the input file."""
+
+        if self._positions is None:
+            self._positions = np.empty(len(self.row), dtype=np.int64)
+            self._positions[self.row] = np.arange(len(self.row))
+        return self._positions
+
+    def tracks_of_rows(self, rows: np.ndarray) -> Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Groups some rows of the input file by ship, e.g. the rows of the critical points of the compact output of the jar.
+
+        Arguments:
+            rows {np.ndarray} -- Rows of the input file
+
+        Returns:
+            Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] -- The points (lon, lat, t) of the rows of each ship, in the order of rows
+        """
+
+        pos = self.positions()[rows]
+        ship = np.searchsorted(self.offsets, pos, side='right') - 1
+
+        # Stable, so that inside each ship the points keep the order of rows
+        order = np.argsort(ship, kind='stable')
+        pos = pos[order]
+        ship = ship[order]
+
+        tracks = {}
+        for p in np.split(pos, np.flatnonzero(np.diff(ship)) + 1):
+            if len(p) > 0:
+                idd = str(self.ids[np.searchsorted(self.offsets, p[0], side='right') - 1])
+                tracks[idd] = (self.lon[p], self.lat[p], self.t[p])
+        return tracks
+
+    def to_points(self) -> Dict[str, List[Tuple]]:
+        """Converts the columns to the dictionary that `local_lib.estimate_RMSE()` uses.
+
+        Returns:
+            Dict[str, List[Tuple[float,float,int]]] -- A dictionary that maps the ship-id to a list of points (lon,lat,t)
+        """
+
+        lon = self.lon.tolist()
+        lat = self.lat.tolist()
+        t = self.t.tolist()
+
+        points = {}
+        for idd in self.index:
+            s = self.slice(idd)
+            points[idd] = list(zip(lon[s], lat[s], t[s]))
+        return points
+
+
+def file_sha1(src: str) -> str:
+    """sha1 of the contents of a file."""
+
+    h = hashlib.sha1()
+    with open(src, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_folder(src: str, data_folder: str) -> str:
+    """The cache folder of a file of a dataset, e.g. `data/brest/data_per_type/cross/type30/month1.csv`
+    is cached in `data/brest/cache/data_per_type/cross/type30/month1/`.
+
+    Arguments:
+        src {str} -- The raw file
+        data_folder {str} -- The folder of the dataset
+
+    Returns:
+        str -- The cache folder
+    """
+
+    rel = os.path.relpath(src, data_folder)
+    return join(data_folder, 'cache', os.path.splitext(rel)[0])
+
+
+def read_meta(dst: str) -> Dict:
+    """Reads `meta.json` of a cache folder. Returns an empty dict if it does not exist."""
+
+    try:
+        with open(join(dst, 'meta.json'), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def is_valid(src: str, dst: str) -> bool:
+    """Checks if the cache of a file is up to date. If the modification time of the file
+    changed, but its contents did not, the cache is kept (and its meta is updated).
+
+    Arguments:
+        src {str} -- The raw file
+        dst {str} -- Its cache folder
+
+    Returns:
+        bool -- Whether the cache can be used
+    """
+
+    meta = read_meta(dst)
+    if meta.get('version') != CACHE_VERSION:
+        return False
+
+    st = os.stat(src)
+    if meta['mtime_ns'] == st.st_mtime_ns and meta['size'] == st.st_size:
+        return True
+
+    if meta['size'] != st.st_size or meta['sha1'] != file_sha1(src):
+        return False
+
+    # Only touched, store the new modification time
+    meta['mtime_ns'] = st.st_mtime_ns
+    with open(join(dst, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return True
+
+
+def build(src: str, dst: str):
+    """Parses a raw file and stores its columns in a cache folder.
+    The folder is first written under a temporary name and then renamed, so readers never see half a cache.
+
+    Arguments:
+        src {str} -- The raw file (space separated: t id lon lat ...)
+        dst {str} -- The cache folder
+    """
+
+    st = os.stat(src)
+
+    # Parse exactly as the Daemon used to, so that the values are the same
+    ids, lon, lat, t = [], [], [], []
+    for line in open(src, 'r'):
+        if len(line) <= 2:
+            continue
+        words = line.split(' ')
+        t.append(int(words[0]))
+        ids.append(words[1])
+        lon.append(float(words[2]))
+        lat.append(float(words[3]))
+
+    ids = np.array(ids, dtype=str)
+    row = np.argsort(ids, kind='stable')  # Group by ship, but keep the order of the file inside each ship
+    uniq, counts = np.unique(ids[row], return_counts=True)
+
+    arrays = {
+        'ids': uniq,
+        'offsets': np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        'lon': np.array(lon, dtype=np.float64)[row],
+        'lat': np.array(lat, dtype=np.float64)[row],
+        't': np.array(t, dtype=np.int64)[row],
+        'row': row.astype(np.int64)
+    }
+
+    tmp = f'{dst}.tmp{os.getpid()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    for name, a in arrays.items():
+        np.save(join(tmp, name + '.npy'), a)
+
+    with open(join(tmp, 'meta.json'), 'w') as f:
+        json.dump({
+            'version': CACHE_VERSION,
+            'source': src,
+            'mtime_ns': st.st_mtime_ns,
+            'size': st.st_size,
+            'sha1': file_sha1(src),
+            'rows': len(row)
+        }, f)
+
+    shutil.rmtree(dst, ignore_errors=True)
+    os.rename(tmp, dst)
+
+
+def load(src: str, data_folder: str) -> RawTracks:
+    """Returns the memory-mapped columns of a raw file. Builds (or rebuilds) the cache if needed.
+
+    Arguments:
+        src {str} -- The raw file
+        data_folder {str} -- The folder of the dataset
+
+    Returns:
+        RawTracks -- The points of the file
+    """
+
+    if not os.path.exists(src):
+        raise FileNotFoundError(f'Raw file does not exist in {src}')
+
+    dst = cache_folder(src, data_folder)
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+    if not is_valid(src, dst):
+        # Only one process builds the cache, the others wait and then use it
+        with open(dst + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not is_valid(src, dst):
+                build(src, dst)
+
+    arrays = {name: np.load(join(dst, name + '.npy'), mmap_mode='r') for name in ARRAYS}
+    return RawTracks(**arrays, digest=read_meta(dst)['sha1'])
+
+
+def compose(parts: List[RawTracks]) -> RawTracks:
+    """Concatenates the points of some files, in the order they are given, as `Daemon.place_input()` does.
+    The rows are shifted so that they refer to the concatenated file.
+
+    Arguments:
+        parts {List[RawTracks]} -- The points of each file
+
+    Returns:
+        RawTracks -- The points of all the files
+    """
+
+    digest = hashlib.sha1(' '.join(p.digest for p in parts).encode()).hexdigest()
+
+    if len(parts) == 1:
+        p = parts[0]
+        return RawTracks(p.ids, p.offsets, p.lon, p.lat, p.t, p.row, digest=digest)
+
+    # First row of each file in the concatenated file
+    bases = np.cumsum([0] + [p.n_points() for p in parts[:-1]])
+
+    ids = np.unique(np.concatenate([p.ids for p in parts]))
+
+    # Position of the ship-ID of each point in `ids`
+    codes = np.concatenate([np.repeat(np.searchsorted(ids, p.ids), np.diff(p.offsets)) for p in parts])
+
+    # Stable, so that inside each ship the points are in the order of the concatenated file
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=len(ids))
+
+    return RawTracks(
+        ids,
+        np.concatenate(([0], np.cumsum(counts))).astype(np.int64),
+        np.concatenate([p.lon for p in parts])[order],
+        np.concatenate([p.lat for p in parts])[order],
+        np.concatenate([p.t for p in parts])[order],
+        np.concatenate([p.row + b for p, b in zip(parts, bases)])[order],
+        digest=digest
+    )
+
+
+def subsample(tracks: RawTracks, fraction: float) -> List[str]:
+    """A deterministic sample of the ships, stratified by their number of points: the ships are sorted by it
+    (ties by a hash of the ID) and every 1/fraction-th one is taken, so that short and long tracks keep their proportions.
+
+    Arguments:
+        tracks {RawTracks} -- The points of all the ships
+        fraction {float} -- The fraction of the ships to take, in (0, 1]
+
+    Returns:
+        List[str] -- The sorted IDs of the sample, at least one
+    """
+
+    ids = tracks.ids.tolist()
+    sizes = np.diff(tracks.offsets)
+    hashes = np.array([zlib.crc32(idd.encode()) for idd in ids], dtype=np.int64)
+    order = np.lexsort((hashes, sizes))
+
+    # Systematic sampling of the sorted ships: rank r is taken when r*fraction crosses a multiple of 1 (from the middle of the first interval)
+    ranks = np.arange(len(ids))
+    taken = np.floor((ranks + 1) * fraction + 0.5) > np.floor(ranks * fraction + 0.5)
+    if not taken.any():
+        taken[len(ids) // 2] = True
+
+    return sorted(ids[i] for i in order[taken])
+
+
+def subset(tracks: RawTracks, ids: List[str]) -> RawTracks:
+    """The points of some of the ships, as if the input file had only their lines (see `input_cache.place()`):
+    the rows are those of the lines of these ships, counted in the order of the file.
+
+    Arguments:
+        tracks {RawTracks} -- The points of all the ships
+        ids {List[str]} -- The sorted IDs of the ships to keep
+
+    Returns:
+        RawTracks -- The points of the ships
+    """
+
+    idx = [tracks.index[idd] for idd in ids]
+    sizes = np.array([tracks.offsets[i+1] - tracks.offsets[i] for i in idx], dtype=np.int64)
+    positions = np.concatenate([np.arange(tracks.offsets[i], tracks.offsets[i+1]) for i in idx]).astype(np.int64)
+
+    # The rank of each kept row among the kept rows
+    old = tracks.row[positions]
+    row = np.empty(len(old), dtype=np.int64)
+    row[np.argsort(old, kind='stable')] = np.arange(len(old))
+
+    return RawTracks(
+        np.array(ids, dtype=str),
+        np.concatenate(([0], np.cumsum(sizes))).astype(np.int64),
+        tracks.lon[positions],
+        tracks.lat[positions],
+        tracks.t[positions],
+        row,
+        digest=hashlib.sha1(' '.join([tracks.digest] + list(ids)).encode()).hexdigest()
+    )
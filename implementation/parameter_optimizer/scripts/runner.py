@@ -1,12 +1,121 @@
 #!/usr/bin/python3
 
 import os
-from time import time
+import subprocess
+import sys
+from time import sleep, time
 from datetime import datetime
 import argparse
 from termcolor import colored as col
 
 
+class Job:
+    """A run of `genetic.py` (kind 'train') or `valuate.py` (kind 'eval') for a part, an option and a type.
+    """
+
+    def __init__(self, kind: str, part: int, opt: str, ship_type: str):
+        """Constructor.
+
+        Args:
+            kind (str): 'train' or 'eval'
+            part (int): The part
+            opt (str): The optimization option
+            ship_type (str): The ship type
+        """
+
+        self.kind = kind
+        self.part = part
+        self.opt = opt
+        self.ship_type = ship_type
+
+        # Daemons the job runs at once
+        self.cost = workers if kind == 'train' else 1
+
+        self.proc = None
+        self.start = None
+        self.secs = None
+
+        # Stdout of the script. The one of genetic.py has the name it always had
+        name = f'{dataset}_{ship_type}_{fcode}_{part}_{opt}'
+        self.log = f'logs/{name}.log' if kind == 'train' else f'logs/eval_{name}.log'
+
+        # Written when the job succeeds
+        self.marker = f'logs/{kind}_{name}.done'
+
+    def __str__(self):
+        return f'{self.kind} part {self.part} opt {self.opt} type {self.ship_type}'
+
+    def outputs(self) -> list:
+        """The files that the job writes."""
+
+        folder = f'saves/{dataset}/type{self.ship_type}'
+        save = f'{fcode}{self.part}.pkl' if self.kind == 'train' else f'eval_{fcode}{self.part}.pkl'
+        return [f'{folder}/{save}', self.marker]
+
+    def command(self) -> list:
+        """The command of the job."""
+
+        if self.kind == 'train':
+            return ['python3', 'genetic.py', f'-data={dataset}', f'-type={self.ship_type}', f'-p={self.part}', f'-opt={self.opt}',
+                    f'-ngen={ngen}', f'-pops={pops}', f'-fcode={fcode}', f'-workers={workers}']
+        return ['python3', 'valuate.py', self.ship_type, str(self.part), self.opt, dataset, fcode]
+
+    def launch(self):
+        """Starts the script, with its stdout in the log file."""
+
+        self.start = time()
+        with open(self.log, 'w') as log:
+            self.proc = subprocess.Popen(self.command(), stdout=log)
+
+    def done(self) -> bool:
+        """Whether the script has ended. Writes the marker if it succeeded."""
+
+        if self.proc.poll() is None:
+            return False
+
+        self.secs = time() - self.start
+        if self.proc.returncode == 0:
+            with open(self.marker, 'w') as file:
+                file.write(f'{datetime.now()} {round(self.secs)}\n')
+        return True
+
+
+def hms(t: float) -> str:
+    """A duration as hours, minutes and seconds."""
+
+    t = round(t)
+    return '{} hours, {} minutes, {} seconds'.format(t//3600, (t % 3600)//60, t % 60)
+
+
+def eta(chains: list, running: list) -> float:
+    """Estimates the time (in seconds) until all the jobs end, from the mean wall time of the finished jobs of each kind:
+    the remaining time of the running jobs, plus the time of the waiting ones over the chains that can run at once.
+
+    Args:
+        chains (list): The jobs left in each chain, running or waiting
+        running (list): The running jobs
+
+    Returns:
+        float: The estimate, or None if no job of a kind that is left has finished
+    """
+
+    means = {kind: sum(times) / len(times) for kind, times in wall_times.items() if times}
+
+    work = 0.0
+    for job in running:
+        if job.kind not in means:
+            return None
+        work += max(means[job.kind] - (time() - job.start), 0)
+
+    waiting = [job for chain in chains for job in chain if job not in running]
+    if any(job.kind not in means for job in waiting):
+        return None
+    work += sum(means[job.kind] for job in waiting)
+
+    parallel = max(1, min(slots // workers, len([chain for chain in chains if chain])))
+    return work / parallel
+
+
 my_parser = argparse.ArgumentParser(description='Python3 Script that trains the genetic algorithm and then finds the RMSE and Ratio for the best parameter on the valuation set.',
                                     formatter_class=lambda prog: argparse.HelpFormatter(prog, max_help_position=50))
 
@@ -28,11 +137,30 @@ my_parser.add_argument('--eval_only', '-e',
                        action='store_true',
                        help=col('Whether to only evaluate the results and skip the training.\n', 'cyan'))
 
+my_parser.add_argument('--slots', '-s',
+                       type=int,
+                       default=1,
+                       help=col('Number of Daemons (e.g. task slots of the Flink cluster) that the jobs may run at once. Defaults to 1, i.e. one job after the other.\n', 'cyan'))
+
+my_parser.add_argument('--workers', '-w',
+                       type=int,
+                       default=1,
+                       help=col('The -workers of genetic.py. Each training takes that many slots. Defaults to 1.\n', 'cyan'))
+
+my_parser.add_argument('--force', '-f',
+                       action='store_true',
+                       help=col('Run the jobs whose outputs already exist too (e.g. to train them for more generations).\n', 'cyan'))
+
 args = my_parser.parse_args()
 
 dataset = args.data
 fcode = args.fcode
 eval_only = args.eval_only
+slots = args.slots
+workers = args.workers
+
+if workers > slots:
+    my_parser.error('--workers can not be more than --slots')
 
 # Number of generations and population size TODO put these as args
 ngen = 7
@@ -46,6 +174,10 @@ if not os.path.exists('logs'):
 if not os.path.exists('tmp'):
     os.mkdir('tmp')
 
+# The jobs that share a part and a type share the saves of genetic.py and valuate.py, so they form a chain that runs
+# in the order of the options (each training, then its valuation). The chains are independent, and run at once.
+chains = {}
+
 # For each option
 for o in args.options:
 
@@ -63,28 +195,62 @@ for o in args.options:
 
     # For each part in range
     for p in range(p1, p2):
+        chain = chains.setdefault((ship_type, p), [])
 
-        t = time()
-
+        trained = False
         if not eval_only:
-            # Run genetic.py
-            ret = os.system('python3 genetic.py -data={0} -type={1} -p={2} -opt={3} -ngen={4} -pops={5} -fcode={6} > logs/{0}_{1}_{6}_{2}_{3}.log'.format(
-                dataset, ship_type, p, opt, ngen, pops, fcode))
-
-            # This means that some error occurred
-            if ret != 0:
-                raise RuntimeError('Return code ' + str(ret))
-
-        # Run valuation. This will store the RMSE,Ratio for the best individual
-        ret = os.system(f'python3 valuate.py {ship_type} {p} {opt} {dataset} {fcode}')
-        if ret != 0:
-            raise RuntimeError('Return code ' + str(ret))
-
-        t = round(time() - t)
-
-        # I dont remember why there is a try here. I guess it doesnt hurt though
-        try:
-            print('\n ** {}: Took {} hours, {} minutes, {} seconds **\n'.format(
-                datetime.time(datetime.now()), t//3600, (t % 3600)//60, t % 60))
-        except:
-            pass
+            job = Job('train', p, opt, ship_type)
+            if args.force or not all(os.path.exists(f) for f in job.outputs()):
+                chain.append(job)
+                trained = True
+
+        # Valuation. This will store the RMSE,Ratio for the best individual. It runs again after a training
+        job = Job('eval', p, opt, ship_type)
+        if args.force or trained or not all(os.path.exists(f) for f in job.outputs()):
+            chain.append(job)
+
+chains = list(chains.values())
+total = sum(len(chain) for chain in chains)
+print(col(f'{total} jobs in {len([c for c in chains if c])} chains, on {slots} slots', 'blue'))
+
+# Wall times of the finished jobs of each kind
+wall_times = {'train': [], 'eval': []}
+
+running = []
+failed = []
+finished = 0
+start = time()
+
+while any(chains) or running:
+    # Start the next job of each free chain while there are enough free slots (a failed chain stops)
+    for chain in chains:
+        if chain and not any(job in running for job in chain) and sum(job.cost for job in running) + chain[0].cost <= slots:
+            chain[0].launch()
+            running.append(chain[0])
+            print(col(f'** {datetime.time(datetime.now())}: Started {chain[0]} **', 'yellow'))
+
+    sleep(1)
+
+    for job in [job for job in running if job.done()]:
+        running.remove(job)
+        chain = next(chain for chain in chains if chain and chain[0] is job)
+        chain.pop(0)
+
+        if job.proc.returncode != 0:
+            # This means that some error occurred. The rest of the chain depends on the job
+            failed.append(job)
+            chain.clear()
+            print(col(f'** {job} failed with return code {job.proc.returncode}, see {job.log} **', 'red'), file=sys.stderr)
+            continue
+
+        finished += 1
+        wall_times[job.kind].append(job.secs)
+        left = eta(chains, running)
+        print(col(f'\n ** {datetime.time(datetime.now())}: {job} took {hms(job.secs)}. '
+                  f'{finished}/{total} done, '
+                  f'ETA {"unknown" if left is None else hms(left)} **\n', 'green'))
+
+print(col(f'\n ** {datetime.time(datetime.now())}: All the jobs took {hms(time() - start)} **\n', 'blue'))
+
+if failed:
+    raise RuntimeError('Failed: ' + ', '.join(map(str, failed)))
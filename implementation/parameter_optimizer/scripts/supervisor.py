@@ -0,0 +1,285 @@
+"""Supervised processes of the Synopses-Generator (the session, or `flink run`), see `Daemon.run_generator()`.
+
+* Each process starts in its own process group, so that killing it also kills the JVM and the children of `flink`.
+* Its stderr is read by a thread, and only the last `STDERR_CAP` bytes are kept, for the messages of the errors.
+  The output that is not read is not piped, so a chatty generator never blocks on a full pipe.
+* `watch()` kills the group if a run takes longer than its limit (see `time_limit()`), and the Daemon raises `GeneratorTimeout`.
+* The group of each process is recorded in a file next to the lock of the id of the Daemon (see `local_lib.take_slot()`).
+  If the optimizer is killed, its generators outlive it, and `reap()` (called by every new Daemon, or by running
+  `python3 supervisor.py`) kills the groups of the ids whose lock is no longer held.
+"""
+
+import atexit
+import fcntl
+import os
+import signal
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from os.path import join
+from subprocess import DEVNULL, PIPE, Popen, TimeoutExpired
+from typing import List
+
+
+# Limit of a run of the generator: a fixed startup, and a time for each point of the input
+TIMEOUT_BASE = 300
+TIMEOUT_PER_POINT = 1e-3
+
+# Bytes of the stderr of a process that are kept
+STDERR_CAP = 64 * 1024
+
+# Seconds between the SIGTERM and the SIGKILL of a group
+KILL_GRACE = 5
+
+# The processes that run, killed at the exit of the interpreter
+running = weakref.WeakSet()
+
+
+class GeneratorTimeout(RuntimeError):
+    """A run of the Synopses-Generator took longer than its limit, and was killed."""
+
+    def __init__(self, secs: float, stderr: str = ''):
+        super().__init__(f'The Synopses-Generator was killed after {secs:.0f} seconds')
+        self.secs = secs
+        self.stderr = stderr
+
+
+def time_limit(points: int, scale: float = 1.0) -> float:
+    """The limit of a run of the generator on an input.
+
+    Arguments:
+        points {int} -- The number of points of the input
+
+    Keyword Arguments:
+        scale {float} -- Multiplies the limit (default: {1.0})
+
+    Returns:
+        float -- Seconds
+    """
+
+    return scale * (TIMEOUT_BASE + TIMEOUT_PER_POINT * points)
+
+
+def start_time(pid: int) -> str:
+    """The start time of a process, from /proc (in clock ticks after the boot), or '' if it is not known."""
+
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ''
+
+
+def kill_group(pgid: int):
+    """Sends SIGTERM to a process group, and SIGKILL to what is left after KILL_GRACE seconds."""
+
+    try:
+        os.killpg(pgid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        return
+
+    end = time.time() + KILL_GRACE
+    while time.time() < end:
+        try:
+            os.killpg(pgid, 0)
+        except (ProcessLookupError, PermissionError):
+            return
+        time.sleep(0.1)
+
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class Supervised:
+    """A process in its own group, with a capped stderr and a record of the group in the slots folder.
+
+    Example:
+        proc = Supervised(cmd, slots_folder, idd)
+        with proc.watch(limit):
+            proc.wait()
+        if proc.timed_out: ...
+        proc.close()
+    """
+
+    def __init__(self, cmd: List[str], slots_folder: str, idd: str, stdin=None, stdout=DEVNULL, **kwargs):
+        """Starts the process.
+
+        Arguments:
+            cmd {List[str]} -- The command
+            slots_folder {str} -- The folder of the locks of the ids
+            idd {str} -- The id of the Daemon
+
+        Keyword Arguments:
+            stdin -- As in Popen (default: {None})
+            stdout -- As in Popen (default: {DEVNULL})
+            kwargs -- Other arguments of Popen
+        """
+
+        self.proc = Popen(cmd, stdin=stdin, stdout=stdout, stderr=PIPE, start_new_session=True, **kwargs)
+        self.pgid = self.proc.pid
+        self.timed_out = False
+
+        # The start time tells the group apart from a later process with the same id
+        self.group_file = join(slots_folder, f'{idd}.{self.pgid}.pgid')
+        with open(self.group_file, 'w') as f:
+            f.write(f'{start_time(self.pgid)}\n' + ' '.join(cmd) + '\n')
+
+        self.stderr = bytearray()
+        self.reader = threading.Thread(target=self.read_stderr, daemon=True)
+        self.reader.start()
+
+        running.add(self)
+
+    @property
+    def stdin(self):
+        return self.proc.stdin
+
+    @property
+    def stdout(self):
+        return self.proc.stdout
+
+    def read_stderr(self):
+        """Reads the stderr until it closes, keeping its last STDERR_CAP bytes."""
+
+        fd = self.proc.stderr.fileno()
+        for chunk in iter(lambda: os.read(fd, 4096), b''):
+            self.stderr += chunk
+            if len(self.stderr) > STDERR_CAP:
+                del self.stderr[:len(self.stderr) - STDERR_CAP]
+
+    def stderr_tail(self) -> str:
+        """The last bytes of the stderr, as text."""
+        return bytes(self.stderr).decode(errors='replace')
+
+    @contextmanager
+    def watch(self, limit: float):
+        """Kills the group if the block takes longer than limit seconds (then `timed_out` is True),
+        or if the block raises (e.g. KeyboardInterrupt or SystemExit).
+        """
+
+        def expire():
+            self.timed_out = True
+            kill_group(self.pgid)
+
+        timer = threading.Timer(limit, expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            yield self
+        except BaseException:
+            self.kill()
+            raise
+        finally:
+            timer.cancel()
+
+    def wait(self, timeout: float = None) -> int:
+        """Waits for the process, see Popen.wait()."""
+        return self.proc.wait(timeout)
+
+    def kill(self):
+        """Kills the group, and waits for the process."""
+
+        kill_group(self.pgid)
+        try:
+            self.proc.wait(KILL_GRACE)
+        except TimeoutExpired:
+            pass
+
+    def close(self):
+        """Kills what is left of the group, and removes its record."""
+
+        if self.proc.poll() is None:
+            self.kill()
+        else:
+            # The children of flink may outlive it
+            try:
+                os.killpg(self.pgid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+        self.reader.join(1)
+        for f in (self.proc.stdin, self.proc.stdout, self.proc.stderr):
+            if f is not None:
+                try:
+                    f.close()
+                except OSError:
+                    pass
+
+        if os.path.exists(self.group_file):
+            os.remove(self.group_file)
+        running.discard(self)
+
+
+@atexit.register
+def kill_running():
+    """Kills the groups of the processes that still run at the exit of the interpreter."""
+
+    for proc in list(running):
+        proc.close()
+
+
+def reap(slots_folder: str) -> int:
+    """Kills the process groups left by the Daemons that were killed, i.e. the ones recorded for ids whose lock is not held.
+    The lock of each id is held while its groups are killed, so no Daemon can take it meanwhile.
+
+    Arguments:
+        slots_folder {str} -- The folder of the locks of the ids
+
+    Returns:
+        int -- The number of groups that were killed
+    """
+
+    if not os.path.isdir(slots_folder):
+        return 0
+
+    records = {}
+    for name in os.listdir(slots_folder):
+        if name.endswith('.pgid'):
+            idd, pgid, _ = name.split('.')
+            records.setdefault(idd, []).append((int(pgid), join(slots_folder, name)))
+
+    killed = 0
+    for idd, groups in records.items():
+        fd = os.open(join(slots_folder, f'{idd}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+
+        try:
+            for pgid, path in groups:
+                with open(path) as f:
+                    started = f.readline().strip()
+
+                # While the leader runs, it must be the recorded process. Once it exits, its id is not reused while the group has processes
+                same = not os.path.exists(f'/proc/{pgid}') or not started or start_time(pgid) in ('', started)
+                try:
+                    os.killpg(pgid, 0)
+                    if same:
+                        kill_group(pgid)
+                        killed += 1
+                except (ProcessLookupError, PermissionError):
+                    pass
+                os.remove(path)
+        finally:
+            os.close(fd)
+
+    return killed
+
+
+if __name__ == '__main__':
+    import transport  # pylint: disable=import-outside-toplevel
+
+    # The folders of the Daemons, see `Daemon.__init__()`
+    scripts_fold = os.path.expanduser('~/infore/datacron/implementation/parameter_optimizer/scripts')
+    slots = join(scripts_fold, 'tmp/slots')
+
+    print(f'Killed {reap(slots)} process groups of dead Daemons')
+
+    for root in {transport.SCRATCH_ROOT, join(scripts_fold, 'tmp')}:
+        transport.sweep(transport.scratch_parent(root, slots), slots, None)
+    print('Removed the scratch folders of dead Daemons')
@@ -0,0 +1,170 @@
+"""Surrogate model of the Synopses-Generator: predicts the (RMSE, Ratio) of synopses parameters from the ones already evaluated,
+so that the GA only runs the offspring that look promising (see `-surrogate` in `genetic.py`).
+
+The model is a Gaussian process (in NumPy) over the parameters scaled to [0, 1] by their ranges in `PARAMETERS`,
+with a separate RBF-kernel regression for the logarithm of the RMSE and of the Ratio. The length scale is picked from
+`LENGTH_SCALES` by the marginal likelihood each time the model is fitted.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from local_lib import PARAMETERS, crit
+
+
+# Candidate length scales of the kernel, on the scaled parameters
+LENGTH_SCALES = (0.1, 0.2, 0.35, 0.6, 1.0)
+
+# Variance of the noise of the targets, relative to their variance (the generator is deterministic, but the targets are not smooth)
+NOISE = 1e-2
+
+# The model is fitted on at most that many results (the best ones), since the cost is cubic
+MAX_POINTS = 500
+
+# Fewer results than that are not enough to fit the model
+MIN_POINTS = 10
+
+
+def scale(individuals: Sequence[Sequence]) -> np.ndarray:
+    """The parameters of some individuals scaled to [0, 1] by their ranges in PARAMETERS."""
+
+    low = np.array([v[0] for v in PARAMETERS.values()], dtype=np.float64)
+    high = np.array([v[1] for v in PARAMETERS.values()], dtype=np.float64)
+    return (np.asarray(individuals, dtype=np.float64) - low) / (high - low)
+
+
+def rbf(a: np.ndarray, b: np.ndarray, length: float) -> np.ndarray:
+    """RBF kernel between the rows of a and b."""
+
+    d = (a**2).sum(1)[:, None] + (b**2).sum(1)[None, :] - 2 * a @ b.T
+    return np.exp(-np.maximum(d, 0) / (2 * length**2))
+
+
+class GaussianProcess:
+    """Gaussian process regression of a single target, with standardized targets and an RBF kernel."""
+
+    def fit(self, x: np.ndarray, y: np.ndarray):
+        """Fits the model, picking the length scale with the highest marginal likelihood.
+
+        Arguments:
+            x {np.ndarray} -- Scaled parameters, one row for each point
+            y {np.ndarray} -- Target of each point
+        """
+
+        self.x = x
+        self.mean = y.mean()
+        self.std = y.std() or 1.0
+        z = (y - self.mean) / self.std
+
+        best = None
+        for length in LENGTH_SCALES:
+            k = rbf(x, x, length) + NOISE * np.eye(len(x))
+            try:
+                chol = np.linalg.cholesky(k)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, z))
+
+            # Log marginal likelihood, without the constant
+            lml = -0.5 * z @ alpha - np.log(np.diag(chol)).sum()
+            if best is None or lml > best[0]:
+                best = (lml, length, alpha, chol)
+
+        if best is None:
+            raise np.linalg.LinAlgError('Kernel matrix is not positive definite for any length scale')
+
+        _, self.length, self.alpha, self.chol = best
+        return self
+
+    def predict(self, x: np.ndarray, return_std: bool = False):
+        """The mean of the prediction at some scaled parameters, and its standard deviation if return_std."""
+
+        k = rbf(x, self.x, self.length)
+        mean = self.mean + self.std * (k @ self.alpha)
+        if not return_std:
+            return mean
+
+        v = np.linalg.solve(self.chol, k.T)
+        var = np.maximum(1.0 - (v**2).sum(0), 1e-12)
+        return mean, self.std * np.sqrt(var)
+
+
+class Surrogate:
+    """Predicts the (RMSE, Ratio) of synopses parameters, from the `results` of a GA.
+
+    Example:
+        model = Surrogate().fit(results, opt)
+        rmse, ratio = model.predict(individuals)
+    """
+
+    def __init__(self):
+        self.models = None
+
+    def fit(self, results: Dict[Tuple, Tuple[float, float]], opt: str = None):
+        """Fits the model. Does nothing with fewer than MIN_POINTS results (then `ready()` is False).
+
+        Arguments:
+            results {Dict[Tuple, Tuple[float, float]]} -- Maps synopses parameters to (RMSE, Ratio)
+
+        Keyword Arguments:
+            opt {str} -- Option of `crit()`. If there are more than MAX_POINTS results, the best ones by it are kept (default: {None})
+        """
+
+        items = list(results.items())
+        if len(items) < MIN_POINTS:
+            self.models = None
+            return self
+
+        if len(items) > MAX_POINTS and opt is not None:
+            items = sorted(items, key=lambda kv: crit(kv[1][0], kv[1][1], opt))[:MAX_POINTS]
+        else:
+            items = items[-MAX_POINTS:]
+
+        x = scale([params for params, _ in items])
+        y = np.log(np.array([res for _, res in items], dtype=np.float64) + 1e-9)
+
+        self.models = [GaussianProcess().fit(x, y[:, i]) for i in range(2)]
+        return self
+
+    def ready(self) -> bool:
+        """Whether the model was fitted."""
+        return self.models is not None
+
+    def predict(self, individuals: Sequence[Sequence]) -> Tuple[np.ndarray, np.ndarray]:
+        """Predicts the (RMSE, Ratio) of some individuals.
+
+        Arguments:
+            individuals {Sequence[Sequence]} -- The values of the parameters of each individual
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray] -- The RMSE and the Ratio of each one
+        """
+
+        x = scale(individuals)
+        rmse, ratio = (np.exp(m.predict(x)) for m in self.models)
+        return rmse, ratio
+
+
+def screen(scores: List[float], keep: float, explore: float, rnd) -> List[int]:
+    """Chooses which of some candidates to run: the ones with the best predicted scores, and a few others at random.
+
+    Arguments:
+        scores {List[float]} -- The predicted score of each candidate (lower is better)
+        keep {float} -- The fraction of the candidates to run because of their scores
+        explore {float} -- The fraction of the candidates to run at random, among the rest
+        rnd {random.Random} -- Random generator (e.g. the module `random`)
+
+    Returns:
+        List[int] -- The indices of the candidates to run, sorted
+    """
+
+    order = sorted(range(len(scores)), key=lambda i: scores[i])
+    n_best = max(1, int(round(keep * len(scores))))
+    chosen = order[:n_best]
+
+    rest = order[n_best:]
+    n_explore = min(len(rest), int(round(explore * len(scores))))
+    chosen += rnd.sample(rest, n_explore)
+
+    return sorted(chosen)
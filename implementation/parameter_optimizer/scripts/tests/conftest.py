@@ -0,0 +1,79 @@
+"""Fixtures of the tests of the scripts. Run `python -m pytest tests` from the scripts folder."""
+
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+
+import pytest
+
+
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test in an empty folder, so that `saves/`, `tmp/` etc. are made there."""
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def dead_owner() -> str:
+    """An owner (see `eval_store.process_id()`) of a process of this host that has exited."""
+
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return f'{socket.gethostname()}:{proc.pid}'
+
+
+def live_owner() -> str:
+    """An owner of another process of this host that is alive: pid 1."""
+    return f'{socket.gethostname()}:1'
+
+
+def write_tracks(path, ships: int = 4, points: int = 150, seed: int = 0):
+    """Writes an input file of random tracks, in the format of `implementation/data/` (timestamp id lon lat ..., in time order)."""
+
+    rnd = random.Random(seed)
+    rows = []
+    for s in range(ships):
+        idd = str(227000000 + s)
+        t, lon, lat = 1443650400000 + rnd.randrange(60000), -4.5 + rnd.random() / 10, 48.3 + rnd.random() / 10
+        heading = rnd.uniform(0, 2 * math.pi)
+        for _ in range(points):
+            t += rnd.choice((10000, 20000, 30000, 600000))
+            heading += rnd.gauss(0, 0.02) if rnd.random() < 0.9 else rnd.gauss(0, 0.5)
+            step = rnd.choice((0.0, 0.001, 0.001, 0.001))
+            lon += step * math.cos(heading)
+            lat += step * math.sin(heading)
+            rows.append((t, idd, round(lon, 6), round(lat, 6)))
+
+    rows.sort()
+    with open(path, 'w') as f:
+        for t, idd, lon, lat in rows:
+            f.write(f'{t} {idd} {lon} {lat} 0 0 0 0\n')
+
+
+@pytest.fixture
+def home(workdir, monkeypatch):
+    """A HOME with the folders that a `Daemon` uses (`~/infore/datacron/...`): the template of the parameters of this
+    checkout, and an input of random tracks for dataset 'test', type 1, `month1.csv`. Use the 'python' generator.
+    """
+
+    home = workdir / 'home'
+    datacron = home / 'infore' / 'datacron' / 'implementation'
+
+    parameters = datacron / 'parameter_optimizer' / 'parameters'
+    parameters.mkdir(parents=True)
+    os.symlink(os.path.join(SCRIPTS, '..', 'parameters', 'maritime_config_template.properties'), parameters / 'maritime_config_template.properties')
+
+    data = datacron / 'data' / 'test' / 'data_per_type' / 'cross' / 'type1'
+    data.mkdir(parents=True)
+    write_tracks(data / 'month1.csv')
+
+    monkeypatch.setenv('HOME', str(home))
+    return home
@@ -0,0 +1,145 @@
+"""`AsyncDaemonPool` with Daemons of the 'python' generator."""
+
+import asyncio
+
+import pytest
+
+from local_lib import DEF_PARAMS, PARAMETERS, AsyncDaemonPool, Censored, Daemon, DaemonPool
+
+
+PARAMS = dict(zip(PARAMETERS, DEF_PARAMS))
+
+# Arguments of the Daemons, see the fixture home
+DAEMON = ('1', [1], 'test', 'month')
+OPTIONS = {'generator': 'python'}
+
+
+def other_params(i: int):
+    return dict(PARAMS, ANGLE_THRESHOLD=PARAMS['ANGLE_THRESHOLD'] + 3 * i)
+
+
+@pytest.fixture
+def scratch(workdir):
+    return {'scratch': str(workdir / 'scratch')}
+
+
+def test_map_same_as_daemon(home, scratch):
+    params_list = [other_params(i) for i in range(5)]
+
+    daemon = Daemon(*DAEMON, **OPTIONS, **scratch)
+    try:
+        expected = [daemon.run_synopses(params) for params in params_list]
+    finally:
+        daemon.end()
+
+    pool = AsyncDaemonPool(2, *DAEMON, **OPTIONS, **scratch)
+    try:
+        assert asyncio.run(pool.map(params_list)) == expected
+        assert len(pool.run_times) == len(params_list)
+
+        # Again, in another event loop
+        assert asyncio.run(pool.map(params_list[:2])) == expected[:2]
+        assert len(pool.run_times) == 2
+    finally:
+        pool.end()
+
+    pool = DaemonPool(2, *DAEMON, **OPTIONS, **scratch)
+    try:
+        assert pool.map(params_list) == expected
+    finally:
+        pool.end()
+
+
+def test_map_sums_and_cutoff(home, scratch):
+    params_list = [other_params(i) for i in range(3)]
+
+    daemon = Daemon(*DAEMON, **OPTIONS, **scratch)
+    try:
+        expected = [daemon.run_synopses_sums(params) for params in params_list]
+    finally:
+        daemon.end()
+
+    pool = AsyncDaemonPool(2, *DAEMON, **OPTIONS, **scratch)
+    try:
+        assert asyncio.run(pool.map(params_list, sums=True)) == expected
+
+        # Every run crosses a cutoff of 0, and its Censored is returned
+        outs = asyncio.run(pool.map(params_list, cutoff=('rmse', 0.0)))
+        assert all(isinstance(res, Censored) for res in outs)
+    finally:
+        pool.end()
+
+
+def test_one_run_at_a_time_between_loops(home, scratch):
+    # As genetic.py -steady does, after the initial population
+    params_list = [other_params(i) for i in range(4)]
+
+    pool = AsyncDaemonPool(2, *DAEMON, **OPTIONS, **scratch)
+    try:
+        expected = asyncio.run(pool.map(params_list))
+
+        daemons = pool.pool
+        for i, params in enumerate(params_list):
+            if not daemons.free:
+                tag, res, _ = daemons.next_result()
+                assert res == expected[tag]
+            daemons.submit(params, i)
+        while daemons.running:
+            tag, res, _ = daemons.next_result()
+            assert res == expected[tag]
+
+        assert asyncio.run(pool.map(params_list)) == expected
+    finally:
+        pool.end()
+
+
+def test_dead_daemon_wakes_queued_runs(home, scratch):
+    pool = AsyncDaemonPool(1, *DAEMON, **OPTIONS, **scratch)
+    try:
+        pool.pool.processes[0].kill()
+        pool.pool.processes[0].join()
+
+        # The first run finds the process dead, the second one waits for a Daemon that will never be free
+        with pytest.raises(RuntimeError):
+            asyncio.run(asyncio.wait_for(pool.map([PARAMS, PARAMS]), 30))
+
+        # And the next runs fail at once
+        with pytest.raises(RuntimeError, match='Every Daemon'):
+            asyncio.run(asyncio.wait_for(pool.run(PARAMS), 30))
+    finally:
+        pool.end()
+
+
+def test_dead_daemon_leaves_the_others(home, scratch):
+    pool = AsyncDaemonPool(2, *DAEMON, **OPTIONS, **scratch)
+    try:
+        pool.pool.processes[0].kill()
+        pool.pool.processes[0].join()
+
+        async def runs():
+            return await asyncio.gather(*(pool.run(other_params(i)) for i in range(4)), return_exceptions=True)
+
+        outs = asyncio.run(asyncio.wait_for(runs(), 60))
+        failed = [res for res in outs if isinstance(res, RuntimeError)]
+        assert len(failed) == 1
+        assert all(isinstance(res, tuple) for res in outs if res not in failed)
+        assert len(pool.dead) == 1
+    finally:
+        pool.end()
+
+
+def test_run_synopses_async_in_two_loops(home, scratch):
+    params_list = [other_params(i) for i in range(3)]
+
+    daemon = Daemon(*DAEMON, **OPTIONS, **scratch)
+    try:
+        expected = [daemon.run_synopses(params) for params in params_list]
+
+        async def runs():
+            # The runs wait for each other on the lock of the Daemon
+            return await asyncio.gather(*(daemon.run_synopses_async(params) for params in params_list))
+
+        assert asyncio.run(runs()) == expected
+        assert asyncio.run(runs()) == expected
+    finally:
+        daemon.end()
@@ -0,0 +1,123 @@
+"""Claims of `EvalStore`, with two connections to the same database as two processes, and the sums of `PartStore`."""
+
+import pytest
+
+from conftest import dead_owner, live_owner
+from eval_store import EvalStore, PartStore, fold_evaluate
+from local_lib import Censored
+
+
+IND = [4, 1800, 5, 3600, 0.5, 50.0, 0.25, 5.0]
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """Two stores of the same training set, as if opened by two processes."""
+
+    path = str(tmp_path / 'evals.sqlite')
+    a = EvalStore('brest', '36', [1], 'month', 'v1', path)
+    b = EvalStore('brest', '36', [1], 'month', 'v1', path)
+    b.owner = live_owner()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_claim_is_exclusive(stores):
+    a, b = stores
+
+    assert a.claim(IND)
+    assert not b.claim(IND)
+    assert a.claim(IND)  # Its own claim
+
+    a.put(IND, 10.0, 0.5)
+    assert not b.claim(IND)
+    assert b.get(IND) == (10.0, 0.5)
+    assert b.wait(IND) == (10.0, 0.5)
+
+
+def test_release(stores):
+    a, b = stores
+
+    assert a.claim(IND)
+    a.release(IND)
+    assert a.get(IND) is None
+    assert b.claim(IND)
+
+
+def test_takeover_of_dead_owner(stores):
+    a, b = stores
+
+    a.owner = dead_owner()
+    assert a.claim(IND)
+    assert b.claim(IND)
+    assert b.wait(IND) is None  # The claim is its own now
+
+
+def test_other_training_set_is_apart(stores, tmp_path):
+    a, _ = stores
+    other = EvalStore('brest', '36', [2], 'month', 'v1', str(tmp_path / 'evals.sqlite'))
+
+    a.put(IND, 10.0, 0.5)
+    assert other.get(IND) is None
+    assert other.claim(IND)
+    other.close()
+
+
+def test_evaluate_runs_once(stores):
+    a, b = stores
+    runs = []
+
+    def run():
+        runs.append(1)
+        return 10.0, 0.5
+
+    assert a.evaluate(IND, run) == (10.0, 0.5)
+    assert b.evaluate(IND, run) == (10.0, 0.5)
+    assert len(runs) == 1
+
+
+def test_censored_can_be_claimed(stores):
+    a, b = stores
+
+    def censored():
+        raise Censored((3.0, 0.1))
+
+    with pytest.raises(Censored):
+        a.evaluate(IND, censored)
+
+    assert a.get(IND) is None
+    assert a.bounds(IND) == (3.0, 0.1)
+    assert b.claim(IND)
+    assert not a.claim(IND)
+
+    b.put(IND, 10.0, 0.5)
+    assert a.get(IND) == (10.0, 0.5)
+    assert a.bounds(IND) is None
+
+
+def test_failed_run_releases(stores):
+    a, b = stores
+
+    def failed():
+        raise RuntimeError('failed')
+
+    with pytest.raises(RuntimeError):
+        a.evaluate(IND, failed)
+    assert b.claim(IND)
+
+
+def test_fold_evaluate_runs_missing_parts(tmp_path):
+    path = str(tmp_path / 'evals.sqlite')
+    stores = {part: PartStore('brest', '36', part, 'month', 'v1', path) for part in ('1', '2', '3')}
+    stores['2'].put(IND, 5.0, 10, 2)
+    runs = []
+
+    def run(part):
+        runs.append(part)
+        return 1.0, 100, 10
+
+    assert fold_evaluate(stores, IND, run) == (7.0, 210, 22)
+    assert runs == ['1', '3']
+    assert fold_evaluate(stores, IND, run) == (7.0, 210, 22)
+    assert runs == ['1', '3']
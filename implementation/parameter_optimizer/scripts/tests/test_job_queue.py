@@ -0,0 +1,60 @@
+"""Jobs of `JobQueue`, with two connections to the same database as two workers."""
+
+import pytest
+
+from conftest import dead_owner, live_owner
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queues(tmp_path):
+    """Two queues of the same database, as if opened by two workers."""
+
+    path = str(tmp_path / 'jobs.sqlite')
+    a = JobQueue(path)
+    b = JobQueue(path)
+    b.owner = live_owner()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_jobs_are_claimed_once(queues):
+    a, b = queues
+    ids = a.enqueue(['echo 1', 'echo 2', 'echo 3'])
+
+    claimed = [a.claim(), b.claim(), a.claim()]
+    assert [job[0] for job in claimed] == ids
+    assert a.claim() is None
+    assert b.claim() is None
+    assert a.counts()['running'] == 3
+
+    a.finish(ids[0], 0, 1.0)
+    b.finish(ids[1], 2, 1.0)
+    b.finish(ids[2], 0, 1.0)  # Not its job
+    assert [job[2] for job in a.jobs()] == ['done', 'failed', 'running']
+
+    assert a.retry() == 1
+    assert b.claim()[0] == ids[1]
+
+
+def test_job_of_dead_worker_is_requeued(queues):
+    a, b = queues
+    a.owner = dead_owner()
+    job_id, = a.enqueue(['echo 1'])
+
+    assert a.claim()[0] == job_id
+    job = b.claim()
+    assert job == (job_id, 'echo 1')
+    assert b.jobs()[0][4] == 2  # tries
+
+
+def test_enqueue_file(queues, tmp_path):
+    a, b = queues
+    path = tmp_path / 'runs.info'
+    path.write_text('echo 1\n\necho 2\n')
+
+    assert len(a.enqueue_file(str(path))) == 2
+    assert path.read_text() == ''
+    assert b.enqueue_file(str(path)) == []
+    assert [job[1] for job in b.jobs()] == ['echo 1', 'echo 2']
@@ -0,0 +1,67 @@
+"""`output_parser.parse_point()` and `parse_id()` against `json.loads()`."""
+
+import json
+import math
+import os
+
+import pytest
+
+from conftest import SCRIPTS
+from output_parser import parse_id, parse_point
+
+
+# Output of the jar in the tests of the Synopses-Generator
+JAR_OUTPUT = os.path.join(SCRIPTS, '..', '..', 'synopses_generator', 'test', 'output', 'ais_100vessels_notifications.json')
+
+REST = ', "annotation": {"stop_start": false, "noise": true}, "distance": 0.0, "speed": 1.5, "heading": 90.0}'
+
+LINES = [
+    # As the jar writes them (Double.toString)
+    '{"timestamp": 1443650402000, "id": "227574020", "longitude": -4.4657183, "latitude": 48.38249' + REST,
+    '{"timestamp": 1443650402, "id": "227574020", "longitude": -4.0E-4, "latitude": 4.8E1' + REST,
+    '{"timestamp": -1, "id": "", "longitude": 0.0, "latitude": -0.0' + REST,
+    '{"timestamp": 5, "id": "a", "longitude": 1, "latitude": 2}',
+    # Escaped ids, that the regular expression leaves to json.loads()
+    '{"timestamp": 5, "id": "a\\"b", "longitude": 1.5, "latitude": 2.5' + REST,
+    '{"timestamp": 5, "id": "caf\\u00e9", "longitude": 1.5, "latitude": 2.5' + REST,
+    '{"timestamp": 5, "id": "back\\\\slash", "longitude": 1.5, "latitude": 2.5' + REST,
+    # Other spacing and order of the fields
+    '{"timestamp":5,"id":"a","longitude":1.5,"latitude":2.5}',
+    '{"id": "a", "timestamp": 5, "longitude": 1.5, "latitude": 2.5}',
+    '{"timestamp": 5, "id": "a", "latitude": 2.5, "longitude": 1.5}',
+    # Numbers that are not finite
+    '{"timestamp": 5, "id": "a", "longitude": Infinity, "latitude": -Infinity' + REST,
+]
+
+
+def expected(line: str):
+    t = json.loads(line)
+    return t['id'], t['longitude'], t['latitude'], t['timestamp']
+
+
+def jar_lines():
+    with open(JAR_OUTPUT) as f:
+        return [line for line in f if len(line) > 1]
+
+
+@pytest.mark.parametrize('line', LINES)
+def test_parse_point(line):
+    got = parse_point(line)
+    assert got == expected(line)
+    assert isinstance(got[3], int)
+    assert parse_id(line) == json.loads(line)['id']
+
+
+def test_nan():
+    idd, lon, lat, t = parse_point('{"timestamp": 5, "id": "a", "longitude": NaN, "latitude": 1.0' + REST)
+    assert (idd, t, lat) == ('a', 5, 1.0)
+    assert math.isnan(lon)
+
+
+def test_jar_output():
+    lines = jar_lines()
+    assert len(lines) > 100
+
+    for line in lines:
+        assert parse_point(line) == expected(line)
+        assert parse_id(line) == json.loads(line)['id']
@@ -0,0 +1,60 @@
+"""The random individuals and the mutation that the genetic algorithms share through `local_lib`."""
+
+import random
+
+import numpy as np
+
+from local_lib import DEF_PARAMS, PARAMETERS, mutate_ind, random_params, round_param
+from optimizers import to_values
+
+LOWS = [v[0] for v in PARAMETERS.values()]
+HIGHS = [v[1] for v in PARAMETERS.values()]
+
+
+def check(values):
+    """Asserts that the values are rounded as `round_param()` makes them."""
+
+    assert len(values) == len(PARAMETERS)
+    for x, (low, high) in zip(values, PARAMETERS.values()):
+        assert low <= x <= high
+        assert type(x) is type(low)
+        if isinstance(low, int):
+            assert x <= 200 or x % 50 == 0
+        else:
+            assert x == round(x, 2)
+
+
+def test_round_param():
+    assert round_param(1224.9, 200, 5000) == 1200
+    assert round_param(190.7, 200, 5000) == 200
+    assert round_param(99.0, 3, 50) == 50
+    assert round_param(np.float64(0.456), 0.01, 0.8) == 0.46
+    assert round_param(-1.0, 2.0, 25.0) == 2.0
+
+
+def test_random_params():
+    random.seed(0)
+    for _ in range(200):
+        check(random_params())
+
+
+def test_mutate_ind():
+    random.seed(0)
+    np.random.seed(0)
+    for _ in range(200):
+        ind = list(DEF_PARAMS)
+        out, = mutate_ind(ind, LOWS, HIGHS, indpb=1.0)
+        assert out is ind
+        check(ind)
+
+    ind = list(DEF_PARAMS)
+    mutate_ind(ind, LOWS, HIGHS, indpb=0.0)
+    assert ind == list(DEF_PARAMS)
+
+
+def test_to_values():
+    np.random.seed(0)
+    for _ in range(200):
+        check(to_values(np.random.random(len(PARAMETERS)) * 1.2 - 0.1))
+    assert to_values(np.zeros(len(PARAMETERS))) == LOWS
+    assert to_values(np.ones(len(PARAMETERS))) == HIGHS
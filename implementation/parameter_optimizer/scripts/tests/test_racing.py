@@ -0,0 +1,123 @@
+"""The t-test of `racing.py` against closed forms of the Student t distribution, and the runs of a race through the stores."""
+
+import threading
+import time
+from math import atan, pi, sqrt
+
+import pytest
+
+from conftest import dead_owner, live_owner
+from eval_store import PartStore
+from racing import betainc, paired_pvalue, stored_run, t_sf
+
+
+def sf_closed(t: float, dof: int) -> float:
+    """P(T > t) for 1, 2 and 3 degrees of freedom."""
+
+    if dof == 1:
+        return 0.5 - atan(t) / pi
+    if dof == 2:
+        return 0.5 - t / (2 * sqrt(2 + t * t))
+    if dof == 3:
+        return 0.5 - (atan(t / sqrt(3)) + sqrt(3) * t / (3 + t * t)) / pi
+    raise ValueError(dof)
+
+
+@pytest.mark.parametrize('dof', (1, 2, 3))
+@pytest.mark.parametrize('t', (-4.0, -1.5, -0.3, 0.0, 0.2, 1.0, 2.5, 7.0, 40.0))
+def test_t_sf(t, dof):
+    assert t_sf(t, dof) == pytest.approx(sf_closed(t, dof), rel=1e-9, abs=1e-12)
+
+
+def test_t_sf_large_dof_is_normal():
+    # P(Z > 1.96) of the standard normal
+    assert t_sf(1.96, 100000) == pytest.approx(0.0249979, abs=1e-5)
+
+
+@pytest.mark.parametrize('a, b, x', ((2, 3, 0.4), (0.5, 0.5, 0.1), (5, 1, 0.7)))
+def test_betainc(a, b, x):
+    closed = {
+        (2, 3, 0.4): 6*x**2 - 8*x**3 + 3*x**4,  # I_x(2, 3)
+        (0.5, 0.5, 0.1): 2 / pi * atan(sqrt(x / (1 - x))),  # arcsine distribution
+        (5, 1, 0.7): x**5
+    }
+    assert betainc(a, b, x) == pytest.approx(closed[(a, b, x)], rel=1e-9)
+
+
+def test_paired_pvalue():
+    # Differences 1, 2, 3: mean 2, variance 1, so t = 2 * sqrt(3) with 2 degrees of freedom
+    t = 2 * sqrt(3)
+    assert paired_pvalue([11, 12, 13], [10, 10, 10]) == pytest.approx(sf_closed(t, 2), rel=1e-9)
+
+    # Better than the leader: the p-value of being worse is large
+    assert paired_pvalue([9, 8, 7], [10, 10, 10]) == pytest.approx(sf_closed(-t, 2), rel=1e-9)
+
+
+def test_paired_pvalue_degenerate():
+    assert paired_pvalue([5], [1]) == 1.0
+    assert paired_pvalue([2, 3], [1, 2]) == 0.0
+    assert paired_pvalue([1, 2], [2, 3]) == 1.0
+
+
+def part_store(tmp_path, owner: str = None) -> PartStore:
+    """The store of part 1, as opened by the process owner (or this one)."""
+
+    store = PartStore('brest', '36', '1', 'month', 'v1', str(tmp_path / 'evals.sqlite'))
+    if owner is not None:
+        store.owner = owner
+    return store
+
+
+def test_stored_run_claims(tmp_path):
+    store = part_store(tmp_path)
+    other = part_store(tmp_path, live_owner())
+    stored, mine, theirs, dead, dropped = (1,), (2,), (3,), (4,), (5,)
+
+    store.put(stored, 5.0, 10, 1)
+
+    # Another process runs theirs and dropped, and a bit later puts the first and drops the second
+    assert other.claim(theirs)
+    assert other.claim(dropped)
+
+    def put_later():
+        time.sleep(1)
+        later = part_store(tmp_path, other.owner)
+        later.put(theirs, 7.0, 10, 1)
+        later.release(dropped)
+        later.close()
+
+    thread = threading.Thread(target=put_later)
+    thread.start()
+
+    # A process that died claimed dead, so it is taken over and run here with mine
+    assert part_store(tmp_path, dead_owner()).claim(dead)
+
+    runs = []
+
+    def run(part, keys):
+        runs.append(list(keys))
+        return [(float(key[0]), 10, 1) for key in keys]
+
+    sums = stored_run({'1': store}, run)('1', [stored, mine, theirs, dead, dropped])
+    thread.join()
+
+    assert sums == [(5.0, 10, 1), (2.0, 10, 1), (7.0, 10, 1), (4.0, 10, 1), (5.0, 10, 1)]
+    assert runs == [[mine, dead], [dropped]]
+    assert other.get(mine) == (2.0, 10, 1)
+    assert other.get(dead) == (4.0, 10, 1)
+
+
+def test_stored_run_releases_failed(tmp_path):
+    store = part_store(tmp_path)
+    other = part_store(tmp_path, live_owner())
+
+    sums = stored_run({'1': store}, lambda part, keys: [None for _ in keys])('1', [(1,)])
+    assert sums == [None]
+    assert other.claim((1,))
+
+    def failed(part, keys):
+        raise RuntimeError('failed')
+
+    with pytest.raises(RuntimeError):
+        stored_run({'1': store}, failed)('1', [(2,)])
+    assert other.claim((2,))
@@ -0,0 +1,96 @@
+"""`estimate_RMSE_np()` against the reference `estimate_RMSE()`."""
+
+import random
+from copy import deepcopy
+
+import pytest
+
+from local_lib import DEF_PARAMS, PARAMETERS, RMSE_ENGINES, Daemon, estimate_RMSE, estimate_RMSE_np, reference_error_sums, rmse_ratio, squared_error_sums
+
+
+def random_tracks(seed: int, ships: int = 20, points: int = 200, shuffle: bool = False):
+    """Random (in_data, out_data, noise) with repeated timestamps, repeated points and noise counters.
+    With shuffle, the raw points of every other ship are not in order.
+    """
+
+    rnd = random.Random(seed)
+    in_data, out_data, noise = {}, {}, {}
+
+    for s in range(ships):
+        idd = f'ship{s}'
+        lon, lat, t = rnd.uniform(-5, -4), rnd.uniform(48, 49), rnd.randrange(1000)
+
+        raw = []
+        for _ in range(points):
+            # Some timestamps are repeated, with or without the same position
+            t += rnd.choice((0, 0, 1, 5, 30, 60))
+            lon += rnd.gauss(0, 1e-3)
+            lat += rnd.gauss(0, 1e-3)
+            raw.append((round(lon, 6), round(lat, 6), t))
+            if rnd.random() < 0.05:
+                raw.append(raw[-1])
+
+        # Noise, some of it reported more than once
+        noisy = rnd.sample(raw, len(raw) // 10)
+        noise[idd] = {}
+        for p in noisy:
+            noise[idd][p] = noise[idd].get(p, 0) + rnd.choice((1, 1, 2))
+
+        # The compressed points are a subset of the points that are not noise, in any order
+        approx = [p for p in raw if p not in noise[idd] and rnd.random() < 0.2]
+        rnd.shuffle(approx)
+
+        if shuffle and s % 2 == 1:
+            rnd.shuffle(raw)
+
+        in_data[idd] = raw
+        if s != 0:  # A ship without output
+            out_data[idd] = approx
+
+    return in_data, out_data, noise
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('proj', (False, True))
+@pytest.mark.parametrize('shuffle', (False, True))
+def test_same_as_reference(seed, proj, shuffle):
+    in_data, out_data, noise = random_tracks(seed, shuffle=shuffle)
+
+    expected = estimate_RMSE(in_data, out_data, deepcopy(noise), proj)
+    kept = deepcopy(noise)
+    got = estimate_RMSE_np(in_data, out_data, noise, proj)
+
+    assert got == pytest.approx(expected, rel=1e-9)
+    assert noise == kept
+
+
+def test_repeated_approx_timestamps():
+    in_data = {'a': [(0.0, 0.0, 0), (0.5, 0.5, 5), (1.0, 1.0, 10), (1.2, 1.0, 10), (2.0, 2.0, 20)]}
+    out_data = {'a': [(2.0, 2.0, 20), (0.0, 0.0, 0), (1.0, 1.0, 10), (1.2, 1.0, 10)]}
+
+    assert estimate_RMSE_np(in_data, out_data, {}) == pytest.approx(estimate_RMSE(in_data, out_data, {}), rel=1e-12)
+
+
+def test_reference_sums():
+    in_data, out_data, noise = random_tracks(0, shuffle=True)
+    expected = squared_error_sums(in_data, out_data, noise)
+    got = reference_error_sums(in_data, out_data, deepcopy(noise))
+
+    assert got[0] == pytest.approx(expected[0], rel=1e-9)
+    assert got[1:] == expected[1:]
+    assert rmse_ratio(*got) == estimate_RMSE(in_data, out_data, deepcopy(noise))
+
+
+def test_daemon_sums_of_both_engines(home, workdir):
+    params = dict(zip(PARAMETERS, DEF_PARAMS))
+    sums = {}
+    for engine in RMSE_ENGINES:
+        daemon = Daemon('1', [1], 'test', 'month', generator='python', rmse_engine=engine, scratch=str(workdir / 'scratch'))
+        try:
+            sums[engine] = daemon.run_synopses_sums(params)
+            assert rmse_ratio(*sums[engine]) == pytest.approx(daemon.run_synopses(params), rel=1e-9)
+        finally:
+            daemon.end()
+
+    assert sums['python'][0] == pytest.approx(sums['numpy'][0], rel=1e-9)
+    assert sums['python'][1:] == sums['numpy'][1:]
@@ -0,0 +1,190 @@
+"""Files exchanged between a Daemon and the Synopses-Generator.
+
+Each Daemon keeps its input, output and parameter files in a scratch folder `{root}/synopses_{key}/{id}/`, where `root`
+defaults to `/dev/shm` (memory, so the files never reach the disk), `key` identifies the `tmp/slots` folder of the ids
+(so that different checkouts do not share folders) and `id` is the id of the Daemon.
+
+The folder is removed by `Daemon.end()`, or at the exit of the interpreter. If the process is killed, the folder is
+removed by the next Daemon that starts, because the lock of the id (see `local_lib.take_slot()`) is no longer held.
+
+The output files can also be named pipes (see `FifoReader`), so that Python reads the output while the generator writes it.
+If the reader raises `Abort`, it closes the pipe, and the generator fails on its next write instead of finishing the run.
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+import threading
+from os.path import join
+from typing import Callable, Iterable
+
+
+# Default root of the scratch folders
+SCRATCH_ROOT = '/dev/shm'
+
+
+def scratch_root(fallback: str) -> str:
+    """The default root of the scratch folders: `SCRATCH_ROOT` if it can be written, otherwise fallback.
+
+    Arguments:
+        fallback {str} -- A folder on disk, e.g. `tmp/` of the scripts
+
+    Returns:
+        str -- The root
+    """
+
+    if os.path.isdir(SCRATCH_ROOT) and os.access(SCRATCH_ROOT, os.W_OK):
+        return SCRATCH_ROOT
+    return fallback
+
+
+def scratch_parent(root: str, slots_folder: str) -> str:
+    """The folder of the scratch folders of the ids of a slots folder.
+
+    Arguments:
+        root {str} -- Root of the scratch folders
+        slots_folder {str} -- The folder of the locks of the ids
+
+    Returns:
+        str -- The folder
+    """
+
+    return join(root, 'synopses_' + hashlib.sha1(os.path.abspath(slots_folder).encode()).hexdigest()[:8])
+
+
+def scratch_folder(root: str, slots_folder: str, idd: str) -> str:
+    """Creates the scratch folder of a Daemon, removing any files left in it by a killed Daemon with the same id.
+
+    Arguments:
+        root {str} -- Root of the scratch folders
+        slots_folder {str} -- The folder of the locks of the ids
+        idd {str} -- The id of the Daemon, which must be taken by this process
+
+    Returns:
+        str -- The folder
+    """
+
+    parent = scratch_parent(root, slots_folder)
+    os.makedirs(parent, exist_ok=True)
+
+    sweep(parent, slots_folder, idd)
+
+    folder = join(parent, idd)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.makedirs(folder)
+    return folder
+
+
+def sweep(parent: str, slots_folder: str, own: str):
+    """Removes the scratch folders of the ids that are not taken, i.e. those left by killed Daemons.
+    The lock of each id is held while its folder is removed, so no Daemon can take it meanwhile.
+
+    Arguments:
+        parent {str} -- The folder of the scratch folders
+        slots_folder {str} -- The folder of the locks of the ids
+        own {str} -- The id of the caller, which is skipped (or None)
+    """
+
+    if not os.path.isdir(parent):
+        return
+
+    for idd in os.listdir(parent):
+        if idd == own or not idd.isdigit():
+            continue
+
+        try:
+            fd = os.open(join(slots_folder, f'{idd}.lock'), os.O_RDWR)
+        except FileNotFoundError:
+            shutil.rmtree(join(parent, idd), ignore_errors=True)
+            continue
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            continue
+
+        shutil.rmtree(join(parent, idd), ignore_errors=True)
+        os.close(fd)
+
+
+def remove_folder(folder: str):
+    """Removes a scratch folder. Used as the finalizer of a Daemon, so it never raises."""
+
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+def make_fifo(path: str):
+    """Makes a named pipe, replacing any file in its place."""
+
+    if os.path.lexists(path):
+        os.remove(path)
+    os.mkfifo(path)
+
+
+class Abort(Exception):
+    """Raised by the consumer of a `FifoReader` to stop the writer: the pipe is closed instead of read to the end."""
+
+
+class FifoReader:
+    """Reads the lines of a named pipe in a thread, while another process writes them.
+
+    The reader holds a write end of the pipe itself, so the pipe does not end when the writer closes it (or when
+    the writer never opens it). `close()` releases that end, after the writer is done, and waits for the remaining lines.
+    """
+
+    def __init__(self, path: str, consume: Callable[[Iterable[str]], None]):
+        """Constructor. Opens the pipe and starts the thread.
+
+        Arguments:
+            path {str} -- The named pipe
+            consume {Callable[[Iterable[str]], None]} -- Called in the thread with the lines of the pipe
+        """
+
+        self.path = path
+
+        # Opening the read end does not wait for a writer when non-blocking; then the reads block as usual
+        fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+        os.set_blocking(fd, True)
+        self.keep_open = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+
+        self.error = None
+        self.thread = threading.Thread(target=self.read, args=(fd, consume), daemon=True)
+        self.thread.start()
+
+    def read(self, fd: int, consume: Callable[[Iterable[str]], None]):
+        """Body of the thread. On an error of consume, the rest of the pipe is discarded, so that the writer is not blocked.
+        On `Abort` the pipe is closed at once, so the writes of the writer fail (broken pipe).
+        """
+
+        with open(fd, 'r') as f:
+            try:
+                consume(f)
+            except Abort as e:
+                self.error = e
+            except BaseException as e: # pylint: disable=broad-except
+                self.error = e
+                for _ in f:
+                    pass
+
+    @property
+    def aborted(self) -> bool:
+        """Whether consume raised `Abort`, so the writer was stopped."""
+        return isinstance(self.error, Abort)
+
+    def close(self):
+        """Waits for the lines that are left in the pipe, once the writer is done.
+
+        Raises:
+            BaseException: The error of consume, if any
+        """
+
+        if self.keep_open is not None:
+            os.close(self.keep_open)
+            self.keep_open = None
+
+        self.thread.join()
+
+        if self.error is not None:
+            raise self.error
@@ -1,13 +1,16 @@
 #!/usr/bin/python3
 
 
+import asyncio
 import os
 import pickle
 import sys
 from typing import List, Tuple
 
-from local_lib import Daemon
-from local_lib import crit, DEF_PARAMS, PARAMETERS
+from eval_store import PartStore
+from local_lib import AsyncDaemonPool, Daemon, GeneratorTimeout
+from local_lib import crit, generator_version, DEF_PARAMS, PARAMETERS
+from racing import run_race, stored_run
 
 
 def evaluate(individual: List) -> Tuple[float, float]:
@@ -40,6 +43,74 @@ def evaluate(individual: List) -> Tuple[float, float]:
     return rmse, ratio
 
 
+def evaluate_all(individuals: List):
+    """Evaluates the individuals that are not in eval_res yet, and stores them there: on the pool of Daemons of the
+    evaluation part with W > 1, all of them at once, else one after the other with `evaluate()`.
+    The ones whose run timed out are left out.
+
+    Arguments:
+        individuals {List} -- The individuals, duplicates are evaluated once
+    """
+
+    global eval_res
+
+    todo = [ind for ind in dict.fromkeys(individuals) if ind not in eval_res]
+
+    if pool is None:
+        outs = []
+        for ind in todo:
+            try:
+                outs.append(evaluate(ind))
+            except GeneratorTimeout as e:
+                outs.append(e)
+    else:
+        outs = asyncio.run(pool.map([dict(zip(PARAMETERS, ind)) for ind in todo]))
+
+    for ind, res in zip(todo, outs):
+        if isinstance(res, GeneratorTimeout):
+            print(f'{res}, parameters {ind}', file=sys.stderr)
+            continue
+        eval_res[ind] = res
+
+
+def run_part(part: str, keys: List) -> List:
+    """Runs some individuals on a training part, for the race: on the pool of Daemons of the part with W > 1, so all of them
+    at once, else on a single Daemon. The Daemon (or pool) of each part starts when it is first needed.
+
+    Arguments:
+        part {str} -- The part
+        keys {List} -- The individuals
+
+    Returns:
+        List -- The sums of the errors of each one, see `Daemon.run_synopses_sums()`, or None if its run timed out
+    """
+
+    global part_daemons
+    global part_pools
+
+    params_list = [dict(zip(PARAMETERS, key)) for key in keys]
+
+    if workers == 1:
+        if part not in part_daemons:
+            part_daemons[part] = Daemon(typ, [part], dataset, fcode)
+
+        outs = []
+        for params in params_list:
+            try:
+                outs.append(part_daemons[part].run_synopses_sums(params))
+            except GeneratorTimeout as e:
+                outs.append(e)
+    else:
+        if part not in part_pools:
+            part_pools[part] = AsyncDaemonPool(workers, typ, [part], dataset, fcode)
+        outs = asyncio.run(part_pools[part].map(params_list, sums=True))
+
+    for key, res in zip(keys, outs):
+        if isinstance(res, GeneratorTimeout):
+            print(f'{res}, parameters {key}', file=sys.stderr)
+    return [None if isinstance(res, GeneratorTimeout) else res for res in outs]
+
+
 if len(sys.argv) < 5:
     raise RuntimeError('Not enough args')
 
@@ -49,6 +120,12 @@ opt = sys.argv[3]
 dataset = sys.argv[4]
 fcode = sys.argv[5]
 
+# With a 6th argument K, the best K individuals of the training race over its parts, and all the ones left are evaluated
+race_len = int(sys.argv[6]) if len(sys.argv) > 6 else 0
+
+# With a 7th argument W, the individuals run on W Daemons for each part (of the race, and the evaluation part)
+workers = int(sys.argv[7]) if len(sys.argv) > 7 else 1
+
 folder = 'saves/{}/type{}'.format(dataset, typ)
 
 p = '{}/{}{}.pkl'.format(folder, fcode, month)
@@ -71,12 +148,17 @@ else:
 
 vals = list(results.values())
 
-try:
-    daemon = Daemon(typ, [month], dataset, fcode)
+daemon = None
+pool = None
+part_daemons = {}
+part_pools = {}
+part_stores = {}
 
-    if DEF_PARAMS not in eval_res:
-        rmse, ratio = evaluate(DEF_PARAMS)
-        eval_res[DEF_PARAMS] = (rmse, ratio)
+try:
+    if workers == 1:
+        daemon = Daemon(typ, [month], dataset, fcode)
+    else:
+        pool = AsyncDaemonPool(workers, typ, [month], dataset, fcode)
 
     for j in range(1):
 
@@ -84,6 +166,17 @@ try:
             hof_len = 1
             hof = sorted(results.items(), key=lambda kv: crit(
                 kv[1][0], kv[1][1], opt))[:hof_len]
+
+            if race_len > 1:
+                # The training parts of genetic.py, and their evaluations in the default store
+                s = int(month) - (int(month)-1) % 6
+                parts = [str(i) for i in range(s, s+6) if i != int(month)]
+                part_stores = {part: PartStore(dataset, typ, part, fcode, generator_version()) for part in parts}
+
+                keys = [kv[0] for kv in sorted(results.items(), key=lambda kv: crit(kv[1][0], kv[1][1], opt))[:race_len]]
+                race = run_race(keys, parts, stored_run(part_stores, run_part), opt)
+                hof = [(key, results[key]) for key in race.alive]
+                print(f'Race: {" -> ".join(map(str, race.counts))} individuals on the parts {parts}, {len(hof)} left')
         elif j == 1:
             hof_len = 1
             hof = sorted(results.items(), key=lambda kv: crit(
@@ -93,13 +186,19 @@ try:
             hof = sorted(results.items(), key=lambda kv: crit(
                 kv[1][0], kv[1][1], 'ratio'))[:hof_len]
 
-        for i, v in enumerate(hof):
-            params = v[0]
-            if params not in eval_res:
-                rmse, ratio = evaluate(params)
-                eval_res[params] = (rmse, ratio)
+        # The default parameters, and the best ones
+        evaluate_all([DEF_PARAMS] + [v[0] for v in hof])
 finally:
-    daemon.end()
+    if daemon is not None:
+        daemon.end()
+    if pool is not None:
+        pool.end()
+    for d in part_daemons.values():
+        d.end()
+    for part_pool in part_pools.values():
+        part_pool.end()
+    for st in part_stores.values():
+        st.close()
     p = '{}/eval_{}{}.pkl'.format(folder, fcode, month)
     with open(p, 'wb') as f:
         pickle.dump(eval_res, f)
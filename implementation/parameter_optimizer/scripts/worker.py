@@ -1,43 +1,110 @@
 #!/usr/bin/python3
 
-import os
+import argparse
+import subprocess
 import sys
-from time import sleep
+from datetime import datetime
+from time import time
+
+from termcolor import colored as col
+
+from job_queue import DEFAULT_PATH, STATES, JobQueue
 
 
 if sys.version_info[0] != 3 or sys.version_info[1] < 7:
     raise EnvironmentError('Must run Python >= 3.7')
 
-while True:
 
-    # Read all the commands to be run
-    with open('runs.info') as f:
-        lines = f.read().split('\n')
+def run(queue: JobQueue):
+    """Runs the queued jobs one after the other, until none is queued.
+    The commands of `runs.info` are moved to the queue before each job, so it can still be used as before,
+    including commands appended to it while the worker runs.
+
+    Args:
+        queue (JobQueue): The queue
+    """
+
+    while True:
+        queue.enqueue_file('runs.info')
+        job = queue.claim()
+
+        # If no commands are left break
+        if job is None:
+            break
+
+        job_id, cmd = job
+
+        # Print command that will be run
+        print(col(f'[{job_id}] {cmd}', 'blue'))
+
+        start = time()
+        try:
+            # Run command
+            exit_code = subprocess.run(cmd, shell=True, check=False).returncode
+        except KeyboardInterrupt:
+            queue.finish(job_id, -2, time() - start)
+            raise
+
+        queue.finish(job_id, exit_code, time() - start)
+        if exit_code != 0:
+            print(col(f'[{job_id}] failed with exit code {exit_code}', 'red'), file=sys.stderr)
+
+
+def show(queue: JobQueue, states: list):
+    """Prints the jobs, and the number of jobs in each state.
+
+    Args:
+        queue (JobQueue): The queue
+        states (list): Only the jobs in these states, or None for all
+    """
+
+    for job_id, cmd, state, owner, tries, exit_code, started, secs in queue.jobs(states):
+        when = '' if started is None else datetime.fromtimestamp(started).strftime('%Y-%m-%d %H:%M:%S')
+        took = '' if secs is None else f'{secs:.0f}s'
+        code = '' if exit_code is None else str(exit_code)
+        print(f'{job_id:5d} {state:8s} {code:>4s} {took:>8s} {tries:3d} {when:19s} {owner or "":20s} {cmd}')
+
+    print(col(', '.join(f'{n} {state}' for state, n in queue.counts().items()), 'yellow'))
+
+
+my_parser = argparse.ArgumentParser(description='Runs queued commands. Any number of workers can run at once, each job runs once.')
+
+my_parser.add_argument('-db',
+                       type=str,
+                       default=DEFAULT_PATH,
+                       help=col(f'SQLite database of the queue. Defaults to {DEFAULT_PATH}.\n', 'cyan'))
+
+commands = my_parser.add_subparsers(dest='command')
 
-    # Erase empty lines
-    while len(lines) > 0 and len(lines[0]) < 2:
-        lines.pop(0)
+commands.add_parser('run', help=col('Run the queued jobs until none is left (the default).\n', 'cyan'))
 
-    # If no commands areleft break
-    if len(lines) == 0:
-        break
+add_parser = commands.add_parser('add', help=col('Queue commands.\n', 'cyan'))
+add_parser.add_argument('cmds', nargs='*', help=col('Each is a shell command, e.g. "python3 genetic.py ...".\n', 'cyan'))
+add_parser.add_argument('-f', type=str, default=None, help=col('Also queue the commands of a file, one on each line (the file is emptied).\n', 'cyan'))
 
-    # Get the command to tun
-    cmd = lines.pop(0)
+status_parser = commands.add_parser('status', help=col('Print the jobs and their state, exit code, duration and tries.\n', 'cyan'))
+status_parser.add_argument('states', nargs='*', help=col(f'Only print the jobs in these states, of {", ".join(STATES)}.\n', 'cyan'))
 
-    # Write to file the rest of the commands thet were not used
-    with open('runs.info', 'w') as f:
-        for i in range(len(lines)):
-            f.write(lines[i])
-            if i < len(lines) - 1:
-                f.write('\n')
+retry_parser = commands.add_parser('retry', help=col('Queue failed jobs again.\n', 'cyan'))
+retry_parser.add_argument('ids', nargs='*', type=int, help=col('The jobs. Defaults to all the failed ones.\n', 'cyan'))
 
-    # Print command that will be run
-    print(cmd)
+args = my_parser.parse_args()
 
-    # Run command
-    os.system(cmd)
+if args.command == 'status' and any(state not in STATES for state in args.states):
+    my_parser.error(f'The states are {", ".join(STATES)}')
 
-    # Wait for a while. This is done so that if the previous command took too little to run,
-    # `runs.info` will not be simultaneously read by multiple instances of worker.py.
-    sleep(3)
+queue = JobQueue(args.db)
+try:
+    if args.command == 'add':
+        ids = queue.enqueue(args.cmds)
+        if args.f is not None:
+            ids += queue.enqueue_file(args.f)
+        print(f'Queued {len(ids)} jobs')
+    elif args.command == 'status':
+        show(queue, args.states or None)
+    elif args.command == 'retry':
+        print(f'Queued again {queue.retry(args.ids or None)} jobs')
+    else:
+        run(queue)
+finally:
+    queue.close()
@@ -0,0 +1,102 @@
+/******************************************************************************
+  * Project: datAcron (http://ai-group.ds.unipi.gr/datacron/)
+  * Task: 2.1 Trajectory detection & summarization
+  * Module: Synopses Generator
+  * File: eu.datacron.synopses.maritime/CompactOutput.scala
+  * Description: Compact binary output, used by the parameter optimizer instead of the JSON text of each point.
+  *              A point is identified by its row in the input (the optimizer already holds the raw positions),
+  *              so each record is fixed-width (34 bytes, big-endian):
+  *                row (long), timestamp (long), annotation flags (short, bit i = i-th field of the annotation), speed (double), heading (double)
+  *              While the compact output is used, the row of each message is kept in its ingestion timestamp, which the pipeline does not use.
+  ************************************************************************/
+
+package eu.datacron.synopses.maritime
+
+import java.io._
+
+import org.apache.flink.configuration.Configuration
+import org.apache.flink.streaming.api.functions.sink.RichSinkFunction
+import org.apache.flink.streaming.api.functions.source.SourceFunction
+import org.apache.flink.streaming.api.functions.source.SourceFunction.SourceContext
+
+
+object CompactOutput {
+
+  //Size of a record in bytes
+  val RECORD_SIZE = 34
+
+  //The flags of an annotation as a bitmask, in the order of the fields of its schema
+  def annotationBits(anno: critical_point_annotation): Int = {
+    var bits = 0
+    for (i <- 0 until anno.getSchema.getFields.size()) {
+      if (anno.get(i) == true)
+        bits |= (1 << i)
+    }
+    bits
+  }
+
+  def write(out: DataOutputStream, pos: critical_point): Unit = {
+    out.writeLong(pos.getIngestionTimestamp)          //The row of the message, see parseLocation()
+    out.writeLong(pos.getTimestamp)
+    out.writeShort(annotationBits(pos.getAnnotation))
+    out.writeDouble(pos.getSpeed)
+    out.writeDouble(pos.getHeading)
+  }
+
+  //Append a single record to a file (used for the GAP_START notifications, which are written as they are detected)
+  def append(path: String, pos: critical_point): Unit = this.synchronized {
+    val out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(path, true)))
+    try {
+      write(out, pos)
+    }
+    finally out.close()
+  }
+}
+
+
+//Writes each critical point as a compact record; the file (or named pipe) is opened when the job starts and closed when it ends
+class CompactSink(path: String) extends RichSinkFunction[critical_point] {
+
+  @transient private var out: DataOutputStream = _
+
+  override def open(parameters: Configuration): Unit = {
+    out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(path)))
+  }
+
+  override def invoke(value: critical_point): Unit = {
+    CompactOutput.write(out, value)
+  }
+
+  override def close(): Unit = {
+    if (out != null)
+      out.close()
+  }
+}
+
+
+//Reads a text file line by line and emits each message with its row, i.e. its position among the lines longer than 2 characters
+//Must run with parallelism 1, so that the rows follow the order of the file
+class RowSource(path: String) extends SourceFunction[(Long, String)] {
+
+  @volatile private var running = true
+
+  override def run(ctx: SourceContext[(Long, String)]): Unit = {
+    val reader = new BufferedReader(new FileReader(path))
+    try {
+      var row = 0L
+      var line = reader.readLine()
+      while (running && line != null) {
+        if (line.length > 2) {
+          ctx.collect((row, line))
+          row += 1
+        }
+        line = reader.readLine()
+      }
+    }
+    finally reader.close()
+  }
+
+  override def cancel(): Unit = {
+    running = false
+  }
+}
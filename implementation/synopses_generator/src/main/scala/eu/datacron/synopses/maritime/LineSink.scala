@@ -0,0 +1,53 @@
+/******************************************************************************
+  * Project: datAcron (http://ai-group.ds.unipi.gr/datacron/)
+  * Task: 2.1 Trajectory detection & summarization
+  * Module: Synopses Generator
+  * File: eu.datacron.synopses.maritime/LineSink.scala
+  * Description: Sink that writes each element as a line to a named pipe, which the parameter optimizer reads while the job runs.
+  *              writeAsText() can not be used there, as it replaces (or refuses) an existing path.
+  ************************************************************************/
+
+package eu.datacron.synopses.maritime
+
+import java.io._
+import java.nio.file.{Files, Paths}
+
+import org.apache.flink.configuration.Configuration
+import org.apache.flink.streaming.api.functions.sink.RichSinkFunction
+
+
+//Writes each element (its toString) followed by a new line; the pipe is opened when the job starts and closed when it ends
+class LineSink[T](path: String) extends RichSinkFunction[T] {
+
+  @transient private var writer: BufferedWriter = _
+
+  override def open(parameters: Configuration): Unit = {
+    writer = new BufferedWriter(new OutputStreamWriter(new FileOutputStream(path)))
+  }
+
+  override def invoke(value: T): Unit = {
+    writer.write(value.toString)
+    writer.write("\n")
+  }
+
+  override def close(): Unit = {
+    if (writer != null)
+      writer.close()
+  }
+}
+
+
+object LineSink {
+
+  //Whether an output path is a named pipe (i.e. it exists, but it is neither a regular file nor a directory)
+  def isPipe(path: String): Boolean = {
+    val p = Paths.get(path)
+    Files.exists(p) && !Files.isRegularFile(p) && !Files.isDirectory(p)
+  }
+
+  //Deletes an output file before a job, so that writeAsText() can create it; named pipes are kept
+  def deleteOutput(path: String): Unit = {
+    if (!isPipe(path))
+      new File(path).delete()
+  }
+}
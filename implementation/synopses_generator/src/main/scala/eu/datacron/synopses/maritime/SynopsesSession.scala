@@ -0,0 +1,97 @@
+/******************************************************************************
+  * Project: datAcron (http://ai-group.ds.unipi.gr/datacron/)
+  * Task: 2.1 Trajectory detection & summarization
+  * Module: Synopses Generator
+  * File: eu.datacron.synopses.maritime/SynopsesSession.scala
+  * Description: Long-lived process that keeps the input of the Synopses Generator in memory and runs the maritime pipeline
+  *              (see TrajectoryStreamManager) once per command read from its standard input, each time with the parameters
+  *              currently stored in the properties file. Used by the parameter optimizer to avoid starting Flink for every evaluation.
+  ************************************************************************/
+
+package eu.datacron.synopses.maritime
+
+import java.io._
+import scala.io.Source
+
+import org.apache.flink.streaming.api.scala._
+
+
+/**
+  * Usage: java -cp <jar>:<flink>/lib/* eu.datacron.synopses.maritime.SynopsesSession <id> <in_file>
+  *
+  * Protocol (one command per line on stdin, one reply per line on stdout, replies start with "SESSION"):
+  *   run <crit_file> <loc_file> <not_file> <print_noise> [<config_file> [<format>]]   => "SESSION done" or "SESSION error <message>"
+  *   quit                                                  => the process exits
+  *
+  * When the input is loaded the process replies "SESSION ready <number of lines>".
+  * <print_noise>, <config_file> and <format> have the same meaning as the 6th, 7th and 8th arguments of TrajectoryStreamManager:
+  * "true", "false" or "none", the properties file to read the parameters from (by default the one built in the jar),
+  * and "compact" for the binary records of CompactOutput (by default JSON text).
+  */
+object SynopsesSession {
+
+  def main(args: Array[String]) {
+
+    val id: String = args(0)
+    val in_file: String = args(1)
+
+    //Parse the input only once; every job replays it from memory
+    val source = Source.fromFile(in_file)
+    val lines: Seq[String] = try source.getLines().filter(_.length > 2).toVector finally source.close()
+
+    val commands = new BufferedReader(new InputStreamReader(System.in))
+    val replies = new PrintStream(new FileOutputStream(FileDescriptor.out), true)
+
+    replies.println("SESSION ready " + lines.length)
+
+    var command = commands.readLine()
+    while (command != null && command.trim != "quit") {
+      val tokens = command.trim.split(" ")
+
+      if (tokens(0) == "run" && tokens.length >= 5 && tokens.length <= 7) {
+        try {
+          val config_file = if (tokens.length >= 6) tokens(5) else TrajectoryStreamManager.configProperties
+          val compact = tokens.length == 7 && tokens(6) == "compact"
+          run(id, lines, tokens(1), tokens(2), tokens(3), tokens(4), config_file, compact)
+          replies.println("SESSION done")
+        }
+        catch {
+          case e: Exception => replies.println("SESSION error " + e.toString.replace('\n', ' '))
+        }
+      }
+      else {
+        replies.println("SESSION error unknown command " + command)
+      }
+
+      command = commands.readLine()
+    }
+  }
+
+
+  //Run the pipeline once over the input, with the parameters currently in the properties file
+  def run(id: String, lines: Seq[String], crit_file: String, loc_file: String, not_file: String, print_noise: String, config_file: String, compact: Boolean): Unit = {
+
+    //Output files are not overwritten by Flink (named pipes are kept, see LineSink)
+    for (f <- Seq(crit_file, loc_file, not_file))
+      LineSink.deleteOutput(f)
+
+    //The parameters changed since the previous job, and no state must be carried over
+    TrajectoryStreamManager.resetState(config_file)
+
+    //Local environment: the job runs inside this JVM, so it sees the state that was just reset
+    val env = StreamExecutionEnvironment.createLocalEnvironment(1)
+    TrajectoryStreamManager.configureEnvironment(env)
+
+    //The rows of the messages are only needed by the compact output
+    val incomingMessages: DataStream[(Long, String)] =
+      if (compact)
+        env.fromCollection(lines.zipWithIndex.map { case (line, row) => (row.toLong, line) })
+      else
+        env.fromCollection(lines.map(line => (-1L, line)))
+
+    TrajectoryStreamManager.buildPipeline(incomingMessages, crit_file, loc_file, not_file, print_noise != "false", print_noise != "none", config_file, compact)
+
+    env.execute("Maritime Synopses Session " + id)
+  }
+
+}
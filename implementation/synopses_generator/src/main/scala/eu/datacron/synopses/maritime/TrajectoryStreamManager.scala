@@ -57,9 +57,14 @@ object TrajectoryStreamManager{
 
   //Prepare a configuration setting for use with parameters read from the properties file
   //This also includes the bounding box for the area of monitoring
+  //OPTION #3: A properties file given on the command line (7th argument), see useConfig(); then the default file may not exist
   var config = new Config()
-  config = config.fromFile(configProperties)    //OPTION #1: from a properties array already loaded
-  //config = config.fromFile(configProperties)        //OPTION #2: directly from a properties file
+  @volatile var loadedConfigFile: String = null     //The properties file that config was read from
+  if (new File(configProperties).exists()) {
+    config = config.fromFile(configProperties)    //OPTION #1: from a properties array already loaded
+    //config = config.fromFile(configProperties)        //OPTION #2: directly from a properties file
+    loadedConfigFile = configProperties
+  }
 
   // Initialize new ShipInfo instance from file
   var shipInfo = new ShipInfo()
@@ -93,24 +98,82 @@ object TrajectoryStreamManager{
     val loc_file: String  = args(3)
     val not_file: String  = args(4)
     var print_noisy_messages: Boolean = true;
-    if(args.length >= 6)
+    var print_locations: Boolean = true;     // "none": the caller already knows the noise, do not write loc_file
+    if(args.length >= 6) {
       print_noisy_messages = args(5) != "false"
+      print_locations = args(5) != "none"
+    }
+    val config_file: String = if (args.length >= 7) args(6) else configProperties
+    val compact: Boolean = args.length >= 8 && args(7) == "compact"     // "compact": write binary records keyed by input row (see CompactOutput)
+    useConfig(config_file)
     val tmp = new File(not_file)
     tmp.delete()
     // val notFile: FileWriter = new FileWriter(not_file)
 
     //Employ the Flink Streaming API
     val env = StreamExecutionEnvironment.getExecutionEnvironment
+    configureEnvironment(env)
+
+    System.out.println("PARAMETERS: " + config.toString())
+    // System.out.println("TYPES: " + shipInfo.toString())
+
+    // val incomingMessages: DataStream[String] = env.addSource(kafkaConsumer_Messages)
+    // val incomingMessages: DataStream[String] = env.readTextFile("file:///home/giannis/infore/datacron/implementation/trajectory_synopses/test/input/imis_ais_100vessels.csv")
+    //Messages with their row in the input (-1 when the rows are not needed)
+    val incomingMessages: DataStream[(Long, String)] =
+      if (compact)
+        env.addSource(new RowSource(in_file)).setParallelism(1)
+      else
+        env.readTextFile(in_file).map(r => (-1L, r))
+
+    buildPipeline(incomingMessages, crit_file, loc_file, not_file, print_noisy_messages, print_locations, config_file, compact)
+
+    val jobResult = env.execute("Maritime Trajectory Stream Manager " + args(0))
+  }
+
+
+  //Read the configuration from the given properties file, unless it has already been read
+  //Called by every operator: they may run in another JVM than main(), where only the file path is known
+  //(The classes of each job are loaded anew, so jobs that run at the same time do not share the configuration or the object states)
+  def useConfig(config_file: String): Unit = {
+    if (config_file != loadedConfigFile) {
+      this.synchronized {
+        if (config_file != loadedConfigFile) {
+          config = new Config().fromFile(config_file)
+          loadedConfigFile = config_file
+        }
+      }
+    }
+  }
+
+
+  //Reload the configuration from the properties file and discard the state of all objects
+  //Used by SynopsesSession, which runs several jobs (each with different parameters) in the same JVM
+  def resetState(config_file: String): Unit = {
+    this.synchronized {
+      config = new Config().fromFile(config_file)
+      loadedConfigFile = config_file
+    }
+    objStates = objStateType()
+  }
+
+
+  //Settings of the execution environment shared by all jobs
+  def configureEnvironment(env: StreamExecutionEnvironment): Unit = {
     env.setStreamTimeCharacteristic(TimeCharacteristic.EventTime)
     env.setBufferTimeout(100)                                         //To control throughput and latency, set a maximum wait time (in MILLISECONDS) for the buffers to fill up
     env.getConfig.setExecutionMode(ExecutionMode.PIPELINED)           //Data exchanges to be performed in a pipelined manner
     env.getConfig.disableSysoutLogging()                              //JobManager status updates not to be printed to System.out by default
     //env.setParallelism(1)                                             //IMPORTANT!: NO parallelism along the operator chain in order to have consistent results per trajectory
     //env.getConfig.enableObjectReuse()              //DANGEROUS! DO NOT APPLY! Object reuse mode for better performance, but loses items and results!
+  }
 
 
-    System.out.println("PARAMETERS: " + config.toString())
-    // System.out.println("TYPES: " + shipInfo.toString())
+  //Noise elimination and trajectory summarization over a stream of raw messages (one per line)
+  //Writes the critical points to crit_file, the noisy (or noise-free) locations to loc_file, and the GAP_START points to not_file
+  //The operators read their configuration from config_file
+  //Each message comes with its row in the input, which is needed for the compact output (see CompactOutput)
+  def buildPipeline(incomingMessages: DataStream[(Long, String)], crit_file: String, loc_file: String, not_file: String, print_noisy_messages: Boolean, print_locations: Boolean, config_file: String, compact: Boolean): Unit = {
 
     var lastInputTimestamp = 0L                //Latest timestamp value (i.e., highest value seen thus far) in the input stream
     var lastCleanupTimestamp = 0L              //Latest timestamp value in the input stream at which a cleanup operation was triggered
@@ -155,18 +218,16 @@ object TrajectoryStreamManager{
 
 
 
-    //Data source: messages
-    // val incomingMessages: DataStream[String] = env.addSource(kafkaConsumer_Messages)
-    // val incomingMessages: DataStream[String] = env.readTextFile("file:///home/giannis/infore/datacron/implementation/trajectory_synopses/test/input/imis_ais_100vessels.csv")
-    val incomingMessages: DataStream[String] = env.readTextFile(in_file)
+    //Data source: messages (see main)
 
     // Filtering incoming raw positions by the area of monitoring
     // Also, maintain object states; cleanup obsolete states that haven't received updates over a recent time period (value set by config.PARAMS.HISTORY_PERIOD)
     val positionalStream: DataStream[critical_point] = incomingMessages
-      .map (r => parseLocation(r))                 //Transform message into a (candidate) critical point
+      .map (r => { useConfig(config_file); parseLocation(r._2, r._1) })                 //Transform message into a (candidate) critical point
       .filter(new FilterFunction[critical_point]() {
       @throws[Exception]
       def filter(pos: critical_point): Boolean = {
+        useConfig(config_file)
         val anno = new critical_point_annotation()           //Initialize annotation for this potentially critical point
         pos.setAnnotation(anno)
         if (config.BBOX.contains(pos.getLongitude, pos.getLatitude)) {         //Only keep raw positions within the specified area of monitoring
@@ -211,7 +272,7 @@ object TrajectoryStreamManager{
       //      val keyStream: KeyedStream[critical_point, CharSequence] = criticalPointStream.keyBy(_.getId)
       .keyBy(_.getId)
       .countWindow(2, 1)            //Window: use the latest pair of raw locations reported per object
-      .reduce { (prevLoc: critical_point, curLoc: critical_point) => forwardCheckMobilityFeatures(prevLoc, curLoc, not_file) }   //FORWARD check: characterizes the CURRENT location
+      .reduce { (prevLoc: critical_point, curLoc: critical_point) => useConfig(config_file); forwardCheckMobilityFeatures(prevLoc, curLoc, not_file, compact) }   //FORWARD check: characterizes the CURRENT location
       .setParallelism(1)
 
       //STEP #2 (BACKWARD check): Determine whether the previous location should also be characterized as a turning point (where significant change in heading is observed)
@@ -225,14 +286,14 @@ object TrajectoryStreamManager{
     }).setParallelism(1)
       .keyBy(_.getId)
       .countWindow(2, 1)           //Window: use the latest pair of raw locations reported per object
-      .reduce { (prevLoc: critical_point, curLoc: critical_point) => backwardCheckMobilityFeatures(prevLoc, curLoc) }      //BACKWARD check: characterizes the PREVIOUS location
+      .reduce { (prevLoc: critical_point, curLoc: critical_point) => useConfig(config_file); backwardCheckMobilityFeatures(prevLoc, curLoc) }      //BACKWARD check: characterizes the PREVIOUS location
       .setParallelism(1)
 
 
     // DERIVED OUTPUT #1: Noise-free locations detected along this trajectory
-    turningPointStream
-      .filter(_.getAnnotation.getNoise == print_noisy_messages)
-      .writeAsText(loc_file)
+    if (print_locations)
+      writePoints(turningPointStream
+        .filter(_.getAnnotation.getNoise == print_noisy_messages), loc_file, compact)
 
 
     //Maintain a LOG file with all original messages (including those qualified as noise)
@@ -244,7 +305,7 @@ object TrajectoryStreamManager{
 
 
     //DERIVED OUTPUT #2: Filter out non-critical points from the trajectory synopsis
-    turningPointStream.filter(new FilterFunction[critical_point]() {
+    writePoints(turningPointStream.filter(new FilterFunction[critical_point]() {
       @throws[Exception]
       def filter(pos: critical_point): Boolean = {
         val anno = pos.getAnnotation
@@ -257,11 +318,19 @@ object TrajectoryStreamManager{
         }
         return false             //This is NOT a critical point
       }
-    })
-      .writeAsText(crit_file)      //OUTPUT resulting critical points as a Kafka stream at that specific topic
+    }), crit_file, compact)      //OUTPUT resulting critical points as a Kafka stream at that specific topic
+  }
 
 
-    val jobResult = env.execute("Maritime Trajectory Stream Manager " + args(0))
+  //Write a stream of points to a file: as compact records, or as text, one point per line
+  //A named pipe is written by a single LineSink, since it can not be replaced
+  def writePoints(stream: DataStream[critical_point], path: String, compact: Boolean): Unit = {
+    if (compact)
+      stream.addSink(new CompactSink(path)).setParallelism(1)
+    else if (LineSink.isPipe(path))
+      stream.addSink(new LineSink[critical_point](path)).setParallelism(1)
+    else
+      stream.writeAsText(path)
   }
 
 
@@ -271,10 +340,11 @@ object TrajectoryStreamManager{
 
   //Extract constituent values from the AIS message: timestamp, id, lon, lat, error flags -- the rest are assigned NULL or zero values (will be calculated during trajectory detection & summarization)
   //Also insert an ingestion timestamp (in MILLISECONDS), so as to measure tuple processing latency across the operator pipeline
-  def parseLocation(msg : String): (critical_point) = {
+  //A non-negative row (compact output) is kept in the ingestion timestamp, instead of the current time
+  def parseLocation(msg : String, row: Long): (critical_point) = {
     val tokens = msg.substring(0, msg.length).split(config.DELIMITER)
     //System.out.println("HASH: " + Math.abs(tokens(1).toString.hashCode()) + " residual: " + Math.abs(tokens(1).toString.hashCode()) % 2)
-    new critical_point(tokens(0).toLong, tokens(1).toString, tokens(2).toDouble, tokens(3).toDouble, null, 0.0F, 0.0F, 0.0F, 0L, tokens(6).toString, System.currentTimeMillis(), -1.0F, -1.0F)
+    new critical_point(tokens(0).toLong, tokens(1).toString, tokens(2).toDouble, tokens(3).toDouble, null, 0.0F, 0.0F, 0.0F, 0L, tokens(6).toString, if (row >= 0) row else System.currentTimeMillis(), -1.0F, -1.0F)
   }
 
 
@@ -340,7 +410,7 @@ object TrajectoryStreamManager{
 
   //FORWARD check: Calculate spatiotemporal measures from pairs of consecutive locations per object
   //... and determine suitable annotations for the latest critical point
-  def forwardCheckMobilityFeatures(prevLoc: critical_point, newLoc: critical_point, not_file: String): critical_point = {
+  def forwardCheckMobilityFeatures(prevLoc: critical_point, newLoc: critical_point, not_file: String, compact: Boolean): critical_point = {
 
     var oldLoc: critical_point =  null
 
@@ -385,11 +455,15 @@ object TrajectoryStreamManager{
       oldLoc.getAnnotation.setGapStart(true)
       // val msgNotify = new KeyedMessage[String, String](config.TOPIC_NOTIFICATIONS, oldLoc.getTimestamp.toString, oldLoc.toString)    //Use timestamp as the partitioning key
       // kafkaProducer_notifications.send(msgNotify)
-      val tmp: FileWriter = new FileWriter(not_file, true)
-      try {
-        tmp.write(oldLoc.toString + "\n")
-      }
-      finally tmp.close() 
+      if (compact)
+        CompactOutput.append(not_file, oldLoc)
+      else {
+        val tmp: FileWriter = new FileWriter(not_file, true)
+        try {
+          tmp.write(oldLoc.toString + "\n")
+        }
+        finally tmp.close()
+      } 
 
 
       //Since this is the first position reported after a long time, no further processing is possible